@@ -0,0 +1,146 @@
+"""
+Benchmark da fila de gravação em grupo (fila_gravacao.py)
+
+Simula o pico do início do turno: vários supervisores (threads) gravando
+frequência ao mesmo tempo, primeiro direto (uma transação por pedido, como
+sem a fila) e depois pela fila. Mostra pedidos/s, commits/s e latência.
+
+Use um banco LOCAL de teste com a estrutura importada. Os registros são
+gravados em datas de 2099 e apagados no fim:
+    DATABASE_URL=postgresql://localhost/frequencia_teste \\
+        python benchmark_fila_gravacao.py [pedidos] [supervisores] [eletricistas_por_pedido] [janela_ms]
+Padrão: 2000 pedidos, 30 supervisores, 5 eletricistas por pedido, janela de 5 ms.
+
+Medido com o padrão em PostgreSQL 16 local (socket unix, mesma máquina):
+    sem fila: 80 pedidos/s, 80 commits/s, latência p50/p95 180 / 304 ms
+    com fila: 82 pedidos/s,  3 commits/s, latência p50/p95 373 / 446 ms
+O limite aqui é a CPU do processo Python (montar os comandos no SQLAlchemy),
+não o commit: a fila não aumenta os pedidos/s, só corta os commits (~30
+pedidos por commit) e usa uma conexão em vez de uma por pedido. Com o banco
+em outra máquina cada commit custa uma ida e volta na rede; esse caso não
+foi medido.
+"""
+
+import os
+import sys
+import time
+from datetime import date, timedelta
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+INICIO_BENCHMARK = date(2099, 1, 1)
+
+
+def _pedidos(ids, total, por_pedido):
+    """[(data, associacoes)] sem repetir eletricista na mesma data"""
+    por_data = len(ids) // por_pedido
+    pedidos = []
+    for i in range(total):
+        dia, posicao = divmod(i, por_data)
+        inicio = posicao * por_pedido
+        pedidos.append((
+            INICIO_BENCHMARK + timedelta(days=dia),
+            [{"eletricista_id": e, "prefixo": "BENCHMARK"} for e in ids[inicio:inicio + por_pedido]]
+        ))
+    return pedidos
+
+
+def _limpar(db):
+    from models import AlteracaoRegistro, EquipeDia, ResumoFrequenciaDiaria
+
+    for modelo in (EquipeDia, ResumoFrequenciaDiaria, AlteracaoRegistro):
+        db.query(modelo).filter(modelo.data >= INICIO_BENCHMARK).delete(synchronize_session=False)
+    db.commit()
+
+
+def _medir(nome, pedidos, supervisores, executar):
+    """Roda os pedidos em paralelo; devolve (segundos, latências em ms, aceitos)"""
+    latencias = []
+
+    def um_pedido(pedido):
+        inicio = time.perf_counter()
+        try:
+            aceito = executar(*pedido).get("success", False)
+        except Exception:
+            aceito = False  # ex.: sem conexão livre no pool (mais supervisores que conexões)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        return aceito
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=supervisores) as executor:
+        aceitos = sum(executor.map(um_pedido, pedidos))
+    segundos = time.perf_counter() - inicio
+
+    latencias.sort()
+    print(f"\n▶ {nome}")
+    print(f"   pedidos aceitos : {aceitos}/{len(pedidos)}")
+    print(f"   tempo           : {segundos:.2f} s")
+    print(f"   pedidos/s       : {len(pedidos) / segundos:.0f}")
+    print(f"   latência p50/p95: {latencias[len(latencias) // 2]:.1f} / {latencias[int(len(latencias) * 0.95)]:.1f} ms")
+    return segundos
+
+
+if __name__ == "__main__":
+    from database import SessionLocal, engine
+    from models import EstruturaEquipes
+    from relatorios import SITUACOES_ATIVAS
+    from gravacao_frequencia import registrar_frequencia
+    from fila_gravacao import FilaGravacao, FILA_GRAVACAO_MAX_LOTE
+
+    argumentos = [float(a) for a in sys.argv[1:5]]
+    total_pedidos, supervisores, por_pedido, janela_ms = (
+        argumentos + [2000, 30, 5, 5][len(argumentos):]
+    )
+    total_pedidos, supervisores, por_pedido = int(total_pedidos), int(supervisores), int(por_pedido)
+
+    # Sem host na URL = socket local (postgresql:///banco?host=/caminho)
+    host = urlparse(os.getenv('DATABASE_URL', '')).hostname
+    if engine.dialect.name != 'sqlite' and host not in (None, 'localhost', '127.0.0.1'):
+        print(f"❌ Banco em '{host}': rode o benchmark só em um banco local de teste")
+        sys.exit(1)
+
+    db = SessionLocal()
+    try:
+        ids = [i[0] for i in db.query(EstruturaEquipes.id).filter(
+            EstruturaEquipes.descr_situacao.in_(SITUACOES_ATIVAS)
+        ).order_by(EstruturaEquipes.id).all()]
+        if len(ids) < por_pedido:
+            print("❌ Importe a estrutura de equipes antes de rodar o benchmark")
+            sys.exit(1)
+
+        pedidos = _pedidos(ids, total_pedidos, por_pedido)
+        print(f"⏱️ {total_pedidos} pedidos de {por_pedido} eletricistas, "
+              f"{supervisores} supervisores simultâneos ({engine.dialect.name})")
+
+        # 1. Sem fila: cada pedido com sua sessão e seu commit
+        def direto(data, associacoes):
+            sessao = SessionLocal()
+            try:
+                resposta, apos_commit = registrar_frequencia(sessao, data, associacoes, "BENCHMARK", None)
+                if apos_commit is None:
+                    sessao.rollback()
+                else:
+                    sessao.commit()
+                return resposta
+            finally:
+                sessao.close()
+
+        _limpar(db)
+        segundos = _medir("Sem fila (1 commit por pedido)", pedidos, supervisores, direto)
+        print(f"   commits/s       : {total_pedidos / segundos:.0f}")
+
+        # 2. Com fila: pedidos da mesma janela em uma transação
+        fila = FilaGravacao(janela_ms=janela_ms, max_lote=FILA_GRAVACAO_MAX_LOTE)
+
+        def pela_fila(data, associacoes):
+            return fila.enviar(registrar_frequencia, data, associacoes, "BENCHMARK", None).result()
+
+        _limpar(db)
+        segundos = _medir(f"Com fila (janela {janela_ms:g} ms)", pedidos, supervisores, pela_fila)
+        estatisticas = fila.estatisticas()
+        print(f"   commits/s       : {estatisticas['commits'] / segundos:.0f}")
+        print(f"   pedidos/commit  : {estatisticas['pedidos_por_commit']} (maior grupo {estatisticas['maior_lote']})")
+
+    finally:
+        _limpar(db)
+        db.close()
@@ -0,0 +1,162 @@
+"""
+Busca normalizada de eletricistas no banco
+
+estrutura_equipes.nome_busca / matricula_busca guardam o nome e a
+matrícula em maiúsculas e sem acentos ("João" -> "JOAO"), preenchidos na
+importação e na restauração do histórico. No PostgreSQL essas colunas têm
+índice GIN de trigramas (pg_trgm), que atende LIKE '%termo%'; nos outros
+bancos, índice comum. (A busca de prefixos é em memória: indice_prefixos.py.)
+
+As colunas e índices são criados na inicialização (preparar_busca_normalizada),
+pois o create_all não altera tabelas que já existem. A mesma rotina apaga a
+coluna prefixo_busca e os índices de versões anteriores, que não eram lidos.
+"""
+
+import unicodedata
+from sqlalchemy import inspect, text, case
+from models import EstruturaEquipes
+
+COLUNAS_BUSCA = {
+    'nome_busca': 'VARCHAR(200)',
+    'matricula_busca': 'VARCHAR(50)'
+}
+
+# Versões anteriores: coluna e índices sem uso (mantidos a cada importação)
+COLUNAS_ANTIGAS = ['prefixo_busca']
+INDICES_ANTIGOS = ['prefixo_busca', 'matricula']
+
+# Linhas lidas por vez na busca pelo banco (até achar `limite` não excluídos)
+PAGINA_BUSCA = 50
+
+# Colunas com índice de busca
+COLUNAS_INDEXADAS = list(COLUNAS_BUSCA)
+
+
+def normalizar(texto):
+    """Maiúsculas e sem acentos: 'João' -> 'JOAO'"""
+    if not texto:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).upper().strip()
+
+
+def preencher_busca(eletricista):
+    """Atualiza as colunas de busca de um EstruturaEquipes"""
+    eletricista.nome_busca = normalizar(eletricista.colaborador)
+    eletricista.matricula_busca = normalizar(eletricista.matricula)
+
+
+# ============================================
+# INICIALIZAÇÃO (colunas, índices, preenchimento)
+# ============================================
+def preparar_busca_normalizada(engine):
+    """Cria colunas/índices de busca que faltarem e preenche as linhas vazias"""
+    from database import SessionLocal
+
+    existentes = {c['name'] for c in inspect(engine).get_columns('estrutura_equipes')}
+    postgres = engine.dialect.name == 'postgresql'
+
+    with engine.begin() as conn:
+        for coluna in INDICES_ANTIGOS:
+            conn.execute(text(f"DROP INDEX IF EXISTS ix_estrutura_{coluna}_trgm"))
+            conn.execute(text(f"DROP INDEX IF EXISTS ix_estrutura_{coluna}"))
+        for coluna in COLUNAS_ANTIGAS:
+            if coluna in existentes:
+                conn.execute(text(f"ALTER TABLE estrutura_equipes DROP COLUMN {coluna}"))
+
+        for coluna, tipo in COLUNAS_BUSCA.items():
+            if coluna not in existentes:
+                conn.execute(text(f"ALTER TABLE estrutura_equipes ADD COLUMN {coluna} {tipo}"))
+
+        if postgres:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            for coluna in COLUNAS_INDEXADAS:
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_estrutura_{coluna}_trgm "
+                    f"ON estrutura_equipes USING gin ({coluna} gin_trgm_ops)"
+                ))
+        else:
+            for coluna in COLUNAS_INDEXADAS:
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_estrutura_{coluna} "
+                    f"ON estrutura_equipes ({coluna})"
+                ))
+
+    # Linhas antigas (antes das colunas existirem)
+    db = SessionLocal()
+    try:
+        pendentes = db.query(EstruturaEquipes).filter(
+            EstruturaEquipes.nome_busca.is_(None) | EstruturaEquipes.matricula_busca.is_(None)
+        ).all()
+        for eletricista in pendentes:
+            preencher_busca(eletricista)
+        db.commit()
+        return len(pendentes)
+    finally:
+        db.close()
+
+
+# ============================================
+# CONSULTA
+# ============================================
+def buscar_eletricistas_banco(db, termo, excluir=(), limite=10):
+    """
+    Eletricistas ATIVOS/RESERVA cujo nome/matrícula contém o termo,
+    na mesma ordem do índice em memória (início, palavra, meio).
+    """
+    from relatorios import SITUACOES_ATIVAS
+
+    termo = normalizar(termo)
+    if len(termo) < 3:
+        return []
+
+    nome = EstruturaEquipes.nome_busca
+    matricula = EstruturaEquipes.matricula_busca
+    ordem = case(
+        (nome.startswith(termo, autoescape=True), 0),
+        (matricula.startswith(termo, autoescape=True), 0),
+        (nome.contains(f" {termo}", autoescape=True), 1),
+        else_=2
+    )
+
+    # Só as colunas da resposta (não o registro inteiro)
+    query = db.query(
+        EstruturaEquipes.id,
+        EstruturaEquipes.colaborador,
+        EstruturaEquipes.matricula,
+        EstruturaEquipes.base,
+        EstruturaEquipes.prefixo,
+        EstruturaEquipes.polo,
+        EstruturaEquipes.regional,
+        EstruturaEquipes.superv_campo
+    ).filter(
+        nome.contains(termo, autoescape=True) | matricula.contains(termo, autoescape=True),
+        EstruturaEquipes.descr_situacao.in_(SITUACOES_ATIVAS)
+    ).order_by(ordem, nome, EstruturaEquipes.id)
+
+    # Os excluídos (já registrados) saem aqui, não num NOT IN enviado ao
+    # banco: lê páginas de PAGINA_BUSCA até ter `limite` eletricistas
+    excluir = set(excluir)
+    encontrados = []
+    inicio = 0
+    while len(encontrados) < limite:
+        pagina = query.offset(inicio).limit(PAGINA_BUSCA).all()
+        encontrados.extend(elet for elet in pagina if elet.id not in excluir)
+        if len(pagina) < PAGINA_BUSCA:
+            break
+        inicio += PAGINA_BUSCA
+    encontrados = encontrados[:limite]
+
+    return [
+        {
+            "id": elet.id,
+            "nome": elet.colaborador,
+            "matricula": elet.matricula,
+            "base": elet.base,
+            "prefixo": elet.prefixo,
+            "polo": elet.polo,
+            "regional": elet.regional,
+            "superv_original": elet.superv_campo
+        }
+        for elet in encontrados
+    ]
@@ -0,0 +1,121 @@
+"""
+Cache de resultados dos relatórios
+
+Chave: (endpoint, data_inicio, data_fim). Os relatórios são os mesmos para
+qualquer usuário, então o perfil/base de quem pede não entra na chave.
+  - LRU com limite de entradas (RELATORIOS_CACHE_MAX)
+  - TTL para períodos que incluem hoje ou o futuro (RELATORIOS_CACHE_TTL, segundos)
+  - TTL longo para períodos inteiramente no passado
+    (RELATORIOS_CACHE_TTL_PASSADO, padrão 1 hora): gravações em datas
+    passadas feitas por outro worker, reconstruir_resumo ou correções
+    manuais no banco aparecem no máximo depois desse tempo
+  - Gravações (frequência, indisponibilidade, remanejamento) invalidam
+    apenas as entradas cujo período contém a data alterada
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from datetime import date
+
+CACHE_MAX_ENTRADAS = int(os.getenv('RELATORIOS_CACHE_MAX', 256))
+CACHE_TTL_SEGUNDOS = int(os.getenv('RELATORIOS_CACHE_TTL', 300))
+CACHE_TTL_PASSADO_SEGUNDOS = int(os.getenv('RELATORIOS_CACHE_TTL_PASSADO', 3600))
+
+
+class CacheRelatorios:
+    """Cache LRU + TTL, seguro para uso entre threads"""
+
+    def __init__(self, max_entradas=CACHE_MAX_ENTRADAS, ttl=CACHE_TTL_SEGUNDOS,
+                 ttl_passado=CACHE_TTL_PASSADO_SEGUNDOS):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.ttl_passado = ttl_passado
+        self._entradas = OrderedDict()  # chave -> (expira_em, data_inicio, data_fim, valor)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidacoes = 0
+
+    def obter(self, chave):
+        """Valor em cache ou None"""
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self.misses += 1
+                return None
+
+            expira_em, _, _, valor = entrada
+            if expira_em < time.monotonic():
+                del self._entradas[chave]
+                self.misses += 1
+                return None
+
+            self._entradas.move_to_end(chave)
+            self.hits += 1
+            return valor
+
+    def guardar(self, chave, valor, data_inicio, data_fim):
+        """Guarda o resultado de um período (passado = TTL longo)"""
+        ttl = self.ttl if data_fim >= date.today() else self.ttl_passado
+        expira_em = time.monotonic() + ttl
+
+        with self._lock:
+            self._entradas[chave] = (expira_em, data_inicio, data_fim, valor)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def invalidar_data(self, data):
+        """Remove as entradas cujo período contém a data"""
+        with self._lock:
+            chaves = [
+                chave for chave, (_, inicio, fim, _) in self._entradas.items()
+                if inicio <= data <= fim
+            ]
+            for chave in chaves:
+                del self._entradas[chave]
+            self.invalidacoes += len(chaves)
+
+    def limpar(self):
+        """Remove todas as entradas (ex.: nova estrutura importada)"""
+        with self._lock:
+            self.invalidacoes += len(self._entradas)
+            self._entradas.clear()
+
+    def estatisticas(self):
+        """Contadores para dimensionamento do cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "ttl_segundos": self.ttl,
+                "ttl_passado_segundos": self.ttl_passado,
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_acerto": round(self.hits / total * 100, 1) if total > 0 else 0,
+                "invalidacoes": self.invalidacoes
+            }
+
+
+# Instância única do processo
+cache_relatorios = CacheRelatorios()
+
+
+def relatorio_em_cache(endpoint, data_inicio, data_fim, calcular):
+    """
+    Retorna o relatório do cache ou calcula com calcular() e guarda.
+    Só resultados com success=True são guardados.
+    """
+    chave = (endpoint, data_inicio, data_fim)
+
+    resultado = cache_relatorios.obter(chave)
+    if resultado is not None:
+        return resultado
+
+    resultado = calcular()
+    if resultado.get("success"):
+        cache_relatorios.guardar(chave, resultado, data_inicio, data_fim)
+    return resultado
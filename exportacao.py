@@ -0,0 +1,146 @@
+"""
+Exportação dos relatórios em streaming (format=csv | ndjson)
+
+As linhas são enviadas conforme são produzidas: o relatório de
+eletricistas disponíveis é lido do banco com cursor do lado do servidor,
+então a memória não cresce com o tamanho do período.
+"""
+
+import csv
+import io
+import json
+from fastapi.responses import StreamingResponse
+
+FORMATOS_EXPORTACAO = ('csv', 'ndjson')
+
+# Linhas acumuladas antes de enviar um bloco ao cliente
+TAMANHO_BLOCO = 500
+
+
+# ============================================
+# GERADORES DE CONTEÚDO
+# ============================================
+def _gerar_csv(colunas, linhas):
+    """CSV separado por ';' (padrão do Excel pt-BR), com BOM UTF-8"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=';')
+
+    buffer.write('\ufeff')
+    escritor.writerow(colunas)
+
+    for i, linha in enumerate(linhas, start=1):
+        escritor.writerow(linha)
+        if i % TAMANHO_BLOCO == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate(0)
+
+    yield buffer.getvalue().encode('utf-8')
+
+
+def _gerar_ndjson(colunas, linhas):
+    """Um objeto JSON por linha"""
+    bloco = []
+    for linha in linhas:
+        bloco.append(json.dumps(dict(zip(colunas, linha)), ensure_ascii=False, default=str))
+        if len(bloco) >= TAMANHO_BLOCO:
+            yield ('\n'.join(bloco) + '\n').encode('utf-8')
+            bloco = []
+
+    if bloco:
+        yield ('\n'.join(bloco) + '\n').encode('utf-8')
+
+
+def gerar_conteudo(formato, colunas, linhas):
+    """Blocos de bytes no formato pedido (csv ou ndjson)"""
+    if formato == 'csv':
+        return _gerar_csv(colunas, linhas)
+    return _gerar_ndjson(colunas, linhas)
+
+
+def resposta_exportacao(nome_arquivo, formato, colunas, linhas):
+    """StreamingResponse no formato pedido (csv ou ndjson)"""
+    if formato == 'csv':
+        return StreamingResponse(
+            gerar_conteudo(formato, colunas, linhas),
+            media_type='text/csv; charset=utf-8',
+            headers={"Content-Disposition": f'attachment; filename="{nome_arquivo}.csv"'}
+        )
+
+    return StreamingResponse(
+        gerar_conteudo(formato, colunas, linhas),
+        media_type='application/x-ndjson'
+    )
+
+
+def nome_exportacao(relatorio, data_inicio, data_fim):
+    """Ex.: relatorio-geral_2024-01-01_2024-01-31"""
+    return f"{relatorio}_{data_inicio.isoformat()}_{data_fim.isoformat()}"
+
+
+# ============================================
+# LINHAS DE CADA RELATÓRIO
+# ============================================
+COLUNAS_GERAL = ['motivo', 'qtde', 'percentual']
+
+
+def linhas_relatorio_geral(resultado):
+    """Linhas do relatório geral já calculado"""
+    for item in resultado['dados']:
+        yield (item['motivo'], item['qtde'], item['percentual'])
+
+
+def colunas_relatorio_por_supervisor(resultado):
+    """Uma coluna por motivo cadastrado, na mesma ordem de todos_motivos"""
+    return (
+        ['supervisor', 'total_eletricistas', 'Presente', 'Não registrado']
+        + resultado['todos_motivos']
+        + ['total_registros', 'percentual_presenca']
+    )
+
+
+def linhas_relatorio_por_supervisor(resultado):
+    """Matriz supervisor × motivo do relatório já calculado"""
+    for sup in resultado['dados']:
+        contadores = sup['contadores']
+        yield (
+            [sup['supervisor'], sup['total_eletricistas'], contadores['Presente'], contadores['Não registrado']]
+            + [contadores.get(motivo, 0) for motivo in resultado['todos_motivos']]
+            + [sup['total_registros'], sup['percentual_presenca']]
+        )
+
+
+COLUNAS_PREFIXO = ['prefixo', 'data', 'motivo1', 'motivo2']
+
+
+def linhas_relatorio_por_prefixo(resultado):
+    """Linhas do relatório por prefixo já calculado"""
+    for item in resultado['dados']:
+        yield (item['prefixo'], item['data'], item['motivo1'], item['motivo2'])
+
+
+COLUNAS_DISPONIVEIS = [
+    'polo', 'base', 'matricula', 'colaborador',
+    'processo_equipe', 'superv_campo', 'superv_operacao'
+]
+
+
+def linhas_eletricistas_disponiveis(data_inicio, data_fim):
+    """
+    Eletricistas disponíveis lidos direto do cursor (stream_results).
+    Abre a própria sessão, pois o gerador roda depois que a requisição
+    já devolveu a resposta.
+    """
+    from database import SessionLocal
+    from relatorios import consultar_eletricistas_disponiveis
+
+    db = SessionLocal()
+    try:
+        resultado = db.execute(
+            consultar_eletricistas_disponiveis(data_inicio, data_fim),
+            execution_options={"stream_results": True, "yield_per": TAMANHO_BLOCO}
+        )
+        for linha in resultado:
+            yield tuple(linha)
+    finally:
+        db.close()
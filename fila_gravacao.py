@@ -0,0 +1,186 @@
+"""
+Fila de gravação em grupo (group commit) para os picos de registro
+
+No início do turno todos os supervisores gravam frequência/indisponibilidade
+ao mesmo tempo, e cada pedido abria sua sessão e fazia seu próprio commit.
+Com a fila habilitada, os pedidos que chegam dentro de uma janela curta são
+gravados por UMA thread em UMA transação:
+  - cada pedido roda em um SAVEPOINT (o erro de um não desfaz os outros)
+  - a resposta de cada pedido só é liberada DEPOIS do commit do grupo
+  - se o commit falhar, todos os pedidos do grupo recebem o erro
+
+Os pedidos são as funções registrar_* de gravacao_frequencia.py, que
+devolvem (resposta, apos_commit).
+
+Ganho medido (benchmark_fila_gravacao.py, PostgreSQL local): ~30 pedidos
+por commit, mas os mesmos pedidos/s - o gargalo no teste foi a CPU do
+processo, não o commit.
+
+Configuração (variáveis de ambiente):
+  FILA_GRAVACAO           - 1 para habilitar (padrão: desligada)
+  FILA_GRAVACAO_JANELA_MS - espera por mais pedidos após o primeiro (padrão 5)
+  FILA_GRAVACAO_MAX_LOTE  - máximo de pedidos por transação (padrão 50)
+"""
+
+import os
+import time
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future
+
+USAR_FILA_GRAVACAO = os.getenv('FILA_GRAVACAO', '0').lower() in ('1', 'true', 'sim')
+FILA_GRAVACAO_JANELA_MS = float(os.getenv('FILA_GRAVACAO_JANELA_MS', 5))
+FILA_GRAVACAO_MAX_LOTE = int(os.getenv('FILA_GRAVACAO_MAX_LOTE', 50))
+
+
+class FilaGravacao:
+    """Thread única que agrupa pedidos de gravação em transações"""
+
+    def __init__(self, janela_ms=FILA_GRAVACAO_JANELA_MS, max_lote=FILA_GRAVACAO_MAX_LOTE, fabrica_sessao=None):
+        self.janela = janela_ms / 1000
+        self.max_lote = max_lote
+        self._fabrica_sessao = fabrica_sessao
+        self._fila = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+        # Estatísticas
+        self.pedidos = 0
+        self.commits = 0
+        self.falhas_commit = 0
+        self.maior_lote = 0
+
+    # --------------------------------------------
+    # Envio
+    # --------------------------------------------
+    def enviar(self, funcao, *args):
+        """Enfileira funcao(db, *args); devolve um Future com a resposta"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._laco, name='fila-gravacao', daemon=True)
+                self._thread.start()
+
+        futuro = Future()
+        self._fila.put((funcao, args, futuro))
+        return futuro
+
+    async def executar(self, funcao, *args):
+        """Versão para endpoints async"""
+        return await asyncio.wrap_future(self.enviar(funcao, *args))
+
+    # --------------------------------------------
+    # Thread de gravação
+    # --------------------------------------------
+    def _laco(self):
+        while True:
+            lote = [self._fila.get()]
+            limite = time.monotonic() + self.janela
+
+            while len(lote) < self.max_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(self._fila.get(timeout=restante))
+                except queue.Empty:
+                    break
+
+            self._gravar(lote)
+
+    def _sessao(self):
+        if self._fabrica_sessao is None:
+            from database import SessionLocal
+            self._fabrica_sessao = SessionLocal
+        return self._fabrica_sessao()
+
+    def _gravar(self, lote):
+        # Pedidos cancelados (cliente desconectou) não são gravados
+        lote = [pedido for pedido in lote if pedido[2].set_running_or_notify_cancel()]
+        if not lote:
+            return
+
+        resultados = []
+        db = None
+        try:
+            db = self._sessao()
+            for funcao, args, _ in lote:
+                ponto = db.begin_nested()
+                try:
+                    resposta, apos_commit = funcao(db, *args)
+                    if apos_commit is None:
+                        ponto.rollback()
+                    else:
+                        ponto.commit()
+                except Exception as e:
+                    ponto.rollback()
+                    resposta, apos_commit = {"success": False, "erro": str(e)}, None
+                resultados.append((resposta, apos_commit))
+
+            db.commit()
+
+        except Exception as e:
+            if db is not None:
+                db.rollback()
+            with self._lock:
+                self.falhas_commit += 1
+            for _, _, futuro in lote:
+                futuro.set_result({"success": False, "erro": str(e)})
+            return
+
+        finally:
+            if db is not None:
+                db.close()
+
+        with self._lock:
+            self.pedidos += len(lote)
+            self.commits += 1
+            self.maior_lote = max(self.maior_lote, len(lote))
+
+        # Confirmação só depois do commit do grupo
+        for (_, _, futuro), (resposta, apos_commit) in zip(lote, resultados):
+            if apos_commit is not None:
+                try:
+                    apos_commit()
+                except Exception:
+                    pass  # cache desatualizado expira sozinho; o registro já está gravado
+            futuro.set_result(resposta)
+
+    def estatisticas(self):
+        """Pedidos, commits e tamanho médio dos grupos"""
+        with self._lock:
+            return {
+                "habilitada": USAR_FILA_GRAVACAO,
+                "janela_ms": self.janela * 1000,
+                "max_lote": self.max_lote,
+                "pedidos": self.pedidos,
+                "commits": self.commits,
+                "falhas_commit": self.falhas_commit,
+                "maior_lote": self.maior_lote,
+                "pedidos_por_commit": round(self.pedidos / self.commits, 1) if self.commits else 0
+            }
+
+
+# Instância única do processo
+fila_gravacao = FilaGravacao()
+
+
+async def gravar(db, funcao, *args):
+    """
+    Executa um pedido registrar_* e devolve a resposta JSON:
+    pela fila (se habilitada) ou direto na sessão do endpoint.
+    """
+    if USAR_FILA_GRAVACAO:
+        # Devolve a conexão do pedido ao pool enquanto espera: com todos os
+        # pedidos segurando uma, a thread da fila ficaria sem conexão
+        db.rollback()
+        return await fila_gravacao.executar(funcao, *args)
+
+    resposta, apos_commit = funcao(db, *args)
+    if apos_commit is None:
+        db.rollback()
+        return resposta
+
+    db.commit()
+    apos_commit()
+    return resposta
@@ -0,0 +1,572 @@
+"""
+Gravação em lote da frequência (/api/salvar-frequencia), das
+indisponibilidades (/api/salvar-indisponibilidades) e dos remanejamentos
+(/api/remanejar-eletricistas)
+
+  1. validar_*: consultas por conjunto conferem todos os eletricistas
+     (existem? já estão na frequência ou indisponíveis na data?) e
+     devolvem o resultado item a item
+  2. inserir_*/gravar_*: UM INSERT com todas as linhas aceitas, que ignora
+     quem foi registrado por outro pedido nesse meio tempo (índice único)
+
+registrar_frequencia / registrar_indisponibilidade(s) / registrar_remanejamento(s)
+fazem o pedido inteiro
+(validação, gravação e resumo) sem commit, para serem chamadas tanto pelos
+endpoints quanto pela fila de gravação em grupo (fila_gravacao.py).
+"""
+
+from sqlalchemy import literal, select, union_all
+from models import EstruturaEquipes, EquipeDia, Indisponibilidade, MotivoIndisponibilidade, Remanejamento
+from registros_unicos import inserir_sem_duplicar
+
+TIPOS_INDISPONIBILIDADE = ('parcial', 'total')
+
+MOTIVOS_REJEICAO = {
+    'invalido': "Eletricista ou prefixo não informado",
+    'sem_eletricista': "Eletricista não informado",
+    'tipo': "Tipo de indisponibilidade inválido (parcial ou total)",
+    'motivo': "Motivo inválido",
+    'inexistente': "Eletricista não encontrado",
+    'frequencia': "Já registrado na FREQUÊNCIA nesta data",
+    'indisponivel': "Já registrado como INDISPONÍVEL nesta data",
+    'duplicado': "Repetido no mesmo envio",
+    'remanejado': "Já remanejado para esta supervisão nesta data",
+    'concorrente': "Registrado por outro usuário nesta data"
+}
+
+
+def _item(eletricista_id, prefixo, motivo):
+    """Resultado de uma associação/indisponibilidade recebida"""
+    return {
+        "eletricista_id": eletricista_id,
+        "prefixo": prefixo,
+        "aceito": motivo is None,
+        "motivo": MOTIVOS_REJEICAO.get(motivo)
+    }
+
+
+def _recusar_nao_gravados(itens, gravados):
+    """Marca como recusados os aceitos que o INSERT ignorou (registro concorrente)"""
+    for item in itens:
+        if item["aceito"] and item["eletricista_id"] not in gravados:
+            item["aceito"] = False
+            item["motivo"] = MOTIVOS_REJEICAO['concorrente']
+
+
+def _id_inteiro(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def situacao_eletricistas(db, data, ids):
+    """{eletricista_id: {'E', 'F', 'I'}} - existe / na frequência / indisponível"""
+    if not ids:
+        return {}
+
+    consulta = union_all(
+        select(EstruturaEquipes.id, literal('E')).where(
+            EstruturaEquipes.id.in_(ids)
+        ),
+        select(EquipeDia.eletricista_id, literal('F')).where(
+            EquipeDia.data == data,
+            EquipeDia.eletricista_id.in_(ids)
+        ),
+        select(Indisponibilidade.eletricista_id, literal('I')).where(
+            Indisponibilidade.data == data,
+            Indisponibilidade.eletricista_id.in_(ids)
+        )
+    )
+
+    situacao = {}
+    for eletricista_id, marca in db.execute(consulta):
+        situacao.setdefault(eletricista_id, set()).add(marca)
+    return situacao
+
+
+def validar_associacoes(db, data, associacoes):
+    """
+    Retorna (aceitas, itens):
+      aceitas - [(eletricista_id, prefixo)] que podem ser gravadas
+      itens   - resultado de cada associação recebida, na mesma ordem
+    """
+    normalizadas = [
+        (_id_inteiro(assoc.get('eletricista_id')), (assoc.get('prefixo') or '').strip())
+        for assoc in associacoes
+    ]
+
+    situacao = situacao_eletricistas(
+        db, data, {i for i, _ in normalizadas if i is not None}
+    )
+
+    aceitas = []
+    itens = []
+    vistos = set()
+    for eletricista_id, prefixo in normalizadas:
+        marcas = situacao.get(eletricista_id, set())
+
+        if eletricista_id is None or not prefixo:
+            motivo = 'invalido'
+        elif 'E' not in marcas:
+            motivo = 'inexistente'
+        elif 'F' in marcas:
+            motivo = 'frequencia'
+        elif 'I' in marcas:
+            motivo = 'indisponivel'
+        elif eletricista_id in vistos:
+            motivo = 'duplicado'
+        else:
+            motivo = None
+            vistos.add(eletricista_id)
+            aceitas.append((eletricista_id, prefixo))
+
+        itens.append(_item(eletricista_id, prefixo, motivo))
+
+    return aceitas, itens
+
+
+def inserir_associacoes(db, data, aceitas, supervisor_registro, usuario_id, itens=()):
+    """
+    Insere as associações aceitas em um único INSERT (sem commit).
+    Quem foi registrado (frequência ou indisponibilidade) por outro pedido
+    depois da validação é ignorado e marcado como recusado em itens.
+    Retorna as associações [(eletricista_id, prefixo)] gravadas.
+    """
+    gravados = inserir_sem_duplicar(db, EquipeDia, [
+        {
+            "eletricista_id": eletricista_id,
+            "prefixo": prefixo,
+            "data": data,
+            "supervisor_registro": supervisor_registro,
+            "usuario_registro": usuario_id
+        }
+        for eletricista_id, prefixo in aceitas
+    ], exceto_em=Indisponibilidade)
+
+    _recusar_nao_gravados(itens, gravados)
+    return [(eletricista_id, prefixo) for eletricista_id, prefixo in aceitas if eletricista_id in gravados]
+
+
+# ============================================
+# INDISPONIBILIDADES
+# ============================================
+def validar_indisponibilidades(db, data, registros):
+    """
+    registros: dicts com eletricista_id, prefixo, tipo_indisponibilidade,
+    motivo_id e observacoes (opcional).
+    Retorna (aceitos, itens):
+      aceitos - [(eletricista, motivo, registro normalizado)] que podem ser gravados
+      itens   - resultado de cada registro recebido, na mesma ordem
+    """
+    normalizados = [
+        {
+            "eletricista_id": _id_inteiro(registro.get('eletricista_id')),
+            "prefixo": (registro.get('prefixo') or '').strip(),
+            "tipo_indisponibilidade": registro.get('tipo_indisponibilidade'),
+            "motivo_id": _id_inteiro(registro.get('motivo_id')),
+            "observacao": registro.get('observacoes') or None
+        }
+        for registro in registros
+    ]
+
+    ids = {r['eletricista_id'] for r in normalizados if r['eletricista_id'] is not None}
+    ids_motivos = {r['motivo_id'] for r in normalizados if r['motivo_id'] is not None}
+
+    eletricistas = {e.id: e for e in db.query(EstruturaEquipes).filter(
+        EstruturaEquipes.id.in_(ids)
+    ).all()} if ids else {}
+    motivos = {m.id: m for m in db.query(MotivoIndisponibilidade).filter(
+        MotivoIndisponibilidade.id.in_(ids_motivos)
+    ).all()} if ids_motivos else {}
+    situacao = situacao_eletricistas(db, data, ids)
+
+    aceitos = []
+    itens = []
+    vistos = set()
+    for registro in normalizados:
+        eletricista_id = registro['eletricista_id']
+        marcas = situacao.get(eletricista_id, set())
+
+        if eletricista_id is None or not registro['prefixo']:
+            motivo = 'invalido'
+        elif registro['tipo_indisponibilidade'] not in TIPOS_INDISPONIBILIDADE:
+            motivo = 'tipo'
+        elif registro['motivo_id'] not in motivos:
+            motivo = 'motivo'
+        elif eletricista_id not in eletricistas:
+            motivo = 'inexistente'
+        elif 'F' in marcas:
+            motivo = 'frequencia'
+        elif 'I' in marcas:
+            motivo = 'indisponivel'
+        elif eletricista_id in vistos:
+            motivo = 'duplicado'
+        else:
+            motivo = None
+            vistos.add(eletricista_id)
+            aceitos.append((eletricistas[eletricista_id], motivos[registro['motivo_id']], registro))
+
+        itens.append(_item(eletricista_id, registro['prefixo'], motivo))
+
+    return aceitos, itens
+
+
+def inserir_indisponibilidades(db, data, aceitos, usuario_id, itens=()):
+    """
+    Insere as indisponibilidades aceitas em um único INSERT (sem commit).
+    Quem foi registrado por outro pedido depois da validação é ignorado
+    e marcado como recusado em itens.
+    Retorna os aceitos [(eletricista, motivo, registro)] gravados.
+    """
+    gravados = inserir_sem_duplicar(db, Indisponibilidade, [
+        {
+            "data": data,
+            "eletricista_id": eletricista.id,
+            "matricula": eletricista.matricula,
+            "prefixo": registro['prefixo'],
+            "tipo_indisponibilidade": registro['tipo_indisponibilidade'],
+            "motivo_id": motivo.id,
+            "observacao": registro['observacao'],
+            "usuario_registro": usuario_id
+        }
+        for eletricista, motivo, registro in aceitos
+    ], exceto_em=EquipeDia)
+
+    _recusar_nao_gravados(itens, gravados)
+    return [aceito for aceito in aceitos if aceito[0].id in gravados]
+
+
+# ============================================
+# REMANEJAMENTOS
+# ============================================
+def validar_remanejamentos(db, data, eletricista_ids, supervisor_destino):
+    """
+    Retorna (aceitos, itens):
+      aceitos - [(eletricista, supervisor anterior ou None)] a remanejar
+      itens   - resultado de cada id recebido, na mesma ordem
+    """
+    normalizados = [_id_inteiro(i) for i in eletricista_ids]
+    ids = {i for i in normalizados if i is not None}
+
+    eletricistas = {e.id: e for e in db.query(EstruturaEquipes).filter(
+        EstruturaEquipes.id.in_(ids)
+    ).all()} if ids else {}
+    destinos = dict(db.query(Remanejamento.eletricista_id, Remanejamento.supervisor_destino).filter(
+        Remanejamento.data == data,
+        Remanejamento.eletricista_id.in_(ids)
+    ).all()) if ids else {}
+    situacao = situacao_eletricistas(db, data, ids)
+
+    aceitos = []
+    itens = []
+    vistos = set()
+    for eletricista_id in normalizados:
+        eletricista = eletricistas.get(eletricista_id)
+        marcas = situacao.get(eletricista_id, set())
+
+        if eletricista_id is None:
+            motivo = 'sem_eletricista'
+        elif eletricista is None:
+            motivo = 'inexistente'
+        elif 'F' in marcas:
+            motivo = 'frequencia'
+        elif 'I' in marcas:
+            motivo = 'indisponivel'
+        elif eletricista_id in vistos:
+            motivo = 'duplicado'
+        elif destinos.get(eletricista_id) == supervisor_destino:
+            motivo = 'remanejado'
+        else:
+            motivo = None
+            vistos.add(eletricista_id)
+            aceitos.append((eletricista, destinos.get(eletricista_id)))
+
+        itens.append({
+            "eletricista_id": eletricista_id,
+            "nome": eletricista.colaborador if eletricista else None,
+            "supervisor_anterior": (destinos.get(eletricista_id) or eletricista.superv_campo) if eletricista else None,
+            "aceito": motivo is None,
+            "motivo": MOTIVOS_REJEICAO.get(motivo)
+        })
+
+    return aceitos, itens
+
+
+def gravar_remanejamentos(db, data, aceitos, supervisor_destino, usuario_id):
+    """
+    Insere os remanejamentos novos e substitui o destino dos existentes
+    em um único comando (sem commit). Retorna o total gravado.
+    """
+    return len(inserir_sem_duplicar(db, Remanejamento, [
+        {
+            "eletricista_id": eletricista.id,
+            "supervisor_origem": eletricista.superv_campo,
+            "supervisor_destino": supervisor_destino,
+            "data": data,
+            "temporario": True,
+            "usuario_registro": usuario_id
+        }
+        for eletricista, _ in aceitos
+    ], atualizar=['supervisor_destino', 'usuario_registro']))
+
+
+# ============================================
+# PEDIDOS COMPLETOS (sem commit)
+# Retornam (resposta, apos_commit): resposta é o JSON do endpoint e
+# apos_commit atualiza os caches do processo - None se nada foi gravado
+# ============================================
+def registrar_frequencia(db, data, associacoes, supervisor_registro, usuario_id):
+    """Pedido de /api/salvar-frequencia"""
+    from resumo_diario import incrementar_frequencia
+
+    # Validar todos os eletricistas em uma consulta (já registrados, inexistentes, repetidos)
+    aceitas, itens = validar_associacoes(db, data, associacoes)
+
+    # Salvar todas as associações aceitas em um único INSERT
+    gravadas = inserir_associacoes(db, data, aceitas, supervisor_registro, usuario_id, itens=itens)
+    rejeitadas = len(itens) - len(gravadas)
+
+    if not gravadas:
+        return {
+            "success": False,
+            "erro": "Nenhuma associação salva: eletricistas já registrados nesta data ou inválidos",
+            "total": 0,
+            "rejeitados": rejeitadas,
+            "itens": itens
+        }, None
+
+    # Atualizar resumo diário na mesma transação
+    incrementar_frequencia(db, data, gravadas, novas=True)
+    ids_salvos = [eletricista_id for eletricista_id, _ in gravadas]
+
+    def apos_commit():
+        from cache_relatorios import cache_relatorios
+        from matriz_presenca import matriz_presenca
+        from registrados_por_data import cache_registrados
+
+        # Relatórios em cache que incluem esta data ficam desatualizados
+        cache_relatorios.invalidar_data(data)
+        matriz_presenca.marcar_presenca(data, ids_salvos)
+        cache_registrados.adicionar_frequencia(data, ids_salvos)
+
+    return {
+        "success": True,
+        "total": len(gravadas),
+        "rejeitados": rejeitadas,
+        "itens": itens,
+        "data": data.strftime('%d/%m/%Y'),
+        "mensagem": f"{len(gravadas)} associação(ões) salva(s) para {data.strftime('%d/%m/%Y')}!"
+        + (f" {rejeitadas} ignorada(s): já registrada(s) ou inválida(s)." if rejeitadas else "")
+    }, apos_commit
+
+
+def registrar_indisponibilidade(db, data, eletricista_id, prefixo, tipo_indisponibilidade,
+                                motivo_id, observacoes, usuario_id):
+    """Pedido de /api/salvar-indisponibilidade (tipo já validado)"""
+    from resumo_diario import incrementar_indisponibilidade
+
+    # Validar eletricista
+    eletricista = db.query(EstruturaEquipes).filter(
+        EstruturaEquipes.id == eletricista_id
+    ).first()
+
+    if not eletricista:
+        return {"success": False, "erro": "Eletricista não encontrado"}, None
+
+    # Validar motivo
+    motivo = db.query(MotivoIndisponibilidade).filter(
+        MotivoIndisponibilidade.id == motivo_id
+    ).first()
+
+    if not motivo:
+        return {"success": False, "erro": "Motivo inválido"}, None
+
+    # Criar indisponibilidade: o próprio INSERT ignora quem já está
+    # INDISPONÍVEL (índice único) ou na FREQUÊNCIA da data
+    gravados = inserir_sem_duplicar(db, Indisponibilidade, [{
+        "data": data,
+        "eletricista_id": eletricista.id,
+        "matricula": eletricista.matricula,
+        "prefixo": prefixo,
+        "tipo_indisponibilidade": tipo_indisponibilidade,
+        "motivo_id": motivo.id,
+        "observacao": observacoes if observacoes else None,
+        "usuario_registro": usuario_id
+    }], exceto_em=EquipeDia)
+
+    if not gravados:
+        situacao = situacao_eletricistas(db, data, {eletricista.id}).get(eletricista.id, set())
+        if 'F' in situacao:
+            erro = f"❌ {eletricista.colaborador} já foi registrado na FREQUÊNCIA hoje! Não pode ser marcado como indisponível."
+        else:
+            erro = f"❌ {eletricista.colaborador} já foi registrado como INDISPONÍVEL hoje!"
+        return {"success": False, "erro": erro}, None
+
+    # Atualizar resumo diário na mesma transação
+    incrementar_indisponibilidade(db, data, eletricista, prefixo, motivo.descricao)
+    id_salvo, descricao_motivo = eletricista.id, motivo.descricao
+
+    def apos_commit():
+        from cache_relatorios import cache_relatorios
+        from matriz_presenca import matriz_presenca
+        from registrados_por_data import cache_registrados
+
+        cache_relatorios.invalidar_data(data)
+        matriz_presenca.marcar_indisponibilidade(data, id_salvo, descricao_motivo)
+        cache_registrados.adicionar_indisponibilidade(data, id_salvo)
+
+    # Mensagem com tipo
+    tipo_texto = "Parcial" if tipo_indisponibilidade == "parcial" else "Total"
+
+    return {
+        "success": True,
+        "data": data.strftime('%d/%m/%Y'),
+        "mensagem": f"Indisponibilidade {tipo_texto} de {eletricista.colaborador} registrada para {data.strftime('%d/%m/%Y')}!"
+    }, apos_commit
+
+
+def registrar_indisponibilidades(db, data, registros, usuario_id):
+    """Pedido de /api/salvar-indisponibilidades"""
+    from resumo_diario import incrementar_indisponibilidades
+
+    # Validar todos os itens com consultas por conjunto (eletricistas, motivos, registros da data)
+    aceitos, itens = validar_indisponibilidades(db, data, registros)
+
+    # Salvar todos os aceitos em um único INSERT
+    gravados = inserir_indisponibilidades(db, data, aceitos, usuario_id=usuario_id, itens=itens)
+    rejeitados = len(itens) - len(gravados)
+
+    if not gravados:
+        return {
+            "success": False,
+            "erro": "Nenhuma indisponibilidade salva: eletricistas já registrados nesta data ou dados inválidos",
+            "total": 0,
+            "rejeitados": rejeitados,
+            "itens": itens
+        }, None
+
+    # Atualizar resumo diário na mesma transação
+    incrementar_indisponibilidades(
+        db,
+        data,
+        [(eletricista, registro['prefixo'], motivo.descricao) for eletricista, motivo, registro in gravados]
+    )
+    salvos = [(eletricista.id, motivo.descricao) for eletricista, motivo, _ in gravados]
+
+    def apos_commit():
+        from cache_relatorios import cache_relatorios
+        from matriz_presenca import matriz_presenca
+        from registrados_por_data import cache_registrados
+
+        cache_relatorios.invalidar_data(data)
+        for eletricista_id, descricao_motivo in salvos:
+            matriz_presenca.marcar_indisponibilidade(data, eletricista_id, descricao_motivo)
+            cache_registrados.adicionar_indisponibilidade(data, eletricista_id)
+
+    return {
+        "success": True,
+        "total": len(gravados),
+        "rejeitados": rejeitados,
+        "itens": itens,
+        "data": data.strftime('%d/%m/%Y'),
+        "mensagem": f"{len(gravados)} indisponibilidade(s) registrada(s) para {data.strftime('%d/%m/%Y')}!"
+        + (f" {rejeitados} ignorada(s): já registrada(s) ou inválida(s)." if rejeitados else "")
+    }, apos_commit
+
+
+def registrar_remanejamento(db, data, eletricista_id, supervisor_destino, usuario_id):
+    """Pedido de /api/remanejar-eletricista (um eletricista)"""
+    from sincronizacao import registrar_alteracoes
+
+    eletricista = db.query(EstruturaEquipes).filter(
+        EstruturaEquipes.id == eletricista_id
+    ).first()
+
+    if not eletricista:
+        return {"success": False, "erro": "Eletricista não encontrado"}, None
+
+    # Já está na FREQUÊNCIA ou INDISPONÍVEL? (uma consulta)
+    situacao = situacao_eletricistas(db, data, {eletricista.id}).get(eletricista.id, set())
+
+    if 'F' in situacao:
+        return {
+            "success": False,
+            "erro": f"❌ {eletricista.colaborador} já foi registrado na FREQUÊNCIA hoje! Não pode ser remanejado."
+        }, None
+
+    if 'I' in situacao:
+        return {
+            "success": False,
+            "erro": f"❌ {eletricista.colaborador} já foi registrado como INDISPONÍVEL hoje! Não pode ser remanejado."
+        }, None
+
+    existente = db.query(Remanejamento).filter(
+        Remanejamento.eletricista_id == eletricista.id,
+        Remanejamento.data == data
+    ).first()
+
+    if existente:
+        if existente.supervisor_destino == supervisor_destino:
+            return {
+                "success": False,
+                "erro": f"❌ {eletricista.colaborador} já está remanejado para sua supervisão!"
+            }, None
+
+        # Remanejado para OUTRA supervisão: substitui o destino
+        origem = existente.supervisor_destino
+        existente.supervisor_destino = supervisor_destino
+        existente.usuario_registro = usuario_id
+        registrar_alteracoes(db, Remanejamento, [(data, eletricista.id)])
+    else:
+        # (se outro pedido criou o do dia nesse meio tempo, o destino é substituído)
+        origem = eletricista.superv_campo
+        gravar_remanejamentos(db, data, [(eletricista, None)], supervisor_destino, usuario_id)
+
+    def apos_commit():
+        from cache_relatorios import cache_relatorios
+        from quadro_registro import cache_quadro_registro
+
+        cache_relatorios.invalidar_data(data)
+        cache_quadro_registro.invalidar_data(data)
+
+    return {
+        "success": True,
+        "mensagem": f"✅ {eletricista.colaborador} remanejado de {origem} para sua supervisão!"
+    }, apos_commit
+
+
+def registrar_remanejamentos(db, data, eletricista_ids, supervisor_destino, usuario_id):
+    """Pedido de /api/remanejar-eletricistas"""
+    # Validar todos de uma vez (frequência, indisponibilidade, remanejamento existente)
+    aceitos, itens = validar_remanejamentos(db, data, eletricista_ids, supervisor_destino)
+    rejeitados = len(itens) - len(aceitos)
+
+    if not aceitos:
+        return {
+            "success": False,
+            "erro": "Nenhum eletricista remanejado: já registrados nesta data, já remanejados ou inválidos",
+            "total": 0,
+            "rejeitados": rejeitados,
+            "itens": itens
+        }, None
+
+    # Novos remanejamentos e troca de destino em um único comando
+    total = gravar_remanejamentos(db, data, aceitos, supervisor_destino, usuario_id)
+
+    def apos_commit():
+        from cache_relatorios import cache_relatorios
+        from quadro_registro import cache_quadro_registro
+
+        cache_relatorios.invalidar_data(data)
+        cache_quadro_registro.invalidar_data(data)
+
+    return {
+        "success": True,
+        "total": total,
+        "rejeitados": rejeitados,
+        "itens": itens,
+        "data": data.strftime('%d/%m/%Y'),
+        "mensagem": f"✅ {total} eletricista(s) remanejado(s) para sua supervisão em {data.strftime('%d/%m/%Y')}!"
+        + (f" {rejeitados} ignorado(s): já registrado(s), já remanejado(s) ou inválido(s)." if rejeitados else "")
+    }, apos_commit
@@ -0,0 +1,110 @@
+"""
+Chaves de idempotência das gravações (cabeçalho Idempotency-Key)
+
+Com conexão ruim em campo o navegador reenvia o mesmo registro. Quando o
+pedido traz Idempotency-Key, a resposta de sucesso é guardada NA MESMA
+transação da gravação; um reenvio com a mesma chave recebe essa resposta
+sem validar nem gravar de novo.
+
+A tabela é compacta: a chave é um hash de 32 caracteres (usuário + rota +
+chave enviada) e as linhas vencem após IDEMPOTENCIA_TTL_H horas (padrão 24),
+sendo apagadas aos poucos pelas próprias gravações.
+"""
+
+import os
+import json
+import time
+import hashlib
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from models import ChaveIdempotencia
+
+CABECALHO_IDEMPOTENCIA = 'Idempotency-Key'
+IDEMPOTENCIA_TTL_H = float(os.getenv('IDEMPOTENCIA_TTL_H', 24))
+TAMANHO_MAXIMO_CHAVE = 255
+
+# Limpeza das chaves vencidas no máximo a cada 10 minutos por processo
+INTERVALO_LIMPEZA = 600
+_ultima_limpeza = 0.0
+
+
+def chave_do_pedido(request, usuario_id, rota):
+    """
+    Chave armazenada para o pedido, ou None sem o cabeçalho.
+    ValueError se a chave enviada for inválida.
+    """
+    return chave_armazenada(usuario_id, rota, request.headers.get(CABECALHO_IDEMPOTENCIA))
+
+
+def chave_armazenada(usuario_id, rota, enviada):
+    """Hash da chave enviada pelo cliente (None se vazia)"""
+    enviada = str(enviada or '').strip()
+    if not enviada:
+        return None
+    if len(enviada) > TAMANHO_MAXIMO_CHAVE:
+        raise ValueError(f"{CABECALHO_IDEMPOTENCIA} inválida (máximo {TAMANHO_MAXIMO_CHAVE} caracteres)")
+
+    return hashlib.sha256(f"{usuario_id}:{rota}:{enviada}".encode('utf-8')).hexdigest()[:32]
+
+
+def resposta_registrada(db, chave):
+    """Resposta guardada para a chave (dict), ou None"""
+    if chave is None:
+        return None
+
+    registro = db.query(ChaveIdempotencia.resposta).filter(
+        ChaveIdempotencia.chave == chave,
+        ChaveIdempotencia.expira_em > datetime.now()
+    ).first()
+    return json.loads(registro[0]) if registro else None
+
+
+def registrar_resposta(db, chave, resposta):
+    """Guarda a resposta sob a chave, na transação da gravação (sem commit)"""
+    global _ultima_limpeza
+
+    if chave is None:
+        return
+
+    agora = datetime.now()
+    if time.monotonic() - _ultima_limpeza > INTERVALO_LIMPEZA:
+        _ultima_limpeza = time.monotonic()
+        db.query(ChaveIdempotencia).filter(
+            ChaveIdempotencia.expira_em <= agora
+        ).delete(synchronize_session=False)
+
+    try:
+        with db.begin_nested():
+            # Chave vencida ainda não apagada: substitui
+            db.query(ChaveIdempotencia).filter(
+                ChaveIdempotencia.chave == chave,
+                ChaveIdempotencia.expira_em <= agora
+            ).delete(synchronize_session=False)
+            db.add(ChaveIdempotencia(
+                chave=chave,
+                resposta=json.dumps(resposta, ensure_ascii=False),
+                expira_em=agora + timedelta(hours=IDEMPOTENCIA_TTL_H)
+            ))
+    except IntegrityError:
+        pass  # pedido simultâneo com a mesma chave já guardou a resposta
+
+
+def com_idempotencia(funcao, chave):
+    """
+    Envolve uma função registrar_* (gravacao_frequencia.py): com a chave já
+    usada devolve a resposta guardada sem gravar; senão grava e guarda.
+    """
+    if chave is None:
+        return funcao
+
+    def registrar(db, *args):
+        anterior = resposta_registrada(db, chave)
+        if anterior is not None:
+            return anterior, None
+
+        resposta, apos_commit = funcao(db, *args)
+        if apos_commit is not None:
+            registrar_resposta(db, chave, resposta)
+        return resposta, apos_commit
+
+    return registrar
@@ -0,0 +1,149 @@
+"""
+Índice de trigramas em memória para o autocomplete de eletricistas
+
+Nome e matrícula dos eletricistas ATIVOS/RESERVA são normalizados
+(maiúsculas, sem acentos) e quebrados em trigramas. Uma busca intersecta
+as listas dos trigramas do termo, confirma a substring e ordena:
+  0. nome ou matrícula começando com o termo
+  1. alguma palavra do nome começando com o termo
+  2. termo no meio do nome/matrícula
+Empates: ordem alfabética do nome.
+
+O índice é carregado na primeira busca, recriado após a importação e
+recarregado a cada BUSCA_INDICE_TTL segundos (importações em outros workers).
+Com BUSCA_INDICE_MEMORIA=0 a busca vai ao banco (busca_normalizada.py).
+"""
+
+import os
+import time
+import threading
+from busca_normalizada import normalizar, buscar_eletricistas_banco
+
+BUSCA_INDICE_TTL = int(os.getenv('BUSCA_INDICE_TTL', 600))
+
+# 0 = buscar direto no banco (colunas normalizadas), sem índice em memória
+BUSCA_INDICE_MEMORIA = os.getenv('BUSCA_INDICE_MEMORIA', '1').lower() in ('1', 'true', 'sim')
+
+
+def trigramas(texto):
+    """Trigramas distintos do texto"""
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceEletricistas:
+    """Índice de trigramas do quadro ativo, seguro para uso entre threads"""
+
+    def __init__(self, ttl=BUSCA_INDICE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._eletricistas = []   # dicts no formato da resposta das APIs
+        self._chaves = []         # (nome normalizado, matrícula) na mesma posição
+        self._trigramas = {}      # trigrama -> set de posições
+        self._carregado_em = None
+
+    def carregar(self, db):
+        """Lê o quadro ativo do banco e recria o índice"""
+        from models import EstruturaEquipes
+        from relatorios import SITUACOES_ATIVAS
+
+        registros = db.query(EstruturaEquipes).filter(
+            EstruturaEquipes.descr_situacao.in_(SITUACOES_ATIVAS)
+        ).all()
+
+        eletricistas = []
+        chaves = []
+        indice = {}
+        for posicao, elet in enumerate(registros):
+            eletricistas.append({
+                "id": elet.id,
+                "nome": elet.colaborador,
+                "matricula": elet.matricula,
+                "base": elet.base,
+                "prefixo": elet.prefixo,
+                "polo": elet.polo,
+                "regional": elet.regional,
+                "superv_original": elet.superv_campo
+            })
+            nome = elet.nome_busca or normalizar(elet.colaborador)
+            matricula = elet.matricula_busca or normalizar(elet.matricula)
+            chaves.append((nome, matricula))
+
+            # '|' separa os campos: trigramas não atravessam nome/matrícula
+            for trigrama in trigramas(f"{nome}|{matricula}"):
+                indice.setdefault(trigrama, set()).add(posicao)
+
+        with self._lock:
+            self._eletricistas = eletricistas
+            self._chaves = chaves
+            self._trigramas = indice
+            self._carregado_em = time.monotonic()
+
+    def invalidar(self):
+        """Força recarga na próxima busca (ex.: nova estrutura importada)"""
+        with self._lock:
+            self._carregado_em = None
+
+    def _expirado(self):
+        with self._lock:
+            return self._carregado_em is None or time.monotonic() - self._carregado_em > self.ttl
+
+    def buscar(self, db, termo, excluir=(), limite=10):
+        """Até `limite` eletricistas que contêm o termo, melhores primeiro"""
+        if self._expirado():
+            self.carregar(db)
+
+        termo = normalizar(termo)
+        if len(termo) < 3:
+            return []
+
+        with self._lock:
+            listas = [self._trigramas.get(t) for t in trigramas(termo)]
+            if not all(listas):
+                return []
+
+            # Interseção começando pela menor lista
+            listas.sort(key=len)
+            candidatos = set(listas[0])
+            for lista in listas[1:]:
+                candidatos &= lista
+
+            encontrados = []
+            for posicao in candidatos:
+                eletricista = self._eletricistas[posicao]
+                if eletricista["id"] in excluir:
+                    continue
+
+                nome, matricula = self._chaves[posicao]
+                if nome.startswith(termo) or matricula.startswith(termo):
+                    ordem = 0
+                elif f" {termo}" in nome:
+                    ordem = 1
+                elif termo in nome or termo in matricula:
+                    ordem = 2
+                else:
+                    continue  # trigramas batem, mas não a substring
+
+                encontrados.append((ordem, nome, eletricista))
+
+        encontrados.sort(key=lambda e: (e[0], e[1]))
+        return [dict(e[2]) for e in encontrados[:limite]]
+
+    def estatisticas(self):
+        """Tamanho do índice"""
+        with self._lock:
+            return {
+                "eletricistas": len(self._eletricistas),
+                "trigramas": len(self._trigramas),
+                "ttl_segundos": self.ttl
+            }
+
+
+# Instância única do processo
+indice_eletricistas = IndiceEletricistas()
+
+
+def pesquisar_eletricistas(db, termo, excluir=(), limite=10):
+    """Busca do autocomplete: índice em memória ou banco, conforme configuração"""
+    if BUSCA_INDICE_MEMORIA:
+        return indice_eletricistas.buscar(db, termo, excluir, limite)
+    return buscar_eletricistas_banco(db, termo, excluir, limite)
@@ -0,0 +1,104 @@
+"""
+Lista ordenada de prefixos em memória para /api/buscar-prefixos
+
+Os pares (prefixo, base) com a contagem de eletricistas são lidos uma vez
+do banco e mantidos ordenados pelo prefixo normalizado:
+  - prefixos que COMEÇAM com o termo: busca binária (bisect)
+  - prefixos que CONTÊM o termo: varredura da lista (conjunto pequeno)
+
+A lista é carregada na primeira busca, recriada após a importação e
+recarregada a cada BUSCA_INDICE_TTL segundos (importações em outros workers).
+"""
+
+import time
+import threading
+from bisect import bisect_left
+from busca_normalizada import normalizar
+from indice_eletricistas import BUSCA_INDICE_TTL
+
+
+class IndicePrefixos:
+    """Prefixos ordenados com base e total de eletricistas"""
+
+    def __init__(self, ttl=BUSCA_INDICE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._chaves = []    # prefixo normalizado, ordenado
+        self._prefixos = []  # dicts da resposta, na mesma posição
+        self._carregado_em = None
+
+    def carregar(self, db):
+        """Lê (prefixo, base, total) do banco e recria a lista"""
+        from models import EstruturaEquipes
+        from sqlalchemy import func
+
+        linhas = db.query(
+            EstruturaEquipes.prefixo,
+            EstruturaEquipes.base,
+            func.count(EstruturaEquipes.id)
+        ).filter(
+            EstruturaEquipes.prefixo.isnot(None),
+            EstruturaEquipes.prefixo != ''
+        ).group_by(
+            EstruturaEquipes.prefixo,
+            EstruturaEquipes.base
+        ).all()
+
+        ordenados = sorted(
+            (normalizar(prefixo), base or '', prefixo, base, total)
+            for prefixo, base, total in linhas
+        )
+
+        with self._lock:
+            self._chaves = [o[0] for o in ordenados]
+            self._prefixos = [
+                {"prefixo": prefixo, "base": base, "total_eletricistas": total}
+                for _, _, prefixo, base, total in ordenados
+            ]
+            self._carregado_em = time.monotonic()
+
+    def invalidar(self):
+        """Força recarga na próxima busca (ex.: nova estrutura importada)"""
+        with self._lock:
+            self._carregado_em = None
+
+    def buscar(self, db, termo, limite=15):
+        """Prefixos que começam com o termo, depois os que o contêm"""
+        with self._lock:
+            expirado = self._carregado_em is None or time.monotonic() - self._carregado_em > self.ttl
+        if expirado:
+            self.carregar(db)
+
+        termo = normalizar(termo)
+        if not termo:
+            return []
+
+        with self._lock:
+            resultado = []
+
+            # 1. Começam com o termo: faixa contígua na lista ordenada
+            inicio = bisect_left(self._chaves, termo)
+            fim = inicio
+            while fim < len(self._chaves) and self._chaves[fim].startswith(termo):
+                fim += 1
+            resultado.extend(self._prefixos[inicio:min(fim, inicio + limite)])
+
+            # 2. Contêm o termo em outra posição
+            if len(resultado) < limite:
+                for i, chave in enumerate(self._chaves):
+                    if inicio <= i < fim or termo not in chave:
+                        continue
+                    resultado.append(self._prefixos[i])
+                    if len(resultado) >= limite:
+                        break
+
+            return [dict(p) for p in resultado]
+
+    def estatisticas(self):
+        """Tamanho da lista"""
+        with self._lock:
+            return {"prefixos": len(self._chaves), "ttl_segundos": self.ttl}
+
+
+# Instância única do processo
+indice_prefixos = IndicePrefixos()
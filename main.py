@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Request, Form, Depends
+from fastapi import FastAPI, Request, Form, Depends, Query
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
@@ -34,6 +34,19 @@ async def startup_event():
     criar_tabelas()
     print("✅ Tabelas criadas!")
     
+    # Colunas/índices de busca normalizada (bancos criados antes delas)
+    from busca_normalizada import preparar_busca_normalizada
+    from database import engine
+    total_preenchidos = preparar_busca_normalizada(engine)
+    if total_preenchidos:
+        print(f"🔎 {total_preenchidos} eletricistas com busca normalizada preenchida")
+    
+    # Índices únicos (eletricista, data) em bancos criados antes deles
+    from registros_unicos import preparar_registros_unicos
+    for tabela, duplicados in preparar_registros_unicos(engine).items():
+        print(f"⚠️ {tabela}: {duplicados} registro(s) duplicado(s), índice único não criado. "
+              f"Rode: python registros_unicos.py --aplicar")
+    
     # Criar usuário admin se não existir
     db = SessionLocal()
     try:
@@ -171,9 +184,25 @@ def listar_datas_historico(db):
         for d in datas
     ]
 
+def descartar_caches_estrutura():
+    """Descarta os caches do processo que dependem da estrutura (após importar/restaurar)"""
+    from cache_relatorios import cache_relatorios
+    from matriz_presenca import matriz_presenca
+    from indice_eletricistas import indice_eletricistas
+    from indice_prefixos import indice_prefixos
+    from snapshot_quadro import snapshot_quadro
+    from quadro_registro import cache_quadro_registro
+    cache_relatorios.limpar()
+    matriz_presenca.limpar()
+    indice_eletricistas.invalidar()
+    indice_prefixos.invalidar()
+    snapshot_quadro.invalidar()
+    cache_quadro_registro.limpar()
+
 def restaurar_historico(db, data_carga):
     """Restaura estrutura de uma data específica"""
     from models import EstruturaEquipes, EstruturaEquipesHistorico
+    from busca_normalizada import preencher_busca
     
     try:
         historicos = db.query(EstruturaEquipesHistorico).filter(
@@ -203,11 +232,13 @@ def restaurar_historico(db, data_carga):
                 superv_operacao=hist.superv_operacao,
                 coordenador=hist.coordenador
             )
+            preencher_busca(registro)
             
             db.add(registro)
             total_restaurados += 1
         
         db.commit()
+        descartar_caches_estrutura()
         return total_restaurados
         
     except Exception as e:
@@ -415,7 +446,7 @@ def registrar_v2_page(
         request.session.clear()
         return RedirectResponse(url="/login")
     
-    from models import EstruturaEquipes, MotivoIndisponibilidade, EquipeDia
+    from models import MotivoIndisponibilidade
     from datetime import datetime
     
     # Definir data (hoje ou data selecionada)
@@ -427,103 +458,10 @@ def registrar_v2_page(
     else:
         data_selecionada = date.today()
     
-    # Buscar IDs dos eletricistas já registrados na data selecionada
-    from models import Indisponibilidade
-    
-    # 1. Registrados na FREQUÊNCIA
-    ids_frequencia = db.query(EquipeDia.eletricista_id).filter(
-        EquipeDia.data == data_selecionada
-    ).all()
-    
-    # 2. Registrados como INDISPONÍVEIS
-    ids_indisponivel = db.query(Indisponibilidade.eletricista_id).filter(
-        Indisponibilidade.data == data_selecionada
-    ).all()
-    
-    # 3. JUNTAR AMBOS (usar set para eliminar duplicatas)
-    ids_ja_registrados = set()
-    ids_ja_registrados.update([i[0] for i in ids_frequencia])
-    ids_ja_registrados.update([i[0] for i in ids_indisponivel])
-    
-    # Converter de volta para lista
-    ids_ja_registrados = list(ids_ja_registrados)
-    
-    # Buscar eletricistas CONSIDERANDO REMANEJAMENTOS
-    supervisor_campo = usuario.base_responsavel
-    
-    # Criar query base
-    query = db.query(EstruturaEquipes)
-
-    # ✅ FILTRAR APENAS ATIVOS E RESERVAS
-    query = query.filter(
-        EstruturaEquipes.descr_situacao.in_(['ATIVO', 'RESERVA'])
-    )  
-    
-    # EXCLUIR eletricistas já registrados na data selecionada
-    if ids_ja_registrados:
-        query = query.filter(~EstruturaEquipes.id.in_(ids_ja_registrados))
-    
-    # Se for ADMIN ou base "Todas", mostra TODOS (que ainda não foram registrados)
-    if not supervisor_campo or supervisor_campo.upper() == "TODAS":
-        eletricistas = query.order_by(EstruturaEquipes.colaborador).all()
-        
-        # Buscar todos os prefixos únicos
-        prefixos_supervisor = db.query(EstruturaEquipes.prefixo).distinct().all()
-    else:
-        # PARA SUPERVISORES: CONSIDERAR REMANEJAMENTOS ATIVOS
-        from models import Remanejamento
-        
-        # 1. Buscar eletricistas ORIGINAIS da supervisão
-        eletricistas_originais = query.filter(
-            EstruturaEquipes.superv_campo == supervisor_campo
-        ).all()
-        
-        # 2. Buscar remanejamentos ATIVOS para a data selecionada
-        remanejamentos_ativos = db.query(Remanejamento).filter(
-            Remanejamento.data == data_selecionada
-        ).all()
-        
-        # 3. Criar dicionário de remanejamentos: {eletricista_id: destino}
-        remanejamentos_dict = {}
-        for r in remanejamentos_ativos:
-            remanejamentos_dict[r.eletricista_id] = r.supervisor_destino
-        
-        # 4. FILTRAR eletricistas: REMOVER os remanejados PARA OUTRA BASE
-        eletricistas_filtrados = []
-        for elet in eletricistas_originais:
-            # Se foi remanejado para outra base, NÃO mostrar
-            if elet.id in remanejamentos_dict:
-                if remanejamentos_dict[elet.id] != supervisor_campo:
-                    continue  # Pula (foi para outra base)
-            eletricistas_filtrados.append(elet)        
-        
-        # 5. ADICIONAR eletricistas que foram REMANEJADOS PARA ESTA BASE
-        for r in remanejamentos_ativos:
-            if r.supervisor_destino == supervisor_campo:
-                # ✅ NÃO adicionar se já foi registrado (Frequência ou Indisponibilidade)
-                if r.eletricista_id in ids_ja_registrados:
-                    continue  # Pula este eletricista
-                
-                # Buscar dados do eletricista remanejado
-                elet_remanejado = db.query(EstruturaEquipes).filter(
-                    EstruturaEquipes.id == r.eletricista_id
-                ).first()
-                
-                if elet_remanejado:
-                    # Verificar se já não está na lista (evitar duplicatas)
-                    if not any(e.id == elet_remanejado.id for e in eletricistas_filtrados):
-                        eletricistas_filtrados.append(elet_remanejado)
-        
-        # Ordenar por nome
-        eletricistas_filtrados.sort(key=lambda x: x.colaborador)
-        eletricistas = eletricistas_filtrados
-        
-        # Buscar prefixos da supervisão
-        prefixos_supervisor = db.query(EstruturaEquipes.prefixo).filter(
-            EstruturaEquipes.superv_campo == supervisor_campo
-        ).distinct().all()
-    
-    prefixos_supervisor = [p[0] for p in prefixos_supervisor if p[0]]
+    # Eletricistas da supervisão (considerando remanejamentos da data) e
+    # prefixos, do cache por supervisor/data; os já registrados saem aqui
+    from quadro_registro import quadro_para_registro
+    eletricistas, prefixos_supervisor = quadro_para_registro(db, usuario.base_responsavel, data_selecionada)
     
     # Buscar motivos
     motivos = db.query(MotivoIndisponibilidade).order_by(
@@ -567,10 +505,15 @@ async def salvar_frequencia(
     if not usuario:
         return JSONResponse({"success": False, "erro": "Usuário não encontrado"})
     
-    from models import EquipeDia
+    from gravacao_frequencia import registrar_frequencia
+    from fila_gravacao import gravar
+    from idempotencia import chave_do_pedido, com_idempotencia
     from datetime import datetime
     
     try:
+        # Reenvio com a mesma Idempotency-Key recebe a resposta original
+        chave = chave_do_pedido(request, usuario.id, 'salvar-frequencia')
+        
         # Ler JSON do body
         body = await request.json()
         associacoes = body.get('associacoes', [])
@@ -588,27 +531,17 @@ async def salvar_frequencia(
         else:
             data_obj = date.today()
         
-        # Salvar cada associação
-        total_salvo = 0
-        for assoc in associacoes:
-            nova_equipe = EquipeDia(
-                eletricista_id=assoc['eletricista_id'],
-                prefixo=assoc['prefixo'],
-                data=data_obj,
-                supervisor_registro=usuario.base_responsavel or usuario.nome,
-                usuario_registro=usuario.id  # ← ADICIONAR ESTA LINHA
-            )
-            db.add(nova_equipe)
-            total_salvo += 1
-        
-        db.commit()
-        
-        return JSONResponse({
-            "success": True,
-            "total": total_salvo,
-            "data": data_obj.strftime('%d/%m/%Y'),
-            "mensagem": f"{total_salvo} associação(ões) salva(s) para {data_obj.strftime('%d/%m/%Y')}!"
-        })
+        # Validar, salvar em um único INSERT e atualizar o resumo
+        # (direto ou pela fila de gravação em grupo, se habilitada)
+        resposta = await gravar(
+            db,
+            com_idempotencia(registrar_frequencia, chave),
+            data_obj,
+            associacoes,
+            usuario.base_responsavel or usuario.nome,
+            usuario.id
+        )
+        return JSONResponse(resposta)
         
     except Exception as e:
         db.rollback()
@@ -633,9 +566,14 @@ async def remanejar_eletricista(
     if not usuario:
         return JSONResponse({"success": False, "erro": "Usuário não encontrado"})
     
-    from models import Remanejamento, EstruturaEquipes, EquipeDia, Indisponibilidade
+    from gravacao_frequencia import registrar_remanejamento
+    from fila_gravacao import gravar
+    from idempotencia import chave_do_pedido, com_idempotencia
     
     try:
+        # Reenvio com a mesma Idempotency-Key recebe a resposta original
+        chave = chave_do_pedido(request, usuario.id, 'remanejar-eletricista')
+        
         # Ler JSON do body
         body = await request.json()
         eletricista_id = body.get('eletricista_id')
@@ -643,82 +581,76 @@ async def remanejar_eletricista(
         if not eletricista_id:
             return JSONResponse({"success": False, "erro": "ID do eletricista não informado"})
         
-        # Buscar eletricista
-        eletricista = db.query(EstruturaEquipes).filter(
-            EstruturaEquipes.id == eletricista_id
-        ).first()
-        
-        if not eletricista:
-            return JSONResponse({"success": False, "erro": "Eletricista não encontrado"})
-        
-        hoje = date.today()
-        
-        # ✅ VALIDAÇÃO 1: Verificar se já está na FREQUÊNCIA
-        ja_na_frequencia = db.query(EquipeDia).filter(
-            EquipeDia.eletricista_id == eletricista_id,
-            EquipeDia.data == hoje
-        ).first()
+        # Validar (frequência, indisponibilidade, remanejamento existente) e gravar
+        resposta = await gravar(
+            db,
+            com_idempotencia(registrar_remanejamento, chave),
+            date.today(),
+            eletricista_id,
+            usuario.base_responsavel or usuario.nome,
+            usuario.id
+        )
+        return JSONResponse(resposta)
         
-        if ja_na_frequencia:
-            return JSONResponse({
-                "success": False,
-                "erro": f"❌ {eletricista.colaborador} já foi registrado na FREQUÊNCIA hoje! Não pode ser remanejado."
-            })
+    except Exception as e:
+        db.rollback()
+        return JSONResponse({
+            "success": False,
+            "erro": str(e)
+        })
+
+
+@app.post("/api/remanejar-eletricistas")
+async def remanejar_eletricistas(
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """Remanejar vários eletricistas para a supervisão do usuário em uma data"""
+    
+    # Verificar autenticação
+    if not verificar_autenticacao(request):
+        return JSONResponse({"success": False, "erro": "Não autenticado"})
+    
+    usuario = get_usuario_logado(request, db)
+    if not usuario:
+        return JSONResponse({"success": False, "erro": "Usuário não encontrado"})
+    
+    from gravacao_frequencia import registrar_remanejamentos
+    from fila_gravacao import gravar
+    from idempotencia import chave_do_pedido, com_idempotencia
+    from datetime import datetime
+    
+    try:
+        # Reenvio com a mesma Idempotency-Key recebe a resposta original
+        chave = chave_do_pedido(request, usuario.id, 'remanejar-eletricistas')
         
-        # ✅ VALIDAÇÃO 2: Verificar se já está INDISPONÍVEL
-        ja_indisponivel = db.query(Indisponibilidade).filter(
-            Indisponibilidade.eletricista_id == eletricista_id,
-            Indisponibilidade.data == hoje
-        ).first()
+        # Ler JSON do body
+        body = await request.json()
+        eletricista_ids = body.get('eletricista_ids', [])
+        data_registro = body.get('data', None)
         
-        if ja_indisponivel:
-            return JSONResponse({
-                "success": False,
-                "erro": f"❌ {eletricista.colaborador} já foi registrado como INDISPONÍVEL hoje! Não pode ser remanejado."
-            })
+        if not eletricista_ids:
+            return JSONResponse({"success": False, "erro": "Nenhum eletricista informado"})
         
-        # ✅ VALIDAÇÃO 3: Verificar se já existe remanejamento
-        remanejamento_existente = db.query(Remanejamento).filter(
-            Remanejamento.eletricista_id == eletricista_id,
-            Remanejamento.data == hoje
-        ).first()
-        
-        if remanejamento_existente:
-            # Se já está remanejado para ESTA supervisão
-            if remanejamento_existente.supervisor_destino == usuario.base_responsavel:
-                return JSONResponse({
-                    "success": False,
-                    "erro": f"❌ {eletricista.colaborador} já está remanejado para sua supervisão!"
-                })
-            
-            # Se está remanejado para OUTRA supervisão → ATUALIZAR
-            supervisor_anterior = remanejamento_existente.supervisor_destino
-            remanejamento_existente.supervisor_destino = usuario.base_responsavel or usuario.nome
-            remanejamento_existente.usuario_registro = usuario.id
-            db.commit()
-            
-            return JSONResponse({
-                "success": True,
-                "mensagem": f"✅ {eletricista.colaborador} remanejado de {supervisor_anterior} para sua supervisão!"
-            })
+        # Definir data (hoje ou data informada)
+        if data_registro:
+            try:
+                data_obj = datetime.strptime(data_registro, '%Y-%m-%d').date()
+            except:
+                data_obj = date.today()
+        else:
+            data_obj = date.today()
         
-        # ✅ CRIAR NOVO REMANEJAMENTO
-        novo_remanejamento = Remanejamento(
-            eletricista_id=eletricista_id,
-            supervisor_origem=eletricista.superv_campo,
-            supervisor_destino=usuario.base_responsavel or usuario.nome,
-            data=hoje,
-            temporario=True,
-            usuario_registro=usuario.id
+        # Validar todos de uma vez e gravar em um único comando
+        resposta = await gravar(
+            db,
+            com_idempotencia(registrar_remanejamentos, chave),
+            data_obj,
+            eletricista_ids,
+            usuario.base_responsavel or usuario.nome,
+            usuario.id
         )
-        
-        db.add(novo_remanejamento)
-        db.commit()
-        
-        return JSONResponse({
-            "success": True,
-            "mensagem": f"✅ {eletricista.colaborador} remanejado de {eletricista.superv_campo} para sua supervisão!"
-        })
+        return JSONResponse(resposta)
         
     except Exception as e:
         db.rollback()
@@ -743,10 +675,15 @@ async def salvar_indisponibilidade(
     if not usuario:
         return JSONResponse({"success": False, "erro": "Usuário não encontrado"})
     
-    from models import Indisponibilidade, EstruturaEquipes, MotivoIndisponibilidade, EquipeDia
+    from gravacao_frequencia import registrar_indisponibilidade
+    from fila_gravacao import gravar
+    from idempotencia import chave_do_pedido, com_idempotencia
     from datetime import datetime
     
     try:
+        # Reenvio com a mesma Idempotency-Key recebe a resposta original
+        chave = chave_do_pedido(request, usuario.id, 'salvar-indisponibilidade')
+        
         # Ler dados do formulário
         form_data = await request.form()
         
@@ -773,68 +710,160 @@ async def salvar_indisponibilidade(
         else:
             data_obj = date.today()
         
-        # Validar eletricista
-        eletricista = db.query(EstruturaEquipes).filter(
-            EstruturaEquipes.id == eletricista_id
-        ).first()
+        # Validar, salvar e atualizar o resumo
+        # (direto ou pela fila de gravação em grupo, se habilitada)
+        resposta = await gravar(
+            db,
+            com_idempotencia(registrar_indisponibilidade, chave),
+            data_obj,
+            eletricista_id,
+            prefixo,
+            tipo_indisponibilidade,
+            motivo_id,
+            observacoes,
+            usuario.id
+        )
+        return JSONResponse(resposta)
         
-        if not eletricista:
-            return JSONResponse({"success": False, "erro": "Eletricista não encontrado"})
+    except Exception as e:
+        db.rollback()
+        return JSONResponse({
+            "success": False,
+            "erro": str(e)
+        })
 
-        # Verificar se já foi registrado na FREQUÊNCIA hoje
-        ja_na_frequencia = db.query(EquipeDia).filter(
-            EquipeDia.eletricista_id == eletricista_id,
-            EquipeDia.data == data_obj
-        ).first()
+
+@app.post("/api/salvar-indisponibilidades")
+async def salvar_indisponibilidades(
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """Salvar indisponibilidades em lote (JSON), com resultado por item"""
+    
+    # Verificar autenticação
+    if not verificar_autenticacao(request):
+        return JSONResponse({"success": False, "erro": "Não autenticado"})
+    
+    usuario = get_usuario_logado(request, db)
+    if not usuario:
+        return JSONResponse({"success": False, "erro": "Usuário não encontrado"})
+    
+    from gravacao_frequencia import registrar_indisponibilidades
+    from fila_gravacao import gravar
+    from idempotencia import chave_do_pedido, com_idempotencia
+    from datetime import datetime
+    
+    try:
+        # Reenvio com a mesma Idempotency-Key recebe a resposta original
+        chave = chave_do_pedido(request, usuario.id, 'salvar-indisponibilidades')
         
-        if ja_na_frequencia:
-            return JSONResponse({
-                "success": False,
-                "erro": f"❌ {eletricista.colaborador} já foi registrado na FREQUÊNCIA hoje! Não pode ser marcado como indisponível."
-            })
+        # Ler JSON do body
+        body = await request.json()
+        registros = body.get('indisponibilidades', [])
+        data_registro = body.get('data', None)
+        
+        if not registros:
+            return JSONResponse({"success": False, "erro": "Nenhuma indisponibilidade enviada"})
         
-        # Verificar se já foi registrado como INDISPONÍVEL hoje
-        ja_indisponivel = db.query(Indisponibilidade).filter(
-            Indisponibilidade.eletricista_id == eletricista_id,
-            Indisponibilidade.data == data_obj
-        ).first()
+        # Definir data (hoje ou data informada)
+        if data_registro:
+            try:
+                data_obj = datetime.strptime(data_registro, '%Y-%m-%d').date()
+            except:
+                data_obj = date.today()
+        else:
+            data_obj = date.today()
+        
+        # Validar por conjunto, salvar em um único INSERT e atualizar o resumo
+        # (direto ou pela fila de gravação em grupo, se habilitada)
+        resposta = await gravar(
+            db,
+            com_idempotencia(registrar_indisponibilidades, chave),
+            data_obj,
+            registros,
+            usuario.id
+        )
+        return JSONResponse(resposta)
         
-        if ja_indisponivel:
+    except Exception as e:
+        db.rollback()
+        return JSONResponse({
+            "success": False,
+            "erro": str(e)
+        })
+
+
+@app.post("/api/sincronizar")
+async def sincronizar(
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    Sincronização incremental do registro: grava as operações pendentes
+    (guardadas offline) e devolve o que mudou na data depois do cursor
+    """
+    
+    # Verificar autenticação
+    if not verificar_autenticacao(request):
+        return JSONResponse({"success": False, "erro": "Não autenticado"})
+    
+    usuario = get_usuario_logado(request, db)
+    if not usuario:
+        return JSONResponse({"success": False, "erro": "Usuário não encontrado"})
+    
+    from sincronizacao import alteracoes_desde, pedido_pendente, SYNC_MAX_PENDENTES
+    from fila_gravacao import gravar
+    from idempotencia import chave_armazenada, com_idempotencia
+    from datetime import datetime
+    
+    try:
+        # Ler JSON do body
+        body = await request.json()
+        data_registro = body.get('data', None)
+        pendentes = body.get('pendentes') or []
+        
+        try:
+            cursor = int(body.get('cursor') or 0)
+        except (TypeError, ValueError):
+            return JSONResponse({"success": False, "erro": "Cursor inválido"})
+        
+        if not isinstance(pendentes, list) or len(pendentes) > SYNC_MAX_PENDENTES:
             return JSONResponse({
                 "success": False,
-                "erro": f"❌ {eletricista.colaborador} já foi registrado como INDISPONÍVEL hoje!"
+                "erro": f"Envie no máximo {SYNC_MAX_PENDENTES} operações pendentes por vez"
             })
         
-        # Validar motivo
-        motivo = db.query(MotivoIndisponibilidade).filter(
-            MotivoIndisponibilidade.id == motivo_id
-        ).first()
-        
-        if not motivo:
-            return JSONResponse({"success": False, "erro": "Motivo inválido"})
-        
-        # Criar indisponibilidade
-        nova_indisponibilidade = Indisponibilidade(
-            data=data_obj,
-            eletricista_id=eletricista_id,
-            matricula=eletricista.matricula,
-            prefixo=prefixo,
-            tipo_indisponibilidade=tipo_indisponibilidade,  # ← ADICIONAR
-            motivo_id=motivo_id,
-            observacao=observacoes if observacoes else None,
-            usuario_registro=usuario.id
-        )
+        # Definir data (hoje ou data informada)
+        if data_registro:
+            try:
+                data_obj = datetime.strptime(data_registro, '%Y-%m-%d').date()
+            except:
+                data_obj = date.today()
+        else:
+            data_obj = date.today()
         
-        db.add(nova_indisponibilidade)
-        db.commit()
+        supervisor = usuario.base_responsavel or usuario.nome
         
-        # Mensagem com tipo
-        tipo_texto = "Parcial" if tipo_indisponibilidade == "parcial" else "Total"
+        # Operações pendentes, na ordem em que foram feitas
+        resultados = []
+        for pendente in pendentes:
+            chave_enviada = pendente.get('chave') if isinstance(pendente, dict) else None
+            try:
+                rota, funcao, argumentos = pedido_pendente(pendente, supervisor, usuario.id)
+                chave = chave_armazenada(usuario.id, rota, chave_enviada)
+                resposta = await gravar(db, com_idempotencia(funcao, chave), *argumentos)
+            except Exception as e:
+                # Uma operação com erro não impede as outras (nem a retirada
+                # delas da fila do navegador)
+                db.rollback()
+                resposta = {"success": False, "erro": str(e)}
+            resultados.append({"chave": chave_enviada, **resposta})
         
         return JSONResponse({
             "success": True,
-            "data": data_obj.strftime('%d/%m/%Y'),
-            "mensagem": f"Indisponibilidade {tipo_texto} de {eletricista.colaborador} registrada para {data_obj.strftime('%d/%m/%Y')}!"
+            "supervisor": supervisor,
+            "resultados": resultados,
+            **alteracoes_desde(db, data_obj, cursor)
         })
         
     except Exception as e:
@@ -859,7 +888,8 @@ def buscar_eletricistas(
     API para buscar eletricistas por nome.
     Para INDISPONIBILIDADE: exclui apenas os já registrados como indisponíveis.
     """
-    from models import EstruturaEquipes, Indisponibilidade
+    from indice_eletricistas import pesquisar_eletricistas
+    from registrados_por_data import cache_registrados
     from datetime import datetime
     
     # Verificar se tem termo de busca
@@ -879,36 +909,12 @@ def buscar_eletricistas(
     # EXCLUIR APENAS os já registrados como INDISPONÍVEIS
     # (não excluir os da frequência, pois eles podem ficar indisponíveis)
     
-    ids_indisponivel = db.query(Indisponibilidade.eletricista_id).filter(
-        Indisponibilidade.data == data_obj
-    ).all()
-    
-    ids_ja_registrados = [i[0] for i in ids_indisponivel]
-    
-    # Buscar eletricistas (case-insensitive) EXCLUINDO os já registrados como indisponíveis
-    query = db.query(EstruturaEquipes).filter(
-        EstruturaEquipes.colaborador.ilike(f"%{q}%"),        
-        EstruturaEquipes.descr_situacao.in_(['ATIVO', 'RESERVA'])  # ← ADICIONAR FILTRO
-    )
+    _, ids_ja_registrados = cache_registrados.obter(db, data_obj)
     
-    # EXCLUIR apenas os já registrados como INDISPONÍVEIS
-    if ids_ja_registrados:
-        query = query.filter(~EstruturaEquipes.id.in_(ids_ja_registrados))
-    
-    eletricistas = query.limit(10).all()
-    
-    # Formatar resultado
-    resultado = []
-    for elet in eletricistas:
-        resultado.append({
-            "id": elet.id,
-            "nome": elet.colaborador,
-            "matricula": elet.matricula,
-            "base": elet.base,
-            "prefixo": elet.prefixo,
-            "polo": elet.polo,
-            "regional": elet.regional
-        })
+    # Buscar ATIVOS/RESERVA (sem acento/maiúsculas) EXCLUINDO os já registrados como indisponíveis
+    resultado = pesquisar_eletricistas(db, q, excluir=ids_ja_registrados)
+    for elet in resultado:
+        elet.pop("superv_original")
     
     return JSONResponse({"eletricistas": resultado})
 
@@ -923,7 +929,8 @@ def buscar_eletricistas_remanejar(
     Exclui apenas os já registrados em Frequência ou Indisponibilidade.
     NÃO exclui os já remanejados (para permitir atualização).
     """
-    from models import EstruturaEquipes, EquipeDia, Indisponibilidade
+    from indice_eletricistas import pesquisar_eletricistas
+    from registrados_por_data import cache_registrados
     from datetime import datetime
     
     # Verificar se tem termo de busca
@@ -939,49 +946,13 @@ def buscar_eletricistas_remanejar(
     else:
         data_obj = date.today()
     
-    # Buscar IDs dos eletricistas que NÃO podem ser remanejados
-    # 1. Registrados na FREQUÊNCIA (qualquer base)
-    ids_frequencia = db.query(EquipeDia.eletricista_id).filter(
-        EquipeDia.data == data_obj
-    ).all()
-    
-    # 2. Registrados como INDISPONÍVEIS (qualquer base)
-    ids_indisponivel = db.query(Indisponibilidade.eletricista_id).filter(
-        Indisponibilidade.data == data_obj
-    ).all()
-    
-    # Juntar IDs (NÃO incluir remanejamentos aqui!)
-    ids_bloqueados = set()
-    ids_bloqueados.update([i[0] for i in ids_frequencia])
-    ids_bloqueados.update([i[0] for i in ids_indisponivel])
-    
-    ids_bloqueados = list(ids_bloqueados)
+    # IDs dos eletricistas que NÃO podem ser remanejados:
+    # registrados na FREQUÊNCIA ou como INDISPONÍVEIS (qualquer base)
+    # (NÃO incluir remanejamentos aqui!)
+    ids_bloqueados = cache_registrados.registrados(db, data_obj)
     
-    # Buscar eletricistas (case-insensitive) EXCLUINDO os bloqueados
-    query = db.query(EstruturaEquipes).filter(
-        EstruturaEquipes.colaborador.ilike(f"%{q}%"),
-        EstruturaEquipes.descr_situacao.in_(['ATIVO', 'RESERVA'])  # ← ADICIONAR FILTRO
-    )
-    
-    # EXCLUIR apenas os em Frequência ou Indisponíveis
-    if ids_bloqueados:
-        query = query.filter(~EstruturaEquipes.id.in_(ids_bloqueados))
-    
-    eletricistas = query.limit(10).all()
-    
-    # Formatar resultado
-    resultado = []
-    for elet in eletricistas:
-        resultado.append({
-            "id": elet.id,
-            "nome": elet.colaborador,
-            "matricula": elet.matricula,
-            "base": elet.base,
-            "prefixo": elet.prefixo,
-            "polo": elet.polo,
-            "regional": elet.regional,
-            "superv_original": elet.superv_campo
-        })
+    # Buscar ATIVOS/RESERVA (sem acento/maiúsculas) EXCLUINDO os em Frequência ou Indisponíveis
+    resultado = pesquisar_eletricistas(db, q, excluir=ids_bloqueados)
     
     return JSONResponse({"eletricistas": resultado})
 
@@ -991,38 +962,78 @@ def buscar_prefixos(q: str = "", db: Session = Depends(get_db)):
     API para buscar prefixos de equipes.
     Retorna JSON com lista de prefixos únicos que correspondem à busca.
     """
-    from models import EstruturaEquipes
-    from sqlalchemy import func
+    from indice_prefixos import indice_prefixos
     
     # Verificar se tem termo de busca
     if not q or len(q) < 3:
         return JSONResponse({"prefixos": []})
     
-    # Buscar prefixos únicos (case-insensitive)
-    # Agrupa por prefixo e conta quantas equipes têm esse prefixo
-    prefixos = db.query(
-        EstruturaEquipes.prefixo,
-        EstruturaEquipes.base,
-        func.count(EstruturaEquipes.id).label('total_eletricistas')
-    ).filter(
-        EstruturaEquipes.prefixo.ilike(f"%{q}%")
-    ).group_by(
-        EstruturaEquipes.prefixo,
-        EstruturaEquipes.base
-    ).limit(15).all()
-    
-    # Formatar resultado
-    resultado = []
-    for prefixo_obj in prefixos:
-        resultado.append({
-            "prefixo": prefixo_obj.prefixo,
-            "base": prefixo_obj.base,
-            "total_eletricistas": prefixo_obj.total_eletricistas
-        })
+    # Prefixos únicos (prefixo + base) com total de eletricistas, da lista em memória
+    # (primeiro os que começam com o termo, depois os que o contêm)
+    resultado = indice_prefixos.buscar(db, q)
     
     return JSONResponse({"prefixos": resultado})
 
 
+@app.get("/api/roster-snapshot")
+def roster_snapshot(request: Request, db: Session = Depends(get_db)):
+    """
+    Quadro ATIVO/RESERVA em formato colunar para a busca no navegador.
+    ETag = versão do quadro: com If-None-Match igual, responde 304.
+    """
+    from fastapi.responses import Response
+    from snapshot_quadro import snapshot_quadro
+    
+    # Verificar autenticação
+    if not verificar_autenticacao(request):
+        return JSONResponse({"success": False, "erro": "Não autenticado"})
+    
+    versao, corpo, corpo_gzip = snapshot_quadro.obter(db)
+    cabecalhos = {
+        "ETag": f'"{versao}"',
+        "Cache-Control": "private, no-cache",  # sempre revalidar (barato: 304)
+        "Vary": "Accept-Encoding"
+    }
+    
+    if request.headers.get("if-none-match") == f'"{versao}"':
+        return Response(status_code=304, headers=cabecalhos)
+    
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        cabecalhos["Content-Encoding"] = "gzip"
+        corpo = corpo_gzip
+    
+    return Response(content=corpo, media_type="application/json", headers=cabecalhos)
+
+
+@app.get("/api/roster-snapshot/registrados")
+def roster_snapshot_registrados(request: Request, data: str = None, db: Session = Depends(get_db)):
+    """IDs já registrados na data (complemento do snapshot, buscado ao abrir a página)"""
+    from registrados_por_data import cache_registrados
+    from datetime import datetime
+    
+    # Verificar autenticação
+    if not verificar_autenticacao(request):
+        return JSONResponse({"success": False, "erro": "Não autenticado"})
+    
+    # Definir data (hoje ou data informada)
+    if data:
+        try:
+            data_obj = datetime.strptime(data, '%Y-%m-%d').date()
+        except:
+            data_obj = date.today()
+    else:
+        data_obj = date.today()
+    
+    frequencia, indisponiveis = cache_registrados.obter(db, data_obj)
+    
+    return JSONResponse({
+        "success": True,
+        "data": data_obj.isoformat(),
+        "frequencia": sorted(frequencia),
+        "indisponiveis": sorted(indisponiveis)
+    })
+
+
 # ========================================
 # ROTA DE DEBUG
 # ========================================
@@ -1076,6 +1087,7 @@ async def importar_eletricistas(request: Request, arquivo: UploadFile = File(...
     usuario = get_usuario_logado(request, db)
     
     from models import EstruturaEquipes
+    from busca_normalizada import preencher_busca
     import csv
     import io
     
@@ -1143,6 +1155,7 @@ async def importar_eletricistas(request: Request, arquivo: UploadFile = File(...
                 eletricista_existente.placas = str(row.get('placas', '')).strip()
                 eletricista_existente.tipo_equipe = str(row.get('tipo_equipe', '')).strip()
                 eletricista_existente.processo_equipe = str(row.get('processo_equipe', '')).strip()
+                preencher_busca(eletricista_existente)
                 
                 total_atualizados += 1
             else:
@@ -1163,12 +1176,21 @@ async def importar_eletricistas(request: Request, arquivo: UploadFile = File(...
                     tipo_equipe=str(row.get('tipo_equipe', '')).strip(),
                     processo_equipe=str(row.get('processo_equipe', '')).strip()
                 )
+                preencher_busca(novo_eletricista)
                 db.add(novo_eletricista)
                 total_novos += 1
         
         # Commit
         db.commit()
         
+        # Intervalos de vigência (estrutura "na data" dos relatórios)
+        from vigencia_estrutura import reconstruir_vigencia
+        total_intervalos = reconstruir_vigencia(db)
+        print(f"🗓️ {total_intervalos} intervalos de vigência recalculados")
+        
+        # Nova estrutura muda todos os relatórios (quadro ativo, supervisores)
+        descartar_caches_estrutura()
+        
         print(f"✅ {total_novos} novos, {total_atualizados} atualizados")
         print("="*60 + "\n")
         
@@ -1695,6 +1717,7 @@ def relatorio_geral(
     request: Request,
     data_inicio: str = None,
     data_fim: str = None,
+    formato: str = Query(None, alias="format"),
     db: Session = Depends(get_db)
 ):
     """API para gerar relatório GERAL (consolidado de todos)"""
@@ -1707,114 +1730,35 @@ def relatorio_geral(
     if not usuario:
         return JSONResponse({"success": False, "erro": "Usuário não encontrado"})
     
-    from models import EstruturaEquipes, EquipeDia, Indisponibilidade, MotivoIndisponibilidade
-    from datetime import datetime, timedelta
-    from sqlalchemy import func
+    from relatorios import definir_periodo, calcular_relatorio_geral
+    from cache_relatorios import relatorio_em_cache
+    from exportacao import FORMATOS_EXPORTACAO, resposta_exportacao, nome_exportacao, COLUNAS_GERAL, linhas_relatorio_geral
+    
+    if formato and formato not in FORMATOS_EXPORTACAO:
+        return JSONResponse({"success": False, "erro": "Formato inválido (use csv ou ndjson)"})
     
     try:
         # Definir período
-        if data_inicio and data_fim:
-            data_inicio_obj = datetime.strptime(data_inicio, '%Y-%m-%d').date()
-            data_fim_obj = datetime.strptime(data_fim, '%Y-%m-%d').date()
-        elif data_inicio:
-            data_inicio_obj = datetime.strptime(data_inicio, '%Y-%m-%d').date()
-            data_fim_obj = data_inicio_obj
-        else:
-            data_inicio_obj = date.today()
-            data_fim_obj = date.today()
-        
-        # Buscar total de eletricistas ATIVOS/RESERVA
-        total_eletricistas = db.query(EstruturaEquipes).filter(
-            EstruturaEquipes.descr_situacao.in_(['ATIVO', 'RESERVA'])
-        ).count()
-        
-        # Criar lista de datas no período
-        dias_periodo = []
-        data_atual = data_inicio_obj
-        while data_atual <= data_fim_obj:
-            dias_periodo.append(data_atual)
-            data_atual += timedelta(days=1)
-        
-        # Dicionário para contar
-        resultado = {
-            "PRESENTE": 0,
-            "NÃO REGISTRADO": 0
-        }
-        
-        # Para cada dia no período
-        for dia in dias_periodo:
-            # 1. PRESENTES (frequência)
-            ids_presentes = db.query(EquipeDia.eletricista_id).filter(
-                EquipeDia.data == dia
-            ).all()
-            ids_presentes = set([p[0] for p in ids_presentes])
-            
-            resultado["PRESENTE"] += len(ids_presentes)
-            
-            # 2. INDISPONÍVEIS com motivo
-            indisponiveis = db.query(
-                Indisponibilidade.eletricista_id,
-                MotivoIndisponibilidade.descricao
-            ).join(
-                MotivoIndisponibilidade,
-                Indisponibilidade.motivo_id == MotivoIndisponibilidade.id
-            ).filter(
-                Indisponibilidade.data == dia
-            ).all()
-            
-            ids_indisponiveis = set([i[0] for i in indisponiveis])
-            
-            # Contar por motivo (em MAIÚSCULAS)
-            for elet_id, motivo in indisponiveis:
-                motivo_upper = motivo.upper()
-                if motivo_upper not in resultado:
-                    resultado[motivo_upper] = 0
-                resultado[motivo_upper] += 1
-            
-            # 3. NÃO REGISTRADOS
-            ids_registrados = ids_presentes.union(ids_indisponiveis)
-            
-            total_nao_registrados = db.query(EstruturaEquipes.id).filter(
-                EstruturaEquipes.descr_situacao.in_(['ATIVO', 'RESERVA']),
-                ~EstruturaEquipes.id.in_(list(ids_registrados))
-            ).count()
-            
-            resultado["NÃO REGISTRADO"] += total_nao_registrados
-        
-        # ✅ AJUSTE: Total de registros SEM os "Não registrado"
-        total_registros = sum(v for k, v in resultado.items() if k != "NÃO REGISTRADO")
-        
-        # Calcular percentuais (sobre TODOS, incluindo não registrado)
-        total_geral = sum(resultado.values())
-        
-        dados_relatorio = []
-        for motivo, qtde in resultado.items():
-            percentual = (qtde / total_geral * 100) if total_geral > 0 else 0
-            dados_relatorio.append({
-                "motivo": motivo,
-                "qtde": qtde,
-                "percentual": round(percentual, 1)
-            })
+        data_inicio_obj, data_fim_obj = definir_periodo(data_inicio, data_fim)
+        
+        # Consolidado do período (reaproveita o cache por período)
+        resultado = relatorio_em_cache(
+            "relatorio-geral",
+            data_inicio_obj,
+            data_fim_obj,
+            lambda: calcular_relatorio_geral(db, data_inicio_obj, data_fim_obj)
+        )
         
-        # Ordenar: PRESENTE primeiro, depois alfabético, NÃO REGISTRADO por último
-        dados_relatorio.sort(key=lambda x: (
-            0 if x['motivo'] == 'PRESENTE' else 
-            2 if x['motivo'] == 'NÃO REGISTRADO' else 
-            1,
-            x['motivo']
-        ))
+        # Exportação em streaming (CSV / NDJSON)
+        if formato:
+            return resposta_exportacao(
+                nome_exportacao("relatorio-geral", data_inicio_obj, data_fim_obj),
+                formato,
+                COLUNAS_GERAL,
+                linhas_relatorio_geral(resultado)
+            )
         
-        return JSONResponse({
-            "success": True,
-            "periodo": {
-                "inicio": data_inicio_obj.strftime('%d/%m/%Y'),
-                "fim": data_fim_obj.strftime('%d/%m/%Y'),
-                "dias": len(dias_periodo)
-            },
-            "total_eletricistas": total_eletricistas,
-            "total_registros": total_registros,  # ✅ SEM os "Não registrado"
-            "dados": dados_relatorio
-        })
+        return JSONResponse(resultado)
         
     except Exception as e:
         return JSONResponse({
@@ -1823,17 +1767,15 @@ def relatorio_geral(
         })
 
 
-# FUNÇÃO CORRIGIDA COM DEBUG
-# Substitua a função relatorio_por_supervisor no main.py pela versão abaixo
-
 @app.get("/api/relatorio-por-supervisor")
 def relatorio_por_supervisor(
     request: Request,
     data_inicio: str = None,
     data_fim: str = None,
+    formato: str = Query(None, alias="format"),
     db: Session = Depends(get_db)
 ):
-    """API para gerar relatório POR SUPERVISOR - COM DEBUG"""
+    """API para gerar relatório POR SUPERVISOR"""
     
     # Verificar autenticação
     if not verificar_autenticacao(request):
@@ -1843,180 +1785,35 @@ def relatorio_por_supervisor(
     if not usuario:
         return JSONResponse({"success": False, "erro": "Usuário não encontrado"})
     
-    from models import EstruturaEquipes, EquipeDia, Indisponibilidade, MotivoIndisponibilidade
-    from datetime import datetime, timedelta
+    from relatorios import definir_periodo, calcular_relatorio_por_supervisor
+    from cache_relatorios import relatorio_em_cache
+    from exportacao import FORMATOS_EXPORTACAO, resposta_exportacao, nome_exportacao, colunas_relatorio_por_supervisor, linhas_relatorio_por_supervisor
+    
+    if formato and formato not in FORMATOS_EXPORTACAO:
+        return JSONResponse({"success": False, "erro": "Formato inválido (use csv ou ndjson)"})
     
     try:
         # Definir período
-        if data_inicio and data_fim:
-            data_inicio_obj = datetime.strptime(data_inicio, '%Y-%m-%d').date()
-            data_fim_obj = datetime.strptime(data_fim, '%Y-%m-%d').date()
-        elif data_inicio:
-            data_inicio_obj = datetime.strptime(data_inicio, '%Y-%m-%d').date()
-            data_fim_obj = data_inicio_obj
-        else:
-            data_inicio_obj = date.today()
-            data_fim_obj = date.today()
-        
-        print(f"\n{'='*60}")
-        print(f"DEBUG RELATÓRIO - Período: {data_inicio_obj} até {data_fim_obj}")
-        print(f"{'='*60}")
-        
-        # Criar lista de datas no período
-        dias_periodo = []
-        data_atual = data_inicio_obj
-        while data_atual <= data_fim_obj:
-            dias_periodo.append(data_atual)
-            data_atual += timedelta(days=1)
-        
-        print(f"Total de dias no período: {len(dias_periodo)}")
-        
-        # Buscar todos os supervisores
-        supervisores = db.query(EstruturaEquipes.superv_campo).filter(
-            EstruturaEquipes.descr_situacao.in_(['ATIVO', 'RESERVA'])
-        ).distinct().all()
-        supervisores = [s[0] for s in supervisores if s[0]]
-        
-        print(f"Total de supervisores: {len(supervisores)}")
-        
-        # Buscar todos os motivos possíveis
-        motivos_db = db.query(MotivoIndisponibilidade.descricao).all()
-        todos_motivos = set([m[0] for m in motivos_db])
-        
-        print(f"Motivos cadastrados: {list(todos_motivos)}")
-        
-        # TESTE: Verificar se há indisponibilidades no período
-        total_indisp_periodo = db.query(Indisponibilidade).filter(
-            Indisponibilidade.data >= data_inicio_obj,
-            Indisponibilidade.data <= data_fim_obj
-        ).count()
-        print(f"Total de indisponibilidades no período: {total_indisp_periodo}")
-        
-        if total_indisp_periodo > 0:
-            # Mostrar exemplos
-            exemplos = db.query(
-                Indisponibilidade.data,
-                Indisponibilidade.eletricista_id,
-                MotivoIndisponibilidade.descricao
-            ).join(
-                MotivoIndisponibilidade,
-                Indisponibilidade.motivo_id == MotivoIndisponibilidade.id
-            ).filter(
-                Indisponibilidade.data >= data_inicio_obj,
-                Indisponibilidade.data <= data_fim_obj
-            ).limit(5).all()
-            
-            print("\nExemplos de indisponibilidades no período:")
-            for data, elet_id, motivo in exemplos:
-                print(f"  - Data: {data}, Eletricista ID: {elet_id}, Motivo: {motivo}")
-        
-        dados_supervisores = []
-        
-        # Para cada supervisor
-        for supervisor in supervisores:
-            print(f"\n--- Supervisor: {supervisor} ---")
-            
-            # Total de eletricistas desse supervisor
-            total_eletricistas_sup = db.query(EstruturaEquipes).filter(
-                EstruturaEquipes.superv_campo == supervisor,
-                EstruturaEquipes.descr_situacao.in_(['ATIVO', 'RESERVA'])
-            ).count()
-            
-            print(f"Total de eletricistas: {total_eletricistas_sup}")
-            
-            # Contadores por motivo
-            contadores = {
-                "Presente": 0,
-                "Não registrado": 0
-            }
-            
-            # Para cada dia
-            for dia in dias_periodo:
-                # 1. PRESENTES
-                presentes = db.query(EquipeDia.eletricista_id).join(
-                    EstruturaEquipes,
-                    EquipeDia.eletricista_id == EstruturaEquipes.id
-                ).filter(
-                    EquipeDia.data == dia,
-                    EstruturaEquipes.superv_campo == supervisor
-                ).all()
-                
-                ids_presentes = set([p[0] for p in presentes])
-                contadores["Presente"] += len(ids_presentes)
-                
-                # 2. INDISPONÍVEIS - COM DEBUG
-                indisponiveis = db.query(
-                    Indisponibilidade.eletricista_id,
-                    MotivoIndisponibilidade.descricao
-                ).join(
-                    MotivoIndisponibilidade,
-                    Indisponibilidade.motivo_id == MotivoIndisponibilidade.id
-                ).join(
-                    EstruturaEquipes,
-                    Indisponibilidade.eletricista_id == EstruturaEquipes.id
-                ).filter(
-                    Indisponibilidade.data == dia,
-                    EstruturaEquipes.superv_campo == supervisor
-                ).all()
-                
-                if indisponiveis:
-                    print(f"  Dia {dia}: Encontrados {len(indisponiveis)} indisponíveis")
-                    for elet_id, motivo in indisponiveis:
-                        print(f"    - Eletricista ID: {elet_id}, Motivo: '{motivo}'")
-                
-                ids_indisponiveis = set([i[0] for i in indisponiveis])
-                
-                for elet_id, motivo in indisponiveis:
-                    if motivo not in contadores:
-                        contadores[motivo] = 0
-                    contadores[motivo] += 1
-                
-                # 3. NÃO REGISTRADOS
-                ids_registrados = ids_presentes.union(ids_indisponiveis)
-                
-                nao_registrados = db.query(EstruturaEquipes.id).filter(
-                    EstruturaEquipes.superv_campo == supervisor,
-                    EstruturaEquipes.descr_situacao.in_(['ATIVO', 'RESERVA']),
-                    ~EstruturaEquipes.id.in_(list(ids_registrados)) if ids_registrados else True
-                ).count()
-                
-                contadores["Não registrado"] += nao_registrados
-            
-            print(f"Contadores finais: {contadores}")
-            
-            # Calcular totais
-            total_registros = sum(contadores.values())
-            percentual_presenca = (contadores["Presente"] / total_registros * 100) if total_registros > 0 else 0
-            
-            dados_supervisores.append({
-                "supervisor": supervisor,
-                "total_eletricistas": total_eletricistas_sup,
-                "contadores": contadores,
-                "total_registros": total_registros,
-                "percentual_presenca": round(percentual_presenca, 1)
-            })
-        
-        # Ordenar por % de presença (decrescente)
-        dados_supervisores.sort(key=lambda x: x['percentual_presenca'], reverse=True)
-        
-        # Calcular totais gerais
-        total_geral = sum([s['total_registros'] for s in dados_supervisores])
+        data_inicio_obj, data_fim_obj = definir_periodo(data_inicio, data_fim)
+        
+        # Contadores por (supervisor, dia, motivo), com cache por período
+        resultado = relatorio_em_cache(
+            "relatorio-por-supervisor",
+            data_inicio_obj,
+            data_fim_obj,
+            lambda: calcular_relatorio_por_supervisor(db, data_inicio_obj, data_fim_obj)
+        )
         
-        print(f"\n{'='*60}")
-        print(f"TOTAL GERAL: {total_geral}")
-        print(f"{'='*60}\n")
+        # Exportação em streaming (CSV / NDJSON)
+        if formato:
+            return resposta_exportacao(
+                nome_exportacao("relatorio-por-supervisor", data_inicio_obj, data_fim_obj),
+                formato,
+                colunas_relatorio_por_supervisor(resultado),
+                linhas_relatorio_por_supervisor(resultado)
+            )
         
-        return JSONResponse({
-            "success": True,
-            "periodo": {
-                "inicio": data_inicio_obj.strftime('%d/%m/%Y'),
-                "fim": data_fim_obj.strftime('%d/%m/%Y'),
-                "dias": len(dias_periodo)
-            },
-            "todos_motivos": sorted(list(todos_motivos)),
-            "dados": dados_supervisores,
-            "total_geral": total_geral
-        })
+        return JSONResponse(resultado)
         
     except Exception as e:
         print(f"\n❌ ERRO: {e}")
@@ -2033,6 +1830,7 @@ def relatorio_por_prefixo(
     request: Request,
     data_inicio: str = None,
     data_fim: str = None,
+    formato: str = Query(None, alias="format"),
     db: Session = Depends(get_db)
 ):
     """API para gerar relatório POR PREFIXO - Mostra motivos de cada prefixo"""
@@ -2045,106 +1843,35 @@ def relatorio_por_prefixo(
     if not usuario:
         return JSONResponse({"success": False, "erro": "Usuário não encontrado"})
     
-    from models import EstruturaEquipes, EquipeDia, Indisponibilidade, MotivoIndisponibilidade
-    from datetime import datetime, timedelta
-    from collections import Counter
+    from relatorios import definir_periodo, calcular_relatorio_por_prefixo
+    from cache_relatorios import relatorio_em_cache
+    from exportacao import FORMATOS_EXPORTACAO, resposta_exportacao, nome_exportacao, COLUNAS_PREFIXO, linhas_relatorio_por_prefixo
+    
+    if formato and formato not in FORMATOS_EXPORTACAO:
+        return JSONResponse({"success": False, "erro": "Formato inválido (use csv ou ndjson)"})
     
     try:
         # Definir período
-        if data_inicio and data_fim:
-            data_inicio_obj = datetime.strptime(data_inicio, '%Y-%m-%d').date()
-            data_fim_obj = datetime.strptime(data_fim, '%Y-%m-%d').date()
-        elif data_inicio:
-            data_inicio_obj = datetime.strptime(data_inicio, '%Y-%m-%d').date()
-            data_fim_obj = data_inicio_obj
-        else:
-            data_inicio_obj = date.today()
-            data_fim_obj = date.today()
-        
-        # Criar lista de datas no período
-        dias_periodo = []
-        data_atual = data_inicio_obj
-        while data_atual <= data_fim_obj:
-            dias_periodo.append(data_atual)
-            data_atual += timedelta(days=1)
-        
-        # Buscar todos os prefixos únicos ATIVOS/RESERVA
-        prefixos = db.query(EstruturaEquipes.prefixo).filter(
-            EstruturaEquipes.descr_situacao.in_(['ATIVO', 'RESERVA'])
-        ).distinct().all()
-        prefixos = sorted([p[0] for p in prefixos if p[0]])
-        
-        # Dicionário: prefixo -> {'motivos': [], 'primeira_data': date}
-        dados_por_prefixo = {}
-        
-        # Para cada dia no período
-        for dia in dias_periodo:
-            # APENAS PREFIXOS COM INDISPONÍVEIS
-            indisponiveis = db.query(
-                Indisponibilidade.prefixo,
-                MotivoIndisponibilidade.descricao,
-                Indisponibilidade.data
-            ).join(
-                MotivoIndisponibilidade,
-                Indisponibilidade.motivo_id == MotivoIndisponibilidade.id
-            ).filter(
-                Indisponibilidade.data == dia
-            ).all()
-            
-            for prefixo, motivo, data in indisponiveis:
-                if prefixo:
-                    if prefixo not in dados_por_prefixo:
-                        dados_por_prefixo[prefixo] = {
-                            'motivos': [],
-                            'primeira_data': data
-                        }
-                    
-                    dados_por_prefixo[prefixo]['motivos'].append(motivo)
-                    
-                    # Atualizar primeira data se esta for anterior
-                    if data < dados_por_prefixo[prefixo]['primeira_data']:
-                        dados_por_prefixo[prefixo]['primeira_data'] = data
-        
-        # Total de prefixos ATIVOS
-        total_prefixos_ativos = len(prefixos)
-        
-        # Preparar dados para resposta
-        dados_prefixos = []
-        
-        for prefixo, dados in dados_por_prefixo.items():
-            motivos = dados['motivos']
-            primeira_data = dados['primeira_data']
-            
-            # Contar frequência de cada motivo
-            contador = Counter(motivos)
-            
-            # Pegar os 2 motivos mais frequentes
-            motivos_top = contador.most_common(2)
-            
-            motivo1 = motivos_top[0][0] if len(motivos_top) > 0 else "-"
-            motivo2 = motivos_top[1][0] if len(motivos_top) > 1 else "-"
-            
-            dados_prefixos.append({
-                "prefixo": prefixo,
-                "data": primeira_data.strftime('%d/%m/%Y'),
-                "motivo1": motivo1,
-                "motivo2": motivo2
-            })
+        data_inicio_obj, data_fim_obj = definir_periodo(data_inicio, data_fim)
+        
+        # Primeira data e top-2 motivos por prefixo, com cache por período
+        resultado = relatorio_em_cache(
+            "relatorio-por-prefixo",
+            data_inicio_obj,
+            data_fim_obj,
+            lambda: calcular_relatorio_por_prefixo(db, data_inicio_obj, data_fim_obj)
+        )
         
-        # Ordenar por prefixo
-        dados_prefixos.sort(key=lambda x: x['prefixo'])
+        # Exportação em streaming (CSV / NDJSON)
+        if formato:
+            return resposta_exportacao(
+                nome_exportacao("relatorio-por-prefixo", data_inicio_obj, data_fim_obj),
+                formato,
+                COLUNAS_PREFIXO,
+                linhas_relatorio_por_prefixo(resultado)
+            )
         
-        return JSONResponse({
-            "success": True,
-            "periodo": {
-                "inicio": data_inicio_obj.strftime('%d/%m/%Y'),
-                "fim": data_fim_obj.strftime('%d/%m/%Y'),
-                "dias": len(dias_periodo)
-            },
-            "total_prefixos": total_prefixos_ativos,
-            "total_registros": len(dados_prefixos),
-            "dados": dados_prefixos
-        })
+        return JSONResponse(resultado)
         
     except Exception as e:
         import traceback
@@ -2159,6 +1886,7 @@ def relatorio_eletricistas_disponiveis(
     request: Request,
     data_inicio: str = None,
     data_fim: str = None,
+    formato: str = Query(None, alias="format"),
     db: Session = Depends(get_db)
 ):
     """API para relatório de eletricistas DISPONÍVEIS (não registrados)"""
@@ -2171,101 +1899,212 @@ def relatorio_eletricistas_disponiveis(
     if not usuario:
         return JSONResponse({"success": False, "erro": "Usuário não encontrado"})
     
-    from models import EstruturaEquipes, EquipeDia, Indisponibilidade
-    from datetime import datetime, timedelta
+    from relatorios import definir_periodo, calcular_relatorio_eletricistas_disponiveis
+    from exportacao import FORMATOS_EXPORTACAO, resposta_exportacao, nome_exportacao, COLUNAS_DISPONIVEIS, linhas_eletricistas_disponiveis
+    
+    if formato and formato not in FORMATOS_EXPORTACAO:
+        return JSONResponse({"success": False, "erro": "Formato inválido (use csv ou ndjson)"})
     
     try:
         # Definir período
-        if data_inicio and data_fim:
-            data_inicio_obj = datetime.strptime(data_inicio, '%Y-%m-%d').date()
-            data_fim_obj = datetime.strptime(data_fim, '%Y-%m-%d').date()
-        elif data_inicio:
-            data_inicio_obj = datetime.strptime(data_inicio, '%Y-%m-%d').date()
-            data_fim_obj = data_inicio_obj
-        else:
-            data_inicio_obj = date.today()
-            data_fim_obj = date.today()
-        
-        # Criar lista de datas no período
-        dias_periodo = []
-        data_atual = data_inicio_obj
-        while data_atual <= data_fim_obj:
-            dias_periodo.append(data_atual)
-            data_atual += timedelta(days=1)
-        
-        # Buscar TODOS os eletricistas ATIVOS/RESERVA
-        todos_eletricistas = db.query(EstruturaEquipes).filter(
-            EstruturaEquipes.descr_situacao.in_(['ATIVO', 'RESERVA'])
-        ).all()
+        data_inicio_obj, data_fim_obj = definir_periodo(data_inicio, data_fim)
+        
+        # Exportação em streaming direto do cursor do banco (memória constante)
+        if formato:
+            return resposta_exportacao(
+                nome_exportacao("eletricistas-disponiveis", data_inicio_obj, data_fim_obj),
+                formato,
+                COLUNAS_DISPONIVEIS,
+                linhas_eletricistas_disponiveis(data_inicio_obj, data_fim_obj)
+            )
         
-        # Dicionário: id_eletricista -> set de datas com registro
-        eletricistas_com_registro = {}
+        # Anti-join: ATIVOS/RESERVA sem nenhum registro no período
+        return JSONResponse(calcular_relatorio_eletricistas_disponiveis(db, data_inicio_obj, data_fim_obj))
         
-        # Para cada dia no período
-        for dia in dias_periodo:
-            # Buscar todos os IDs de eletricistas que tiveram registro neste dia
-            
-            # 1. IDs em equipe_dia (presentes)
-            presentes = db.query(EquipeDia.eletricista_id).filter(
-                EquipeDia.data == dia
-            ).distinct().all()
-            
-            for (eletricista_id,) in presentes:
-                if eletricista_id:
-                    if eletricista_id not in eletricistas_com_registro:
-                        eletricistas_com_registro[eletricista_id] = set()
-                    eletricistas_com_registro[eletricista_id].add(dia)
-            
-            # 2. IDs em indisponibilidade
-            indisponiveis = db.query(Indisponibilidade.eletricista_id).filter(
-                Indisponibilidade.data == dia
-            ).distinct().all()
-            
-            for (eletricista_id,) in indisponiveis:
-                if eletricista_id:
-                    if eletricista_id not in eletricistas_com_registro:
-                        eletricistas_com_registro[eletricista_id] = set()
-                    eletricistas_com_registro[eletricista_id].add(dia)
-        
-        # Preparar dados para resposta (apenas eletricistas SEM NENHUM registro)
-        dados_disponiveis = []
-        
-        for eletricista in todos_eletricistas:
-            # Se o eletricista NÃO teve nenhum registro em nenhum dia do período
-            if eletricista.id not in eletricistas_com_registro:
-                dados_disponiveis.append({
-                    "polo": eletricista.polo or "-",
-                    "base": eletricista.base or "-",
-                    "matricula": eletricista.matricula,
-                    "colaborador": eletricista.colaborador,
-                    "processo_equipe": eletricista.processo_equipe or "-",
-                    "superv_campo": eletricista.superv_campo or "-",
-                    "superv_operacao": eletricista.superv_operacao or "-"
-                })
-        
-        # Ordenar por polo, depois base, depois matrícula
-        dados_disponiveis.sort(key=lambda x: (x['polo'], x['base'], x['matricula']))
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return JSONResponse({
+            "success": False,
+            "erro": str(e)
+        })
+
+@app.get("/api/relatorio-serie-diaria")
+def relatorio_serie_diaria(
+    request: Request,
+    data_inicio: str = None,
+    data_fim: str = None,
+    supervisor: str = None,
+    base: str = None,
+    db: Session = Depends(get_db)
+):
+    """API da série diária (presentes, motivos e não registrados por dia)"""
+    
+    # Verificar autenticação
+    if not verificar_autenticacao(request):
+        return JSONResponse({"success": False, "erro": "Não autenticado"})
+    
+    usuario = get_usuario_logado(request, db)
+    if not usuario:
+        return JSONResponse({"success": False, "erro": "Usuário não encontrado"})
+    
+    from relatorios import definir_periodo, calcular_serie_diaria
+    from cache_relatorios import relatorio_em_cache
+    
+    try:
+        # Definir período
+        data_inicio_obj, data_fim_obj = definir_periodo(data_inicio, data_fim)
+        
+        resultado = relatorio_em_cache(
+            ("relatorio-serie-diaria", supervisor, base),
+            data_inicio_obj,
+            data_fim_obj,
+            lambda: calcular_serie_diaria(db, data_inicio_obj, data_fim_obj, supervisor, base)
+        )
+        
+        return JSONResponse(resultado)
+        
+    except Exception as e:
+        return JSONResponse({
+            "success": False,
+            "erro": str(e)
+        })
+
+
+# ========================================
+# RELATÓRIOS EM SEGUNDO PLANO (TAREFAS)
+# ========================================
+
+@app.post("/api/relatorios/tarefas")
+async def criar_tarefa_relatorio(request: Request, db: Session = Depends(get_db)):
+    """Enfileira um relatório de período longo e devolve o id da tarefa"""
+    
+    # Verificar autenticação
+    if not verificar_autenticacao(request):
+        return JSONResponse({"success": False, "erro": "Não autenticado"})
+    
+    usuario = get_usuario_logado(request, db)
+    if not usuario:
+        return JSONResponse({"success": False, "erro": "Usuário não encontrado"})
+    
+    from relatorios import definir_periodo
+    from tarefas_relatorios import criar_tarefa, formatar_tarefa, relatorio_valido, FORMATOS_TAREFA
+    
+    try:
+        body = await request.json()
+        relatorio = body.get('relatorio')
+        formato = body.get('formato', 'json')
+        
+        if not relatorio_valido(relatorio):
+            return JSONResponse({"success": False, "erro": "Relatório inválido"})
+        
+        if formato not in FORMATOS_TAREFA:
+            return JSONResponse({"success": False, "erro": "Formato inválido (use json, csv ou ndjson)"})
+        
+        # Definir período
+        data_inicio_obj, data_fim_obj = definir_periodo(body.get('data_inicio'), body.get('data_fim'))
+        
+        tarefa, erro = criar_tarefa(relatorio, data_inicio_obj, data_fim_obj, formato, usuario.id)
+        if erro:
+            return JSONResponse({"success": False, "erro": erro})
         
         return JSONResponse({
             "success": True,
-            "periodo": {
-                "inicio": data_inicio_obj.strftime('%d/%m/%Y'),
-                "fim": data_fim_obj.strftime('%d/%m/%Y'),
-                "dias": len(dias_periodo)
-            },
-            "total_eletricistas": len(todos_eletricistas),
-            "total_disponiveis": len(dados_disponiveis),
-            "dados": dados_disponiveis
+            "tarefa": formatar_tarefa(tarefa)
         })
         
     except Exception as e:
-        import traceback
-        traceback.print_exc()
         return JSONResponse({
             "success": False,
             "erro": str(e)
         })
 
+
+def _tarefa_do_usuario(request, db, tarefa_id):
+    """Tarefa visível ao usuário logado (dono ou ADMIN) ou (None, erro)"""
+    from tarefas_relatorios import obter_tarefa
+    
+    if not verificar_autenticacao(request):
+        return None, "Não autenticado"
+    
+    usuario = get_usuario_logado(request, db)
+    if not usuario:
+        return None, "Usuário não encontrado"
+    
+    tarefa = obter_tarefa(tarefa_id)
+    if not tarefa or (tarefa['usuario_id'] != usuario.id and usuario.perfil != 'admin'):
+        return None, "Tarefa não encontrada ou expirada"
+    
+    return tarefa, None
+
+
+@app.get("/api/relatorios/tarefas/{tarefa_id}")
+def status_tarefa_relatorio(request: Request, tarefa_id: str, db: Session = Depends(get_db)):
+    """Status de uma tarefa de relatório (e linhas já gravadas)"""
+    from tarefas_relatorios import formatar_tarefa
+    
+    tarefa, erro = _tarefa_do_usuario(request, db, tarefa_id)
+    if erro:
+        return JSONResponse({"success": False, "erro": erro})
+    
+    return JSONResponse({
+        "success": True,
+        "tarefa": formatar_tarefa(tarefa)
+    })
+
+
+@app.get("/api/relatorios/tarefas/{tarefa_id}/download")
+def download_tarefa_relatorio(request: Request, tarefa_id: str, db: Session = Depends(get_db)):
+    """Arquivo gerado pela tarefa (disponível até expirar)"""
+    from fastapi.responses import FileResponse
+    from tarefas_relatorios import CONCLUIDO
+    from exportacao import nome_exportacao
+    
+    tarefa, erro = _tarefa_do_usuario(request, db, tarefa_id)
+    if erro:
+        return JSONResponse({"success": False, "erro": erro})
+    
+    if tarefa['status'] != CONCLUIDO:
+        return JSONResponse({"success": False, "erro": f"Tarefa ainda não concluída ({tarefa['status']})"})
+    
+    tipos = {
+        'json': 'application/json',
+        'csv': 'text/csv; charset=utf-8',
+        'ndjson': 'application/x-ndjson'
+    }
+    nome = nome_exportacao(tarefa['relatorio'], tarefa['data_inicio'], tarefa['data_fim'])
+    
+    return FileResponse(
+        tarefa['arquivo'],
+        media_type=tipos[tarefa['formato']],
+        filename=f"{nome}.{tarefa['formato']}"
+    )
+
+@app.get("/api/cache-relatorios")
+def estatisticas_cache_relatorios(request: Request, db: Session = Depends(get_db)):
+    """Contadores do cache de relatórios (hits/misses) - apenas ADMIN"""
+    
+    # Verificar autenticação
+    if not verificar_autenticacao(request):
+        return JSONResponse({"success": False, "erro": "Não autenticado"})
+    
+    usuario = get_usuario_logado(request, db)
+    if not usuario or usuario.perfil != 'admin':
+        return JSONResponse({"success": False, "erro": "Acesso negado"})
+    
+    from cache_relatorios import cache_relatorios
+    from matriz_presenca import matriz_presenca
+    from fila_gravacao import fila_gravacao
+    from quadro_registro import cache_quadro_registro
+    
+    return JSONResponse({
+        "success": True,
+        "cache": cache_relatorios.estatisticas(),
+        "matriz_presenca": matriz_presenca.estatisticas(),
+        "fila_gravacao": fila_gravacao.estatisticas(),
+        "quadro_registro": cache_quadro_registro.estatisticas()
+    })
+
 # ==========================================
 # ROTA DE DEBUG - ADICIONE ISSO NO main.py
 # Copie todo este código e cole ANTES da linha "if __name__ == '__main__':"
@@ -0,0 +1,331 @@
+"""
+Matriz de presença em memória (bitsets por dia)
+
+Cada eletricista ocupa uma posição fixa de bit. Para cada dia carregado
+guardamos um inteiro Python usado como bitset:
+  - presentes   → eletricistas com frequência no dia
+  - registrados → eletricistas com frequência OU indisponibilidade no dia
+  - motivos     → um bitset por motivo de indisponibilidade
+Além dos dias, o quadro atual tem bitsets de ATIVOS/RESERVA e de cada
+supervisor. "Não registrado" de um dia vira popcount(ativos & ~registrados),
+e os contadores por supervisor são popcounts com a máscara do supervisor.
+
+Uma indisponibilidade por eletricista/dia (validado em salvar-indisponibilidade),
+então o popcount por motivo é igual à contagem de registros.
+
+Os dias são lidos do banco na primeira consulta que os usa e atualizados
+pelas gravações deste processo. Como outros workers também gravam, os
+dias expiram: de hoje em diante após MATRIZ_PRESENCA_TTL segundos (padrão
+5 min); os passados, e o quadro, após MATRIZ_PRESENCA_TTL_PASSADO (padrão
+1 hora - correções em datas antigas e estrutura importada em outro worker).
+No máximo MATRIZ_PRESENCA_MAX_DIAS dias ficam em memória (os menos usados
+saem primeiro). As consultas ao banco rodam fora do lock.
+
+Habilitar nos relatórios: USAR_MATRIZ_PRESENCA=1
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from models import EstruturaEquipes, EquipeDia, Indisponibilidade, MotivoIndisponibilidade
+
+USAR_MATRIZ_PRESENCA = os.getenv('USAR_MATRIZ_PRESENCA', '0').lower() in ('1', 'true', 'sim')
+MATRIZ_TTL_SEGUNDOS = int(os.getenv('MATRIZ_PRESENCA_TTL', 300))
+MATRIZ_TTL_PASSADO_SEGUNDOS = int(os.getenv('MATRIZ_PRESENCA_TTL_PASSADO', 3600))
+MATRIZ_MAX_DIAS = int(os.getenv('MATRIZ_PRESENCA_MAX_DIAS', 800))
+
+
+def _bitset(posicoes):
+    """Inteiro com os bits das posições informadas ligados"""
+    posicoes = list(posicoes)
+    if not posicoes:
+        return 0
+    bits = bytearray(max(posicoes) // 8 + 1)
+    for posicao in posicoes:
+        bits[posicao >> 3] |= 1 << (posicao & 7)
+    return int.from_bytes(bits, 'little')
+
+
+class _Dia:
+    """Bitsets de um dia"""
+    __slots__ = ('presentes', 'registrados', 'motivos', 'expira_em')
+
+    def __init__(self, expira_em):
+        self.presentes = 0
+        self.registrados = 0
+        self.motivos = {}  # descrição do motivo -> bitset
+        self.expira_em = expira_em
+
+
+class MatrizPresenca:
+    """Quadro + dias em bitsets, seguro para uso entre threads"""
+
+    def __init__(self, ttl=MATRIZ_TTL_SEGUNDOS, max_dias=MATRIZ_MAX_DIAS,
+                 ttl_passado=MATRIZ_TTL_PASSADO_SEGUNDOS):
+        self.ttl = ttl
+        self.ttl_passado = ttl_passado
+        self.max_dias = max_dias
+        self._lock = threading.RLock()
+        self._posicoes = {}          # eletricista_id -> posição do bit
+        self._ativos = None          # bitset ATIVOS/RESERVA (None = quadro não carregado)
+        self._quadro_expira_em = 0.0
+        self._supervisores = {}      # superv_campo -> bitset de todos os eletricistas
+        self._dias = OrderedDict()   # data -> _Dia (LRU, no máximo max_dias)
+        # Gravações por data e descartes da matriz: uma leitura do banco que
+        # cruzou com eles não é guardada (ficaria sem a gravação)
+        self._versoes = {}           # data -> marcações feitas
+        self._geracao = 0
+        self.leituras_banco = 0
+
+    # ----------------------------------------
+    # Posições e carga
+    # ----------------------------------------
+    def _posicao(self, eletricista_id):
+        posicao = self._posicoes.get(eletricista_id)
+        if posicao is None:
+            posicao = self._posicoes[eletricista_id] = len(self._posicoes)
+        return posicao
+
+    def _expiracao(self, data):
+        ttl = self.ttl if data >= date.today() else self.ttl_passado
+        return time.monotonic() + ttl
+
+    @staticmethod
+    def _ler_quadro(db):
+        """(id, supervisor, situação) de toda a estrutura - fora do lock"""
+        return db.query(
+            EstruturaEquipes.id,
+            EstruturaEquipes.superv_campo,
+            EstruturaEquipes.descr_situacao
+        ).all()
+
+    @staticmethod
+    def _ler_dias(db, inicio, fim):
+        """Frequências e indisponibilidades do intervalo - fora do lock"""
+        frequencias = db.query(
+            EquipeDia.eletricista_id, EquipeDia.data
+        ).filter(EquipeDia.data.between(inicio, fim)).distinct().all()
+
+        indisponibilidades = db.query(
+            Indisponibilidade.eletricista_id,
+            Indisponibilidade.data,
+            MotivoIndisponibilidade.descricao
+        ).join(
+            MotivoIndisponibilidade,
+            Indisponibilidade.motivo_id == MotivoIndisponibilidade.id
+        ).filter(Indisponibilidade.data.between(inicio, fim)).all()
+
+        return frequencias, indisponibilidades
+
+    def _instalar_quadro(self, linhas):
+        from relatorios import SITUACOES_ATIVAS
+
+        ativos = []
+        por_supervisor = {}
+        for id_, supervisor, situacao in linhas:
+            posicao = self._posicao(id_)
+            por_supervisor.setdefault(supervisor, []).append(posicao)
+            if situacao in SITUACOES_ATIVAS:
+                ativos.append(posicao)
+
+        self._ativos = _bitset(ativos)
+        self._supervisores = {s: _bitset(p) for s, p in por_supervisor.items()}
+        self._quadro_expira_em = time.monotonic() + self.ttl_passado
+
+    def _montar_dias(self, faltando, leitura):
+        """Bitsets dos dias lidos (posições atribuídas dentro do lock)"""
+        frequencias, indisponibilidades = leitura
+        presentes = {}
+        registrados = {}
+        motivos = {}
+
+        for eletricista_id, data in frequencias:
+            posicao = self._posicao(eletricista_id)
+            presentes.setdefault(data, []).append(posicao)
+            registrados.setdefault(data, []).append(posicao)
+
+        for eletricista_id, data, motivo in indisponibilidades:
+            posicao = self._posicao(eletricista_id)
+            motivos.setdefault(data, {}).setdefault(motivo, []).append(posicao)
+            registrados.setdefault(data, []).append(posicao)
+
+        dias = {}
+        for data in faltando:
+            dia = _Dia(self._expiracao(data))
+            dia.presentes = _bitset(presentes.get(data, ()))
+            dia.registrados = _bitset(registrados.get(data, ()))
+            dia.motivos = {m: _bitset(p) for m, p in motivos.get(data, {}).items()}
+            dias[data] = dia
+        return dias
+
+    def _faltando(self, data_inicio, data_fim):
+        """Dias do período ainda não carregados (ou expirados)"""
+        agora = time.monotonic()
+        faltando = []
+        data = data_inicio
+        while data <= data_fim:
+            dia = self._dias.get(data)
+            if dia is None or dia.expira_em < agora:
+                faltando.append(data)
+            data += timedelta(days=1)
+        return faltando
+
+    def _preparar(self, db, data_inicio, data_fim):
+        """
+        (dias do período, bitset de ativos, bitsets por supervisor).
+        As consultas ao banco rodam FORA do lock: uma carga longa (ano
+        inteiro) não trava os outros relatórios nem as gravações.
+        """
+        while True:
+            with self._lock:
+                geracao = self._geracao
+                ler_quadro = self._ativos is None or self._quadro_expira_em < time.monotonic()
+                faltando = self._faltando(data_inicio, data_fim)
+                versoes = {data: self._versoes.get(data, 0) for data in faltando}
+
+            quadro = self._ler_quadro(db) if ler_quadro else None
+            leitura = self._ler_dias(db, faltando[0], faltando[-1]) if faltando else None
+
+            with self._lock:
+                if geracao != self._geracao:
+                    continue  # matriz descartada durante a leitura: posições mudaram
+
+                if quadro is not None:
+                    # Posições de bit mantidas: os dias carregados continuam válidos
+                    self._instalar_quadro(quadro)
+
+                novos = self._montar_dias(faltando, leitura) if faltando else {}
+                if faltando:
+                    self.leituras_banco += 1
+
+                dias = []
+                data = data_inicio
+                while data <= data_fim:
+                    dia = novos.get(data)
+                    if dia is not None:
+                        # Gravação na data durante a leitura: usa agora, não guarda
+                        if self._versoes.get(data, 0) == versoes[data]:
+                            self._dias[data] = dia
+                    else:
+                        dia = self._dias.get(data)
+                        if dia is None:
+                            break  # descartado pelo limite durante a leitura
+                    if data in self._dias:
+                        self._dias.move_to_end(data)
+                    dias.append(dia)
+                    data += timedelta(days=1)
+                else:
+                    while len(self._dias) > self.max_dias:
+                        self._dias.popitem(last=False)
+                    return dias, self._ativos, self._supervisores
+
+    # ----------------------------------------
+    # Linhas no formato dos relatórios (tipo P/I/R/T)
+    # ----------------------------------------
+    def linhas_geral(self, db, data_inicio, data_fim):
+        """Linhas (tipo, motivo, qtde) como em relatorios._linhas_geral"""
+        dias, ativos, _ = self._preparar(db, data_inicio, data_fim)
+
+        presentes = 0
+        registrados = 0
+        motivos = {}
+        for dia in dias:
+            presentes += dia.presentes.bit_count()
+            registrados += (dia.registrados & ativos).bit_count()
+            for motivo, bits in list(dia.motivos.items()):
+                motivos[motivo] = motivos.get(motivo, 0) + bits.bit_count()
+
+        linhas = [('I', motivo, qtde) for motivo, qtde in motivos.items()]
+        linhas.append(('P', None, presentes))
+        linhas.append(('R', None, registrados))
+        linhas.append(('T', None, ativos.bit_count()))
+        return linhas
+
+    def linhas_por_supervisor(self, db, data_inicio, data_fim):
+        """Linhas (supervisor, tipo, motivo, qtde) como em relatorios._linhas_por_supervisor"""
+        dias, todos_ativos, supervisores = self._preparar(db, data_inicio, data_fim)
+
+        linhas = []
+        for supervisor, mascara in supervisores.items():
+            ativos = mascara & todos_ativos
+            if ativos:
+                linhas.append((supervisor, 'T', None, ativos.bit_count()))
+
+            presentes = 0
+            registrados = 0
+            motivos = {}
+            for dia in dias:
+                presentes += (dia.presentes & mascara).bit_count()
+                registrados += (dia.registrados & ativos).bit_count()
+                for motivo, bits in list(dia.motivos.items()):
+                    qtde = (bits & mascara).bit_count()
+                    if qtde:
+                        motivos[motivo] = motivos.get(motivo, 0) + qtde
+
+            if presentes:
+                linhas.append((supervisor, 'P', None, presentes))
+            if registrados:
+                linhas.append((supervisor, 'R', None, registrados))
+            linhas.extend((supervisor, 'I', motivo, qtde) for motivo, qtde in motivos.items())
+
+        return linhas
+
+    # ----------------------------------------
+    # Atualização pelas gravações (chamar APÓS o commit)
+    # ----------------------------------------
+    def _contar_marcacao(self, data):
+        # Zerar é seguro: leituras em andamento só deixam de ser guardadas
+        if len(self._versoes) > self.max_dias:
+            self._versoes.clear()
+        self._versoes[data] = self._versoes.get(data, 0) + 1
+
+    def marcar_presenca(self, data, eletricista_ids):
+        """Liga os bits de frequência (só se o dia já estiver carregado)"""
+        with self._lock:
+            self._contar_marcacao(data)
+            dia = self._dias.get(data)
+            if dia is None:
+                return
+            bits = _bitset(self._posicao(int(i)) for i in eletricista_ids)
+            dia.presentes |= bits
+            dia.registrados |= bits
+
+    def marcar_indisponibilidade(self, data, eletricista_id, motivo):
+        """Liga o bit do motivo (só se o dia já estiver carregado)"""
+        with self._lock:
+            self._contar_marcacao(data)
+            dia = self._dias.get(data)
+            if dia is None:
+                return
+            bit = 1 << self._posicao(int(eletricista_id))
+            dia.motivos[motivo] = dia.motivos.get(motivo, 0) | bit
+            dia.registrados |= bit
+
+    def limpar(self):
+        """Descarta quadro e dias (ex.: nova estrutura importada)"""
+        with self._lock:
+            self._posicoes.clear()
+            self._ativos = None
+            self._supervisores = {}
+            self._dias.clear()
+            self._versoes.clear()
+            self._geracao += 1
+
+    def estatisticas(self):
+        """Tamanho da matriz em memória"""
+        with self._lock:
+            return {
+                "eletricistas": len(self._posicoes),
+                "supervisores": len(self._supervisores),
+                "dias_carregados": len(self._dias),
+                "max_dias": self.max_dias,
+                "leituras_banco": self.leituras_banco,
+                "ttl_segundos": self.ttl,
+                "ttl_passado_segundos": self.ttl_passado
+            }
+
+
+# Instância única do processo
+matriz_presenca = MatrizPresenca()
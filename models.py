@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Date, Text, ForeignKey, TIMESTAMP, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, Date, Text, ForeignKey, TIMESTAMP, DateTime, UniqueConstraint, Index
 from sqlalchemy.sql import func
 from database import Base
 from datetime import datetime
@@ -25,6 +25,10 @@ class EstruturaEquipes(Base):
     superv_campo = Column(String(200))
     superv_operacao = Column(String(200))
     coordenador = Column(String(200))
+    
+    # Colunas de busca (maiúsculas, sem acentos) - ver busca_normalizada.py
+    nome_busca = Column(String(200))
+    matricula_busca = Column(String(50))
 
 
 # ============================================
@@ -95,6 +99,9 @@ class MotivoIndisponibilidade(Base):
 # ============================================
 class Indisponibilidade(Base):
     __tablename__ = 'indisponibilidades'
+    __table_args__ = (
+        Index('uq_indisponibilidades_eletricista_data', 'eletricista_id', 'data', unique=True),  # 1 registro por eletricista/dia
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     data = Column(Date, nullable=False)
@@ -115,6 +122,9 @@ class Indisponibilidade(Base):
 # ============================================
 class EquipeDia(Base):
     __tablename__ = "equipes_dia"
+    __table_args__ = (
+        Index('uq_equipes_dia_eletricista_data', 'eletricista_id', 'data', unique=True),  # 1 registro por eletricista/dia
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     eletricista_id = Column(Integer, ForeignKey("estrutura_equipes.id"), nullable=False)
@@ -132,6 +142,9 @@ class EquipeDia(Base):
 # ============================================
 class Remanejamento(Base):
     __tablename__ = "remanejamentos"
+    __table_args__ = (
+        Index('uq_remanejamentos_eletricista_data', 'eletricista_id', 'data', unique=True),  # 1 registro por eletricista/dia
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     eletricista_id = Column(Integer, ForeignKey("estrutura_equipes.id"), nullable=False)
@@ -144,6 +157,76 @@ class Remanejamento(Base):
     observacoes = Column(Text)
 
 
+# ============================================
+# CLASSE: ResumoFrequenciaDiaria
+# Tabela de fatos pré-agregada dos relatórios
+# (data × supervisor × base × prefixo × motivo → qtde)
+# ============================================
+class ResumoFrequenciaDiaria(Base):
+    __tablename__ = "resumo_frequencia_diaria"
+    __table_args__ = (
+        UniqueConstraint('data', 'superv_campo', 'base', 'prefixo', 'motivo', name='uq_resumo_frequencia_diaria'),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    data = Column(Date, nullable=False, index=True)
+    superv_campo = Column(String(200), nullable=False, default='')
+    base = Column(String(100), nullable=False, default='')
+    prefixo = Column(String, nullable=False, default='')
+    motivo = Column(String, nullable=False)  # descrição do motivo, '#PRESENTE' ou '#REGISTRADO'
+    qtde = Column(Integer, nullable=False, default=0)
+
+
+# ============================================
+# CLASSE: EstruturaVigencia
+# Intervalos de validade da estrutura por eletricista
+# (calculados a partir do histórico a cada importação)
+# ============================================
+class EstruturaVigencia(Base):
+    __tablename__ = "estrutura_equipes_vigencia"
+    __table_args__ = (
+        Index('ix_vigencia_eletricista_periodo', 'eletricista_id', 'valido_de', 'valido_ate'),
+        Index('ix_vigencia_periodo', 'valido_de', 'valido_ate'),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    eletricista_id = Column(Integer, nullable=False)  # EstruturaEquipes.id / id_original do histórico
+    valido_de = Column(Date, nullable=False)   # inclusivo
+    valido_ate = Column(Date, nullable=False)  # exclusivo (9999-12-31 = vigente)
+    superv_campo = Column(String(200))
+    base = Column(String(100))
+    descr_situacao = Column(String(50))
+
+
+# ============================================
+# CLASSE: AlteracaoRegistro
+# Log de gravações por data (cursor da sincronização)
+# ============================================
+class AlteracaoRegistro(Base):
+    __tablename__ = "alteracoes_registro"
+    __table_args__ = (
+        Index('ix_alteracoes_data_seq', 'data', 'seq'),
+    )
+    
+    seq = Column(Integer, primary_key=True)  # cursor: cresce a cada gravação
+    data = Column(Date, nullable=False)
+    tipo = Column(String(1), nullable=False)  # F = frequência, I = indisponibilidade, R = remanejamento
+    eletricista_id = Column(Integer, nullable=False)
+    criado_em = Column(DateTime, nullable=False)
+
+
+# ============================================
+# CLASSE: ChaveIdempotencia
+# Respostas de gravações já feitas (cabeçalho Idempotency-Key)
+# ============================================
+class ChaveIdempotencia(Base):
+    __tablename__ = "chaves_idempotencia"
+    
+    chave = Column(String(32), primary_key=True)  # hash de usuário + rota + chave enviada
+    resposta = Column(Text, nullable=False)       # JSON devolvido na primeira vez
+    expira_em = Column(DateTime, nullable=False, index=True)
+
+
 # ============================================
 # FUNÇÃO: Criar tabelas
 # ============================================
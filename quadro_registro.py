@@ -0,0 +1,169 @@
+"""
+Lista de eletricistas da página de registro (/registrar-v2)
+
+Para um supervisor, a lista é:
+    equipe própria (ATIVO/RESERVA) - remanejados para outra supervisão
+    + remanejados para esta supervisão na data
+    - já registrados na data (frequência ou indisponibilidade)
+Sem supervisão (admin / base "Todas"): todos os ativos.
+
+Durante o dia só muda quem já foi registrado. Por isso a lista (uma
+consulta, só com as colunas do template) e os prefixos da supervisão ficam
+em cache por (supervisor, data), e os registrados são retirados na hora,
+a partir do cache por data (registrados_por_data.py). O cache:
+  - é descartado da data a cada remanejamento e inteiro na importação
+  - expira após QUADRO_REGISTRO_CACHE_TTL segundos (outros workers)
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from sqlalchemy import and_, exists, or_
+from models import EstruturaEquipes, Remanejamento
+from relatorios import SITUACOES_ATIVAS
+
+QUADRO_REGISTRO_CACHE_TTL = int(os.getenv('QUADRO_REGISTRO_CACHE_TTL', 600))
+QUADRO_REGISTRO_CACHE_MAX = int(os.getenv('QUADRO_REGISTRO_CACHE_MAX', 256))
+
+
+def _sem_supervisao(supervisor):
+    return not supervisor or supervisor.upper() == "TODAS"
+
+
+# ============================================
+# CONSULTAS
+# ============================================
+def quadro_da_supervisao(db, supervisor, data):
+    """Linhas (id, colaborador, matricula, prefixo, base) ordenadas por nome"""
+    ativos = EstruturaEquipes.descr_situacao.in_(SITUACOES_ATIVAS)
+
+    if _sem_supervisao(supervisor):
+        visiveis = ativos
+    else:
+        def remanejado(*condicoes):
+            return exists().where(
+                Remanejamento.eletricista_id == EstruturaEquipes.id,
+                Remanejamento.data == data,
+                *condicoes
+            )
+
+        visiveis = or_(
+            # Equipe própria que não foi remanejada para outra supervisão
+            and_(
+                EstruturaEquipes.superv_campo == supervisor,
+                ativos,
+                ~remanejado(Remanejamento.supervisor_destino != supervisor)
+            ),
+            # Remanejados para esta supervisão
+            remanejado(Remanejamento.supervisor_destino == supervisor)
+        )
+
+    return db.query(
+        EstruturaEquipes.id,
+        EstruturaEquipes.colaborador,
+        EstruturaEquipes.matricula,
+        EstruturaEquipes.prefixo,
+        EstruturaEquipes.base
+    ).filter(
+        visiveis
+    ).order_by(
+        EstruturaEquipes.colaborador,
+        EstruturaEquipes.id
+    ).all()
+
+
+def prefixos_para_registro(db, supervisor):
+    """Prefixos distintos da supervisão (todos sem supervisão)"""
+    query = db.query(EstruturaEquipes.prefixo)
+    if not _sem_supervisao(supervisor):
+        query = query.filter(EstruturaEquipes.superv_campo == supervisor)
+
+    return [p[0] for p in query.distinct().all() if p[0]]
+
+
+# ============================================
+# CACHE
+# ============================================
+class CacheQuadroRegistro:
+    """Lista e prefixos por (supervisor, data) (LRU + TTL), seguro para uso entre threads"""
+
+    def __init__(self, ttl=QUADRO_REGISTRO_CACHE_TTL, max_entradas=QUADRO_REGISTRO_CACHE_MAX):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()  # (supervisor, data) -> (expira_em, linhas, prefixos)
+        self._lock = threading.Lock()
+        # Muda a cada invalidação: consulta iniciada antes dela não é guardada
+        self._geracao = 0
+
+        # Estatísticas
+        self.hits = 0
+        self.misses = 0
+        self.invalidacoes = 0
+
+    def obter(self, db, supervisor, data):
+        """(linhas, prefixos) da supervisão na data, sem excluir os registrados"""
+        chave = (None if _sem_supervisao(supervisor) else supervisor, data)
+
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada and entrada[0] >= time.monotonic():
+                self._entradas.move_to_end(chave)
+                self.hits += 1
+                return entrada[1], entrada[2]
+            self.misses += 1
+            geracao = self._geracao
+
+        linhas = tuple(quadro_da_supervisao(db, supervisor, data))
+        prefixos = tuple(prefixos_para_registro(db, supervisor))
+
+        with self._lock:
+            if geracao == self._geracao:
+                self._entradas[chave] = (time.monotonic() + self.ttl, linhas, prefixos)
+                self._entradas.move_to_end(chave)
+                while len(self._entradas) > self.max_entradas:
+                    self._entradas.popitem(last=False)
+
+        return linhas, prefixos
+
+    def invalidar_data(self, data):
+        """Descarta as listas da data (chamar após o commit de remanejamentos)"""
+        with self._lock:
+            self._geracao += 1
+            self.invalidacoes += 1
+            for chave in [c for c in self._entradas if c[1] == data]:
+                del self._entradas[chave]
+
+    def limpar(self):
+        """Descarta todas as listas (importação da estrutura)"""
+        with self._lock:
+            self._geracao += 1
+            self.invalidacoes += 1
+            self._entradas.clear()
+
+    def estatisticas(self):
+        """Contadores para dimensionamento do cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "ttl_segundos": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_acerto": round(self.hits / total * 100, 1) if total > 0 else 0,
+                "invalidacoes": self.invalidacoes
+            }
+
+
+# Instância única do processo
+cache_quadro_registro = CacheQuadroRegistro()
+
+
+def quadro_para_registro(db, supervisor, data):
+    """(eletricistas ainda não registrados na data, prefixos) da página de registro"""
+    from registrados_por_data import cache_registrados
+
+    linhas, prefixos = cache_quadro_registro.obter(db, supervisor, data)
+    registrados = cache_registrados.registrados(db, data)
+    return [e for e in linhas if e.id not in registrados], list(prefixos)
@@ -0,0 +1,87 @@
+"""
+Cache dos ids já registrados por data (frequência e indisponibilidade)
+
+A página de registro e as buscas do autocomplete precisam saber quem já
+foi registrado na data. Em vez de consultar EquipeDia/Indisponibilidade e
+devolver a lista ao banco num NOT IN a cada tecla, guardamos os dois
+conjuntos por data:
+  - carregados do banco no primeiro uso da data
+  - atualizados pelas gravações deste processo (após o commit)
+  - expiram após REGISTRADOS_CACHE_TTL segundos (gravações de outros workers;
+    as gravações continuam validando no banco, então o atraso é seguro)
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+
+REGISTRADOS_CACHE_TTL = int(os.getenv('REGISTRADOS_CACHE_TTL', 60))
+REGISTRADOS_CACHE_MAX_DATAS = int(os.getenv('REGISTRADOS_CACHE_MAX_DATAS', 64))
+
+
+class CacheRegistrados:
+    """Conjuntos de ids por data (LRU + TTL), seguro para uso entre threads"""
+
+    def __init__(self, ttl=REGISTRADOS_CACHE_TTL, max_datas=REGISTRADOS_CACHE_MAX_DATAS):
+        self.ttl = ttl
+        self.max_datas = max_datas
+        self._datas = OrderedDict()  # data -> (expira_em, ids frequência, ids indisponibilidade)
+        self._lock = threading.Lock()
+
+    def _carregar(self, db, data):
+        from models import EquipeDia, Indisponibilidade
+
+        frequencia = {i[0] for i in db.query(EquipeDia.eletricista_id).filter(
+            EquipeDia.data == data
+        ).all()}
+        indisponiveis = {i[0] for i in db.query(Indisponibilidade.eletricista_id).filter(
+            Indisponibilidade.data == data
+        ).all()}
+        return frequencia, indisponiveis
+
+    def obter(self, db, data):
+        """(ids na frequência, ids indisponíveis) da data - cópias"""
+        with self._lock:
+            entrada = self._datas.get(data)
+            if entrada and entrada[0] >= time.monotonic():
+                self._datas.move_to_end(data)
+                return set(entrada[1]), set(entrada[2])
+
+        frequencia, indisponiveis = self._carregar(db, data)
+
+        with self._lock:
+            self._datas[data] = (time.monotonic() + self.ttl, frequencia, indisponiveis)
+            self._datas.move_to_end(data)
+            while len(self._datas) > self.max_datas:
+                self._datas.popitem(last=False)
+
+        return set(frequencia), set(indisponiveis)
+
+    def registrados(self, db, data):
+        """Ids registrados na data (frequência OU indisponibilidade)"""
+        frequencia, indisponiveis = self.obter(db, data)
+        return frequencia | indisponiveis
+
+    def adicionar_frequencia(self, data, eletricista_ids):
+        """Inclui ids gravados na frequência (chamar após o commit)"""
+        with self._lock:
+            entrada = self._datas.get(data)
+            if entrada:
+                entrada[1].update(int(i) for i in eletricista_ids)
+
+    def adicionar_indisponibilidade(self, data, eletricista_id):
+        """Inclui id gravado como indisponível (chamar após o commit)"""
+        with self._lock:
+            entrada = self._datas.get(data)
+            if entrada:
+                entrada[2].add(int(eletricista_id))
+
+    def limpar(self):
+        """Descarta todas as datas"""
+        with self._lock:
+            self._datas.clear()
+
+
+# Instância única do processo
+cache_registrados = CacheRegistrados()
@@ -0,0 +1,235 @@
+"""
+Um registro por eletricista por dia (equipes_dia, indisponibilidades, remanejamentos)
+
+Os modelos declaram índices ÚNICOS (eletricista_id, data). Com eles as
+gravações usam INSERT ... ON CONFLICT (inserir_sem_duplicar) em vez de
+"consultar e depois inserir", que deixava dois pedidos simultâneos
+registrarem o mesmo eletricista duas vezes.
+
+Bancos criados antes dos índices: preparar_registros_unicos (inicialização)
+cria os que faltarem. Se a tabela já tiver duplicados o índice fica de fora
+(e as gravações nela voltam a consultar antes de inserir) até a limpeza:
+    python registros_unicos.py            # só mostra os duplicados
+    python registros_unicos.py --aplicar  # remove, recalcula o resumo e cria os índices
+"""
+
+from sqlalchemy import cast, exists, func, literal, null, select, union_all
+from sqlalchemy.exc import IntegrityError
+from models import EquipeDia, Indisponibilidade, Remanejamento
+from sincronizacao import registrar_alteracoes
+
+CHAVE_UNICA = ['eletricista_id', 'data']
+
+# Registro mantido na limpeza: frequência e indisponibilidade ficam com o
+# primeiro (como a validação antiga); remanejamento com o último (a gravação
+# substitui o destino)
+MANTER_NA_LIMPEZA = {
+    EquipeDia: func.min,
+    Indisponibilidade: func.min,
+    Remanejamento: func.max
+}
+
+# Modelos cujo índice único não pôde ser criado (duplicados no banco)
+_sem_indice = set()
+
+
+def _indice_unico(modelo):
+    return next(i for i in modelo.__table__.indexes if i.unique)
+
+
+# ============================================
+# GRAVAÇÃO
+# ============================================
+def inserir_sem_duplicar(db, modelo, linhas, exceto_em=None, atualizar=()):
+    """
+    Insere linhas (dicts com as mesmas colunas) ignorando os
+    (eletricista_id, data) que já existem, em um único comando.
+      exceto_em: outro modelo; também ignora quem já tem registro nele na data
+      atualizar: colunas sobrescritas quando o registro já existe (upsert)
+    Retorna o conjunto de eletricista_id gravados (sem commit) e anota
+    cada um no log de sincronização (sincronizacao.py).
+    """
+    if not linhas:
+        return set()
+
+    gravados = _inserir(db, modelo, linhas, exceto_em, atualizar)
+    registrar_alteracoes(db, modelo, [
+        (linha['data'], linha['eletricista_id'])
+        for linha in linhas if linha['eletricista_id'] in gravados
+    ])
+    return gravados
+
+
+def _valor(valor, tipo):
+    # NULL sem tipo em um UNION ALL vira text no PostgreSQL ("column is of
+    # type integer but expression is of type text")
+    if valor is None:
+        return cast(null(), tipo)
+    return literal(valor, tipo)
+
+
+def _inserir(db, modelo, linhas, exceto_em, atualizar):
+    tabela = modelo.__table__
+    dialeto = db.get_bind().dialect.name
+
+    if dialeto in ('postgresql', 'sqlite') and modelo not in _sem_indice:
+        if dialeto == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        if exceto_em is None:
+            stmt = insert(tabela).values(linhas)
+        else:
+            # INSERT ... SELECT <valores> WHERE NOT EXISTS (registro na outra tabela)
+            colunas = list(linhas[0])
+            outra = exceto_em.__table__
+            selecoes = [
+                select(*[_valor(linha[c], tabela.c[c].type) for c in colunas]).where(
+                    ~exists().where(
+                        outra.c.eletricista_id == linha['eletricista_id'],
+                        outra.c.data == linha['data']
+                    )
+                )
+                for linha in linhas
+            ]
+            origem = selecoes[0] if len(selecoes) == 1 else union_all(*selecoes)
+            stmt = insert(tabela).from_select(colunas, origem)
+
+        if atualizar:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=CHAVE_UNICA,
+                set_={c: stmt.excluded[c] for c in atualizar}
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=CHAVE_UNICA)
+
+        return {r[0] for r in db.execute(stmt.returning(tabela.c.eletricista_id))}
+
+    # Outros bancos (ou índice ainda não criado): consulta e insere linha a linha
+    gravados = set()
+    for linha in linhas:
+        chave = (modelo.eletricista_id == linha['eletricista_id'], modelo.data == linha['data'])
+
+        if exceto_em is not None and db.query(exceto_em.id).filter(
+            exceto_em.eletricista_id == linha['eletricista_id'],
+            exceto_em.data == linha['data']
+        ).first():
+            continue
+
+        existente = db.query(modelo).filter(*chave).first()
+        if existente:
+            if not atualizar:
+                continue
+            for coluna in atualizar:
+                setattr(existente, coluna, linha[coluna])
+        else:
+            db.add(modelo(**linha))
+        db.flush()
+        gravados.add(linha['eletricista_id'])
+
+    return gravados
+
+
+# ============================================
+# ÍNDICES E LIMPEZA
+# ============================================
+def contar_duplicados(db, modelo):
+    """Registros excedentes de (eletricista_id, data) no modelo"""
+    grupos = select(func.count().label('qtde')).where(
+        modelo.eletricista_id.isnot(None)
+    ).group_by(
+        modelo.eletricista_id,
+        modelo.data
+    ).having(func.count() > 1).subquery()
+
+    return db.execute(select(func.coalesce(func.sum(grupos.c.qtde - 1), 0))).scalar()
+
+
+def preparar_registros_unicos(engine):
+    """
+    Cria os índices únicos que faltarem.
+    Retorna {tabela: duplicados} das tabelas que ficaram sem índice.
+    """
+    from database import SessionLocal
+
+    pendentes = {}
+    for modelo in MANTER_NA_LIMPEZA:
+        try:
+            _indice_unico(modelo).create(bind=engine, checkfirst=True)
+            _sem_indice.discard(modelo)
+        except IntegrityError:
+            _sem_indice.add(modelo)
+            db = SessionLocal()
+            try:
+                pendentes[modelo.__tablename__] = contar_duplicados(db, modelo)
+            finally:
+                db.close()
+
+    return pendentes
+
+
+def remover_duplicados(db):
+    """
+    Apaga os registros repetidos de (eletricista_id, data), mantendo um
+    por chave (MANTER_NA_LIMPEZA).
+    Retorna ({tabela: apagados}, (menor, maior) data com frequência ou
+    indisponibilidade apagada, ou None).
+    """
+    apagados = {}
+    datas = []
+
+    try:
+        for modelo, manter in MANTER_NA_LIMPEZA.items():
+            mantidos = select(manter(modelo.id)).where(
+                modelo.eletricista_id.isnot(None)
+            ).group_by(modelo.eletricista_id, modelo.data)
+
+            filtro = (modelo.eletricista_id.isnot(None), modelo.id.notin_(mantidos))
+
+            if modelo is not Remanejamento:
+                menor, maior = db.query(func.min(modelo.data), func.max(modelo.data)).filter(*filtro).one()
+                if menor:
+                    datas.extend([menor, maior])
+
+            apagados[modelo.__tablename__] = db.query(modelo).filter(*filtro).delete(synchronize_session=False)
+
+        db.commit()
+
+    except Exception:
+        db.rollback()
+        raise
+
+    return apagados, ((min(datas), max(datas)) if datas else None)
+
+
+if __name__ == "__main__":
+    import sys
+    from database import SessionLocal, engine
+
+    db = SessionLocal()
+    try:
+        if '--aplicar' not in sys.argv[1:]:
+            print("🔍 Registros duplicados por eletricista/dia:")
+            for modelo in MANTER_NA_LIMPEZA:
+                print(f"   {modelo.__tablename__}: {contar_duplicados(db, modelo)}")
+            print("Para remover: python registros_unicos.py --aplicar")
+            sys.exit(0)
+
+        print("🧹 Removendo registros duplicados...")
+        apagados, periodo = remover_duplicados(db)
+        for tabela, total in apagados.items():
+            print(f"   {tabela}: {total} apagados")
+
+        if periodo:
+            from resumo_diario import reconstruir_resumo
+            print(f"📊 Recalculando resumo diário de {periodo[0]} a {periodo[1]}...")
+            reconstruir_resumo(db, *periodo)
+
+        pendentes = preparar_registros_unicos(engine)
+        if pendentes:
+            print(f"⚠️ Índices únicos não criados: {pendentes}")
+        else:
+            print("✅ Índices únicos criados")
+    finally:
+        db.close()
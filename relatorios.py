@@ -0,0 +1,871 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, literal, cast, null, String, union, union_all, select
+from models import (
+    EstruturaEquipes, EquipeDia, Indisponibilidade,
+    MotivoIndisponibilidade, ResumoFrequenciaDiaria, EstruturaVigencia
+)
+
+# Situações consideradas no quadro ativo
+SITUACOES_ATIVAS = ['ATIVO', 'RESERVA']
+
+
+# ============================================
+# FUNÇÃO: Definir período
+# Converte as datas da query string (YYYY-MM-DD)
+# ============================================
+def definir_periodo(data_inicio=None, data_fim=None):
+    """Retorna (data_inicio, data_fim) como date. Sem datas = hoje."""
+    if data_inicio and data_fim:
+        data_inicio_obj = datetime.strptime(data_inicio, '%Y-%m-%d').date()
+        data_fim_obj = datetime.strptime(data_fim, '%Y-%m-%d').date()
+    elif data_inicio:
+        data_inicio_obj = datetime.strptime(data_inicio, '%Y-%m-%d').date()
+        data_fim_obj = data_inicio_obj
+    else:
+        data_inicio_obj = date.today()
+        data_fim_obj = date.today()
+
+    return data_inicio_obj, data_fim_obj
+
+
+def contar_dias(data_inicio, data_fim):
+    """Quantidade de dias no período (0 se o fim for anterior ao início)"""
+    return max((data_fim - data_inicio).days + 1, 0)
+
+
+def formatar_periodo(data_inicio, data_fim):
+    """Bloco 'periodo' usado nas respostas dos relatórios"""
+    return {
+        "inicio": data_inicio.strftime('%d/%m/%Y'),
+        "fim": data_fim.strftime('%d/%m/%Y'),
+        "dias": contar_dias(data_inicio, data_fim)
+    }
+
+
+# ============================================
+# FUNÇÃO: Registrados por dia
+# (eletricista_id, data) distintos em frequência OU indisponibilidade
+# ============================================
+def registrados_no_periodo(data_inicio, data_fim):
+    """Subquery com pares únicos (eletricista_id, data) registrados no período"""
+    return union(
+        select(
+            EquipeDia.eletricista_id.label('eletricista_id'),
+            EquipeDia.data.label('data')
+        ).where(
+            EquipeDia.data.between(data_inicio, data_fim)
+        ),
+        select(
+            Indisponibilidade.eletricista_id.label('eletricista_id'),
+            Indisponibilidade.data.label('data')
+        ).where(
+            Indisponibilidade.data.between(data_inicio, data_fim)
+        )
+    ).subquery('registrados')
+
+
+# ============================================
+# FUNÇÃO: Quadro ativo na data
+# Pela vigência da estrutura (vigencia_estrutura.py)
+# ============================================
+def _quadro_na_data(db, data_inicio, data_fim):
+    """
+    {superv_campo: [ativos em data_fim, ativos-dia no período]}.
+    Ativos-dia soma, para cada intervalo ATIVO/RESERVA, os dias dele
+    dentro do período (base do "Não registrado" quando o quadro muda).
+    """
+    fim_exclusivo = data_fim + timedelta(days=1)
+
+    intervalos = db.query(
+        EstruturaVigencia.superv_campo,
+        EstruturaVigencia.valido_de,
+        EstruturaVigencia.valido_ate
+    ).filter(
+        EstruturaVigencia.descr_situacao.in_(SITUACOES_ATIVAS),
+        EstruturaVigencia.valido_de <= data_fim,
+        EstruturaVigencia.valido_ate > data_inicio
+    )
+
+    quadro = {}
+    for supervisor, valido_de, valido_ate in intervalos:
+        totais = quadro.setdefault(supervisor, [0, 0])
+        if valido_de <= data_fim < valido_ate:
+            totais[0] += 1
+        totais[1] += (min(valido_ate, fim_exclusivo) - max(valido_de, data_inicio)).days
+    return quadro
+
+
+# ============================================
+# RELATÓRIO GERAL
+# ============================================
+def _linhas_geral(db, data_inicio, data_fim, na_data=False):
+    """
+    Linhas (tipo, motivo, qtde) do período em UMA consulta agregada.
+    Cada ramo agrupa por dia (e motivo); a consulta externa soma o período:
+      - P: presentes distintos por dia
+      - I: indisponibilidades por dia e motivo
+      - R: ativos/reserva registrados (frequência ou indisponibilidade) por dia
+      - T: total de ativos/reserva (base do "NÃO REGISTRADO")
+    na_data=True: situação de cada dia pela vigência da estrutura, e T/A
+    (ativos-dia) calculados por _quadro_na_data.
+    """
+    indisponiveis = select(
+        literal('I').label('tipo'),
+        MotivoIndisponibilidade.descricao.label('motivo'),
+        func.count().label('qtde')
+    ).select_from(Indisponibilidade).join(
+        MotivoIndisponibilidade,
+        Indisponibilidade.motivo_id == MotivoIndisponibilidade.id
+    ).where(
+        Indisponibilidade.data.between(data_inicio, data_fim)
+    ).group_by(
+        Indisponibilidade.data,
+        MotivoIndisponibilidade.descricao
+    )
+
+    presentes = select(
+        literal('P'),
+        cast(null(), String),
+        func.count(EquipeDia.eletricista_id.distinct())
+    ).where(
+        EquipeDia.data.between(data_inicio, data_fim)
+    ).group_by(EquipeDia.data)
+
+    registrados = registrados_no_periodo(data_inicio, data_fim)
+    if na_data:
+        from vigencia_estrutura import condicao_vigencia
+        estrutura = EstruturaVigencia
+        juncao = condicao_vigencia(registrados.c.eletricista_id, registrados.c.data)
+    else:
+        estrutura = EstruturaEquipes
+        juncao = registrados.c.eletricista_id == EstruturaEquipes.id
+
+    registrados_ativos = select(
+        literal('R'),
+        cast(null(), String),
+        func.count()
+    ).select_from(registrados).join(
+        estrutura,
+        juncao
+    ).where(
+        estrutura.descr_situacao.in_(SITUACOES_ATIVAS)
+    ).group_by(registrados.c.data)
+
+    partes = [indisponiveis, presentes, registrados_ativos]
+    if not na_data:
+        partes.append(select(
+            literal('T'),
+            cast(null(), String),
+            func.count(EstruturaEquipes.id)
+        ).where(
+            EstruturaEquipes.descr_situacao.in_(SITUACOES_ATIVAS)
+        ))
+
+    partes = union_all(*partes).subquery('partes')
+    linhas = db.execute(
+        select(
+            partes.c.tipo,
+            partes.c.motivo,
+            func.sum(partes.c.qtde)
+        ).group_by(partes.c.tipo, partes.c.motivo)
+    ).all()
+
+    if na_data:
+        quadro = _quadro_na_data(db, data_inicio, data_fim).values()
+        linhas.append(('T', None, sum(q[0] for q in quadro)))
+        linhas.append(('A', None, sum(q[1] for q in quadro)))
+    return linhas
+
+
+def _linhas_geral_resumo(db, data_inicio, data_fim):
+    """Mesmas linhas (tipo, motivo, qtde), lidas do resumo diário"""
+    from resumo_diario import MOTIVO_PRESENTE, MOTIVO_REGISTRADO
+
+    tipos = {MOTIVO_PRESENTE: 'P', MOTIVO_REGISTRADO: 'R'}
+
+    linhas = db.query(
+        ResumoFrequenciaDiaria.motivo,
+        func.sum(ResumoFrequenciaDiaria.qtde)
+    ).filter(
+        ResumoFrequenciaDiaria.data.between(data_inicio, data_fim)
+    ).group_by(ResumoFrequenciaDiaria.motivo).all()
+
+    total_ativos = db.query(func.count(EstruturaEquipes.id)).filter(
+        EstruturaEquipes.descr_situacao.in_(SITUACOES_ATIVAS)
+    ).scalar()
+
+    resultado = [
+        (tipos.get(motivo, 'I'), None if motivo in tipos else motivo, qtde)
+        for motivo, qtde in linhas
+    ]
+    resultado.append(('T', None, total_ativos))
+    return resultado
+
+
+def calcular_relatorio_geral(db, data_inicio, data_fim):
+    """Relatório consolidado do período (PRESENTE, motivos, NÃO REGISTRADO)"""
+    from resumo_diario import USAR_RESUMO_DIARIO
+    from matriz_presenca import USAR_MATRIZ_PRESENCA, matriz_presenca
+    from vigencia_estrutura import vigencia_disponivel
+
+    dias = contar_dias(data_inicio, data_fim)
+
+    if USAR_MATRIZ_PRESENCA:
+        linhas = matriz_presenca.linhas_geral(db, data_inicio, data_fim)
+    elif USAR_RESUMO_DIARIO:
+        linhas = _linhas_geral_resumo(db, data_inicio, data_fim)
+    else:
+        linhas = _linhas_geral(db, data_inicio, data_fim, na_data=vigencia_disponivel(db))
+
+    # Dicionário para contar
+    resultado = {
+        "PRESENTE": 0,
+        "NÃO REGISTRADO": 0
+    }
+    total_eletricistas = 0
+    total_ativos_dia = None
+    total_registrados_ativos = 0
+
+    for tipo, motivo, qtde in linhas:
+        qtde = int(qtde or 0)
+        if tipo == 'I':
+            # Contar por motivo (em MAIÚSCULAS)
+            motivo_upper = motivo.upper()
+            resultado[motivo_upper] = resultado.get(motivo_upper, 0) + qtde
+        elif tipo == 'P':
+            resultado["PRESENTE"] = qtde
+        elif tipo == 'R':
+            total_registrados_ativos = qtde
+        elif tipo == 'T':
+            total_eletricistas = qtde
+        elif tipo == 'A':
+            total_ativos_dia = qtde
+
+    # NÃO REGISTRADOS = quadro ativo em cada dia - ativos registrados no dia
+    if total_ativos_dia is None:
+        total_ativos_dia = total_eletricistas * dias
+    resultado["NÃO REGISTRADO"] = total_ativos_dia - total_registrados_ativos
+
+    # Total de registros SEM os "Não registrado"
+    total_registros = sum(v for k, v in resultado.items() if k != "NÃO REGISTRADO")
+
+    # Calcular percentuais (sobre TODOS, incluindo não registrado)
+    total_geral = sum(resultado.values())
+
+    dados_relatorio = []
+    for motivo, qtde in resultado.items():
+        percentual = (qtde / total_geral * 100) if total_geral > 0 else 0
+        dados_relatorio.append({
+            "motivo": motivo,
+            "qtde": qtde,
+            "percentual": round(percentual, 1)
+        })
+
+    # Ordenar: PRESENTE primeiro, depois alfabético, NÃO REGISTRADO por último
+    dados_relatorio.sort(key=lambda x: (
+        0 if x['motivo'] == 'PRESENTE' else
+        2 if x['motivo'] == 'NÃO REGISTRADO' else
+        1,
+        x['motivo']
+    ))
+
+    return {
+        "success": True,
+        "periodo": formatar_periodo(data_inicio, data_fim),
+        "total_eletricistas": total_eletricistas,
+        "total_registros": total_registros,  # SEM os "Não registrado"
+        "dados": dados_relatorio
+    }
+
+
+# ============================================
+# RELATÓRIO POR SUPERVISOR
+# ============================================
+def _linhas_por_supervisor(db, data_inicio, data_fim, na_data=False):
+    """
+    Linhas (supervisor, tipo, motivo, qtde) agregadas por
+    (superv_campo, data, motivo) em UMA consulta (tipos como no geral).
+    na_data=True: supervisor/situação de cada dia pela vigência da estrutura.
+    """
+    if na_data:
+        from vigencia_estrutura import condicao_vigencia
+        estrutura = EstruturaVigencia
+
+        def juncao(coluna_id, coluna_data):
+            return condicao_vigencia(coluna_id, coluna_data)
+    else:
+        estrutura = EstruturaEquipes
+
+        def juncao(coluna_id, coluna_data):
+            return coluna_id == EstruturaEquipes.id
+
+    ativos = estrutura.descr_situacao.in_(SITUACOES_ATIVAS)
+
+    indisponiveis = select(
+        estrutura.superv_campo.label('supervisor'),
+        literal('I').label('tipo'),
+        MotivoIndisponibilidade.descricao.label('motivo'),
+        func.count().label('qtde')
+    ).select_from(Indisponibilidade).join(
+        MotivoIndisponibilidade,
+        Indisponibilidade.motivo_id == MotivoIndisponibilidade.id
+    ).join(
+        estrutura,
+        juncao(Indisponibilidade.eletricista_id, Indisponibilidade.data)
+    ).where(
+        Indisponibilidade.data.between(data_inicio, data_fim)
+    ).group_by(
+        estrutura.superv_campo,
+        Indisponibilidade.data,
+        MotivoIndisponibilidade.descricao
+    )
+
+    presentes = select(
+        estrutura.superv_campo,
+        literal('P'),
+        cast(null(), String),
+        func.count(EquipeDia.eletricista_id.distinct())
+    ).select_from(EquipeDia).join(
+        estrutura,
+        juncao(EquipeDia.eletricista_id, EquipeDia.data)
+    ).where(
+        EquipeDia.data.between(data_inicio, data_fim)
+    ).group_by(
+        estrutura.superv_campo,
+        EquipeDia.data
+    )
+
+    registrados = registrados_no_periodo(data_inicio, data_fim)
+    registrados_ativos = select(
+        estrutura.superv_campo,
+        literal('R'),
+        cast(null(), String),
+        func.count()
+    ).select_from(registrados).join(
+        estrutura,
+        juncao(registrados.c.eletricista_id, registrados.c.data)
+    ).where(ativos).group_by(
+        estrutura.superv_campo,
+        registrados.c.data
+    )
+
+    partes = [indisponiveis, presentes, registrados_ativos]
+    if not na_data:
+        partes.append(select(
+            EstruturaEquipes.superv_campo,
+            literal('T'),
+            cast(null(), String),
+            func.count(EstruturaEquipes.id)
+        ).where(ativos).group_by(EstruturaEquipes.superv_campo))
+
+    partes = union_all(*partes).subquery('partes')
+    linhas = db.execute(
+        select(
+            partes.c.supervisor,
+            partes.c.tipo,
+            partes.c.motivo,
+            func.sum(partes.c.qtde)
+        ).group_by(
+            partes.c.supervisor,
+            partes.c.tipo,
+            partes.c.motivo
+        )
+    ).all()
+
+    if na_data:
+        for supervisor, (ativos_fim, ativos_dia) in _quadro_na_data(db, data_inicio, data_fim).items():
+            linhas.append((supervisor, 'T', None, ativos_fim))
+            linhas.append((supervisor, 'A', None, ativos_dia))
+    return linhas
+
+
+def _linhas_por_supervisor_resumo(db, data_inicio, data_fim):
+    """Mesmas linhas (supervisor, tipo, motivo, qtde), lidas do resumo diário"""
+    from resumo_diario import MOTIVO_PRESENTE, MOTIVO_REGISTRADO
+
+    tipos = {MOTIVO_PRESENTE: 'P', MOTIVO_REGISTRADO: 'R'}
+
+    linhas = db.query(
+        ResumoFrequenciaDiaria.superv_campo,
+        ResumoFrequenciaDiaria.motivo,
+        func.sum(ResumoFrequenciaDiaria.qtde)
+    ).filter(
+        ResumoFrequenciaDiaria.data.between(data_inicio, data_fim)
+    ).group_by(
+        ResumoFrequenciaDiaria.superv_campo,
+        ResumoFrequenciaDiaria.motivo
+    ).all()
+
+    totais_ativos = db.query(
+        EstruturaEquipes.superv_campo,
+        func.count(EstruturaEquipes.id)
+    ).filter(
+        EstruturaEquipes.descr_situacao.in_(SITUACOES_ATIVAS)
+    ).group_by(EstruturaEquipes.superv_campo).all()
+
+    resultado = [
+        (supervisor, tipos.get(motivo, 'I'), None if motivo in tipos else motivo, qtde)
+        for supervisor, motivo, qtde in linhas
+    ]
+    resultado.extend((supervisor, 'T', None, qtde) for supervisor, qtde in totais_ativos)
+    return resultado
+
+
+def calcular_relatorio_por_supervisor(db, data_inicio, data_fim):
+    """
+    Relatório por supervisor: contadores por motivo de cada supervisor.
+    Uma consulta para os contadores + uma para a lista de motivos.
+    """
+    from resumo_diario import USAR_RESUMO_DIARIO
+    from matriz_presenca import USAR_MATRIZ_PRESENCA, matriz_presenca
+    from vigencia_estrutura import vigencia_disponivel
+
+    dias = contar_dias(data_inicio, data_fim)
+
+    if USAR_MATRIZ_PRESENCA:
+        linhas = matriz_presenca.linhas_por_supervisor(db, data_inicio, data_fim)
+    elif USAR_RESUMO_DIARIO:
+        linhas = _linhas_por_supervisor_resumo(db, data_inicio, data_fim)
+    else:
+        linhas = _linhas_por_supervisor(db, data_inicio, data_fim, na_data=vigencia_disponivel(db))
+
+    # Agrupar as linhas por supervisor
+    totais_ativos = {}
+    ativos_dia = {}
+    totais_registrados = {}
+    presentes_sup = {}
+    motivos_sup = {}
+    for supervisor, tipo, motivo, qtde in linhas:
+        qtde = int(qtde or 0)
+        if tipo == 'T':
+            totais_ativos[supervisor] = qtde
+        elif tipo == 'A':
+            ativos_dia[supervisor] = qtde
+        elif tipo == 'R':
+            totais_registrados[supervisor] = qtde
+        elif tipo == 'P':
+            presentes_sup[supervisor] = qtde
+        elif tipo == 'I':
+            motivos_sup.setdefault(supervisor, {})[motivo] = qtde
+
+    # Supervisores = os que têm eletricistas ATIVOS/RESERVA (no período, se na data)
+    supervisores = sorted(s for s in totais_ativos if s)
+
+    dados_supervisores = []
+    for supervisor in supervisores:
+        total_eletricistas_sup = totais_ativos[supervisor]
+
+        # Contadores por motivo
+        contadores = {
+            "Presente": presentes_sup.get(supervisor, 0),
+            "Não registrado": (
+                ativos_dia.get(supervisor, total_eletricistas_sup * dias)
+                - totais_registrados.get(supervisor, 0)
+            )
+        }
+        contadores.update(motivos_sup.get(supervisor, {}))
+
+        # Calcular totais
+        total_registros = sum(contadores.values())
+        percentual_presenca = (contadores["Presente"] / total_registros * 100) if total_registros > 0 else 0
+
+        dados_supervisores.append({
+            "supervisor": supervisor,
+            "total_eletricistas": total_eletricistas_sup,
+            "contadores": contadores,
+            "total_registros": total_registros,
+            "percentual_presenca": round(percentual_presenca, 1)
+        })
+
+    # Ordenar por % de presença (decrescente)
+    dados_supervisores.sort(key=lambda x: x['percentual_presenca'], reverse=True)
+
+    # Calcular totais gerais
+    total_geral = sum([s['total_registros'] for s in dados_supervisores])
+
+    # Buscar todos os motivos possíveis
+    todos_motivos = set(m[0] for m in db.query(MotivoIndisponibilidade.descricao).all())
+
+    return {
+        "success": True,
+        "periodo": formatar_periodo(data_inicio, data_fim),
+        "todos_motivos": sorted(list(todos_motivos)),
+        "dados": dados_supervisores,
+        "total_geral": total_geral
+    }
+
+
+# ============================================
+# SÉRIE DIÁRIA (tendência de presença)
+# ============================================
+def _filtrar_estrutura(consulta, estrutura, supervisor, base):
+    """Aplica os filtros opcionais de supervisor/base"""
+    if supervisor:
+        consulta = consulta.where(estrutura.superv_campo == supervisor)
+    if base:
+        consulta = consulta.where(estrutura.base == base)
+    return consulta
+
+
+def _linhas_serie(db, data_inicio, data_fim, supervisor=None, base=None, na_data=False):
+    """
+    Linhas (data, tipo, motivo, qtde) por dia em UMA consulta agrupada
+    (tipos P/I/R como em _linhas_geral).
+    """
+    if na_data:
+        from vigencia_estrutura import condicao_vigencia
+        estrutura = EstruturaVigencia
+
+        def juncao(coluna_id, coluna_data):
+            return condicao_vigencia(coluna_id, coluna_data)
+    else:
+        estrutura = EstruturaEquipes
+
+        def juncao(coluna_id, coluna_data):
+            return coluna_id == EstruturaEquipes.id
+
+    indisponiveis = _filtrar_estrutura(select(
+        Indisponibilidade.data.label('data'),
+        literal('I').label('tipo'),
+        MotivoIndisponibilidade.descricao.label('motivo'),
+        func.count().label('qtde')
+    ).select_from(Indisponibilidade).join(
+        MotivoIndisponibilidade,
+        Indisponibilidade.motivo_id == MotivoIndisponibilidade.id
+    ).outerjoin(
+        estrutura,
+        juncao(Indisponibilidade.eletricista_id, Indisponibilidade.data)
+    ).where(
+        Indisponibilidade.data.between(data_inicio, data_fim)
+    ), estrutura, supervisor, base).group_by(
+        Indisponibilidade.data,
+        MotivoIndisponibilidade.descricao
+    )
+
+    presentes = _filtrar_estrutura(select(
+        EquipeDia.data,
+        literal('P'),
+        cast(null(), String),
+        func.count(EquipeDia.eletricista_id.distinct())
+    ).select_from(EquipeDia).outerjoin(
+        estrutura,
+        juncao(EquipeDia.eletricista_id, EquipeDia.data)
+    ).where(
+        EquipeDia.data.between(data_inicio, data_fim)
+    ), estrutura, supervisor, base).group_by(EquipeDia.data)
+
+    registrados = registrados_no_periodo(data_inicio, data_fim)
+    registrados_ativos = _filtrar_estrutura(select(
+        registrados.c.data,
+        literal('R'),
+        cast(null(), String),
+        func.count()
+    ).select_from(registrados).join(
+        estrutura,
+        juncao(registrados.c.eletricista_id, registrados.c.data)
+    ).where(
+        estrutura.descr_situacao.in_(SITUACOES_ATIVAS)
+    ), estrutura, supervisor, base).group_by(registrados.c.data)
+
+    return db.execute(union_all(indisponiveis, presentes, registrados_ativos)).all()
+
+
+def _linhas_serie_resumo(db, data_inicio, data_fim, supervisor=None, base=None):
+    """Mesmas linhas (data, tipo, motivo, qtde), lidas do resumo diário"""
+    from resumo_diario import MOTIVO_PRESENTE, MOTIVO_REGISTRADO
+
+    tipos = {MOTIVO_PRESENTE: 'P', MOTIVO_REGISTRADO: 'R'}
+
+    consulta = db.query(
+        ResumoFrequenciaDiaria.data,
+        ResumoFrequenciaDiaria.motivo,
+        func.sum(ResumoFrequenciaDiaria.qtde)
+    ).filter(
+        ResumoFrequenciaDiaria.data.between(data_inicio, data_fim)
+    )
+    if supervisor:
+        consulta = consulta.filter(ResumoFrequenciaDiaria.superv_campo == supervisor)
+    if base:
+        consulta = consulta.filter(ResumoFrequenciaDiaria.base == base)
+
+    linhas = consulta.group_by(
+        ResumoFrequenciaDiaria.data,
+        ResumoFrequenciaDiaria.motivo
+    ).all()
+
+    return [
+        (data, tipos.get(motivo, 'I'), None if motivo in tipos else motivo, qtde)
+        for data, motivo, qtde in linhas
+    ]
+
+
+def _quadro_por_dia(db, data_inicio, data_fim, supervisor=None, base=None, na_data=False):
+    """Ativos/reserva em cada dia do período (lista na ordem das datas)"""
+    dias = contar_dias(data_inicio, data_fim)
+
+    if not na_data:
+        consulta = db.query(func.count(EstruturaEquipes.id)).filter(
+            EstruturaEquipes.descr_situacao.in_(SITUACOES_ATIVAS)
+        )
+        if supervisor:
+            consulta = consulta.filter(EstruturaEquipes.superv_campo == supervisor)
+        if base:
+            consulta = consulta.filter(EstruturaEquipes.base == base)
+        return [consulta.scalar() or 0] * dias
+
+    consulta = db.query(
+        EstruturaVigencia.valido_de,
+        EstruturaVigencia.valido_ate
+    ).filter(
+        EstruturaVigencia.descr_situacao.in_(SITUACOES_ATIVAS),
+        EstruturaVigencia.valido_de <= data_fim,
+        EstruturaVigencia.valido_ate > data_inicio
+    )
+    if supervisor:
+        consulta = consulta.filter(EstruturaVigencia.superv_campo == supervisor)
+    if base:
+        consulta = consulta.filter(EstruturaVigencia.base == base)
+
+    # Vetor de diferenças: +1 no início do intervalo, -1 depois do fim
+    variacao = [0] * (dias + 1)
+    for valido_de, valido_ate in consulta:
+        variacao[(max(valido_de, data_inicio) - data_inicio).days] += 1
+        variacao[min((valido_ate - data_inicio).days, dias)] -= 1
+
+    quadro = []
+    total = 0
+    for i in range(dias):
+        total += variacao[i]
+        quadro.append(total)
+    return quadro
+
+
+def calcular_serie_diaria(db, data_inicio, data_fim, supervisor=None, base=None):
+    """
+    Série diária em formato colunar: uma lista por indicador, alinhada
+    com a lista de datas (PRESENTE, cada motivo, NÃO REGISTRADO).
+    """
+    from resumo_diario import USAR_RESUMO_DIARIO
+    from vigencia_estrutura import vigencia_disponivel
+
+    dias = contar_dias(data_inicio, data_fim)
+    datas = [data_inicio + timedelta(days=i) for i in range(dias)]
+    posicao = {data: i for i, data in enumerate(datas)}
+
+    if USAR_RESUMO_DIARIO:
+        na_data = False
+        linhas = _linhas_serie_resumo(db, data_inicio, data_fim, supervisor, base)
+    else:
+        na_data = vigencia_disponivel(db)
+        linhas = _linhas_serie(db, data_inicio, data_fim, supervisor, base, na_data)
+
+    quadro = _quadro_por_dia(db, data_inicio, data_fim, supervisor, base, na_data)
+
+    presentes = [0] * dias
+    registrados = [0] * dias
+    motivos = {}
+    for data, tipo, motivo, qtde in linhas:
+        i = posicao[data]
+        qtde = int(qtde or 0)
+        if tipo == 'P':
+            presentes[i] += qtde
+        elif tipo == 'R':
+            registrados[i] += qtde
+        elif tipo == 'I':
+            serie = motivos.setdefault(motivo.upper(), [0] * dias)
+            serie[i] += qtde
+
+    series = {"PRESENTE": presentes}
+    for motivo in sorted(motivos):
+        series[motivo] = motivos[motivo]
+    series["NÃO REGISTRADO"] = [q - r for q, r in zip(quadro, registrados)]
+
+    return {
+        "success": True,
+        "periodo": formatar_periodo(data_inicio, data_fim),
+        "filtros": {"supervisor": supervisor, "base": base},
+        "datas": [data.strftime('%d/%m/%Y') for data in datas],
+        "quadro_ativo": quadro,
+        "series": series
+    }
+
+
+# ============================================
+# RELATÓRIO POR PREFIXO
+# ============================================
+def _contagem_por_prefixo(data_inicio, data_fim):
+    """Subquery (prefixo, motivo, qtde, primeira_data) das indisponibilidades"""
+    return select(
+        Indisponibilidade.prefixo.label('prefixo'),
+        MotivoIndisponibilidade.descricao.label('motivo'),
+        func.count().label('qtde'),
+        func.min(Indisponibilidade.data).label('primeira_data')
+    ).select_from(Indisponibilidade).join(
+        MotivoIndisponibilidade,
+        Indisponibilidade.motivo_id == MotivoIndisponibilidade.id
+    ).where(
+        Indisponibilidade.data.between(data_inicio, data_fim),
+        Indisponibilidade.prefixo != ''
+    ).group_by(
+        Indisponibilidade.prefixo,
+        MotivoIndisponibilidade.descricao
+    ).subquery('contagem')
+
+
+def _contagem_por_prefixo_resumo(data_inicio, data_fim):
+    """Mesma subquery de contagem, lida do resumo diário"""
+    from resumo_diario import MARCADORES
+
+    return select(
+        ResumoFrequenciaDiaria.prefixo.label('prefixo'),
+        ResumoFrequenciaDiaria.motivo.label('motivo'),
+        func.sum(ResumoFrequenciaDiaria.qtde).label('qtde'),
+        func.min(ResumoFrequenciaDiaria.data).label('primeira_data')
+    ).where(
+        ResumoFrequenciaDiaria.data.between(data_inicio, data_fim),
+        ResumoFrequenciaDiaria.motivo.notin_(MARCADORES),
+        ResumoFrequenciaDiaria.prefixo != ''
+    ).group_by(
+        ResumoFrequenciaDiaria.prefixo,
+        ResumoFrequenciaDiaria.motivo
+    ).subquery('contagem')
+
+
+def calcular_relatorio_por_prefixo(db, data_inicio, data_fim):
+    """
+    Relatório por prefixo: primeira data e os 2 motivos mais frequentes
+    de cada prefixo, ranqueados no banco (window function).
+    """
+    from resumo_diario import USAR_RESUMO_DIARIO
+
+    # Total de prefixos ATIVOS
+    total_prefixos_ativos = db.query(
+        func.count(EstruturaEquipes.prefixo.distinct())
+    ).filter(
+        EstruturaEquipes.descr_situacao.in_(SITUACOES_ATIVAS),
+        EstruturaEquipes.prefixo != ''
+    ).scalar() or 0
+
+    # Quantidade e primeira data de cada motivo por prefixo
+    if USAR_RESUMO_DIARIO:
+        contagem = _contagem_por_prefixo_resumo(data_inicio, data_fim)
+    else:
+        contagem = _contagem_por_prefixo(data_inicio, data_fim)
+
+    # Ranking dos motivos dentro de cada prefixo (empate: o que apareceu primeiro)
+    ranking = select(
+        contagem.c.prefixo,
+        contagem.c.motivo,
+        func.min(contagem.c.primeira_data).over(
+            partition_by=contagem.c.prefixo
+        ).label('primeira_data'),
+        func.row_number().over(
+            partition_by=contagem.c.prefixo,
+            order_by=(
+                contagem.c.qtde.desc(),
+                contagem.c.primeira_data,
+                contagem.c.motivo
+            )
+        ).label('posicao')
+    ).subquery('ranking')
+
+    linhas = db.execute(
+        select(
+            ranking.c.prefixo,
+            ranking.c.motivo,
+            ranking.c.primeira_data,
+            ranking.c.posicao
+        ).where(
+            ranking.c.posicao <= 2
+        ).order_by(
+            ranking.c.prefixo,
+            ranking.c.posicao
+        )
+    ).all()
+
+    # Preparar dados para resposta (já ordenados por prefixo)
+    dados_prefixos = []
+    for prefixo, motivo, primeira_data, posicao in linhas:
+        if posicao == 1:
+            dados_prefixos.append({
+                "prefixo": prefixo,
+                "data": primeira_data.strftime('%d/%m/%Y'),
+                "motivo1": motivo,
+                "motivo2": "-"
+            })
+        else:
+            dados_prefixos[-1]["motivo2"] = motivo
+
+    return {
+        "success": True,
+        "periodo": formatar_periodo(data_inicio, data_fim),
+        "total_prefixos": total_prefixos_ativos,
+        "total_registros": len(dados_prefixos),
+        "dados": dados_prefixos
+    }
+
+
+# ============================================
+# RELATÓRIO DE ELETRICISTAS DISPONÍVEIS
+# ============================================
+def _ou_traco(coluna):
+    """Coluna com '-' no lugar de vazio/NULL (equivalente a `valor or "-"`)"""
+    return func.coalesce(func.nullif(coluna, ''), '-')
+
+
+def consultar_eletricistas_disponiveis(data_inicio, data_fim):
+    """
+    SELECT dos ATIVOS/RESERVA sem NENHUM registro (frequência ou
+    indisponibilidade) no período, via anti-join NOT EXISTS.
+    Traz apenas as colunas da saída, já ordenadas por polo, base e matrícula.
+    """
+    polo = _ou_traco(EstruturaEquipes.polo)
+    base = _ou_traco(EstruturaEquipes.base)
+
+    com_frequencia = select(EquipeDia.id).where(
+        EquipeDia.eletricista_id == EstruturaEquipes.id,
+        EquipeDia.data.between(data_inicio, data_fim)
+    ).exists()
+
+    com_indisponibilidade = select(Indisponibilidade.id).where(
+        Indisponibilidade.eletricista_id == EstruturaEquipes.id,
+        Indisponibilidade.data.between(data_inicio, data_fim)
+    ).exists()
+
+    return select(
+        polo.label('polo'),
+        base.label('base'),
+        EstruturaEquipes.matricula.label('matricula'),
+        EstruturaEquipes.colaborador.label('colaborador'),
+        _ou_traco(EstruturaEquipes.processo_equipe).label('processo_equipe'),
+        _ou_traco(EstruturaEquipes.superv_campo).label('superv_campo'),
+        _ou_traco(EstruturaEquipes.superv_operacao).label('superv_operacao')
+    ).where(
+        EstruturaEquipes.descr_situacao.in_(SITUACOES_ATIVAS),
+        ~com_frequencia,
+        ~com_indisponibilidade
+    ).order_by(
+        polo,
+        base,
+        EstruturaEquipes.matricula
+    )
+
+
+def calcular_relatorio_eletricistas_disponiveis(db, data_inicio, data_fim):
+    """Relatório de eletricistas DISPONÍVEIS (não registrados) no período"""
+    total_eletricistas = db.query(func.count(EstruturaEquipes.id)).filter(
+        EstruturaEquipes.descr_situacao.in_(SITUACOES_ATIVAS)
+    ).scalar() or 0
+
+    dados_disponiveis = [
+        dict(linha._mapping)
+        for linha in db.execute(consultar_eletricistas_disponiveis(data_inicio, data_fim))
+    ]
+
+    return {
+        "success": True,
+        "periodo": formatar_periodo(data_inicio, data_fim),
+        "total_eletricistas": total_eletricistas,
+        "total_disponiveis": len(dados_disponiveis),
+        "dados": dados_disponiveis
+    }
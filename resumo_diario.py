@@ -0,0 +1,291 @@
+"""
+Resumo diário de frequência (tabela de fatos dos relatórios)
+
+Cada linha de resumo_frequencia_diaria guarda uma contagem por
+(data, superv_campo, base, prefixo, motivo). Além das descrições de motivo,
+a coluna motivo usa dois marcadores:
+  - '#PRESENTE'   → eletricistas distintos na frequência do dia
+  - '#REGISTRADO' → ATIVOS/RESERVA distintos com qualquer registro no dia
+                    (base do cálculo de "Não registrado")
+
+A tabela é atualizada na MESMA transação das gravações de frequência e
+indisponibilidade. Para popular/corrigir o histórico:
+    python resumo_diario.py [data_inicio] [data_fim]
+"""
+
+import os
+from datetime import datetime
+from sqlalchemy import func, literal, select, union, insert as sql_insert
+from models import (
+    EstruturaEquipes, EquipeDia, Indisponibilidade,
+    MotivoIndisponibilidade, ResumoFrequenciaDiaria
+)
+from relatorios import SITUACOES_ATIVAS
+
+MOTIVO_PRESENTE = '#PRESENTE'
+MOTIVO_REGISTRADO = '#REGISTRADO'
+MARCADORES = (MOTIVO_PRESENTE, MOTIVO_REGISTRADO)
+
+# Relatórios leem do resumo quando habilitado (após a primeira reconstrução)
+USAR_RESUMO_DIARIO = os.getenv('USAR_RESUMO_DIARIO', '0').lower() in ('1', 'true', 'sim')
+
+CHAVE_RESUMO = ['data', 'superv_campo', 'base', 'prefixo', 'motivo']
+
+
+# ============================================
+# FUNÇÃO: Gravar incrementos
+# ============================================
+def _somar_incrementos(db, incrementos):
+    """
+    Soma os incrementos {(data, superv, base, prefixo, motivo): qtde}
+    no resumo com INSERT ... ON CONFLICT DO UPDATE (seguro com concorrência).
+    """
+    if not incrementos:
+        return
+
+    linhas = [
+        dict(zip(CHAVE_RESUMO, chave), qtde=qtde)
+        for chave, qtde in incrementos.items()
+    ]
+    tabela = ResumoFrequenciaDiaria.__table__
+    dialeto = db.get_bind().dialect.name
+
+    if dialeto in ('postgresql', 'sqlite'):
+        if dialeto == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        stmt = insert(tabela).values(linhas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=CHAVE_RESUMO,
+            set_={'qtde': tabela.c.qtde + stmt.excluded.qtde}
+        )
+        db.execute(stmt)
+        return
+
+    # Outros bancos: atualiza ou insere linha a linha
+    for linha in linhas:
+        existente = db.query(ResumoFrequenciaDiaria).filter_by(
+            **{c: linha[c] for c in CHAVE_RESUMO}
+        ).first()
+        if existente:
+            existente.qtde += linha['qtde']
+        else:
+            db.add(ResumoFrequenciaDiaria(**linha))
+
+
+def _dados_eletricistas(db, ids):
+    """{id: (superv_campo, base, ativo)} para os eletricistas informados"""
+    if not ids:
+        return {}
+
+    linhas = db.query(
+        EstruturaEquipes.id,
+        EstruturaEquipes.superv_campo,
+        EstruturaEquipes.base,
+        EstruturaEquipes.descr_situacao
+    ).filter(EstruturaEquipes.id.in_(ids)).all()
+
+    return {
+        id_: (superv or '', base or '', situacao in SITUACOES_ATIVAS)
+        for id_, superv, base, situacao in linhas
+    }
+
+
+# ============================================
+# ATUALIZAÇÃO INCREMENTAL (chamar ANTES do commit)
+# ============================================
+def incrementar_frequencia(db, data, associacoes, novas=False):
+    """
+    Contabiliza novas presenças no resumo.
+    associacoes: lista de (eletricista_id, prefixo) que serão inseridos.
+    Deve ser chamada antes de adicionar os EquipeDia na sessão, para
+    enxergar apenas os registros que já existiam na data.
+    novas=True: associações JÁ inseridas com o índice único (equipes_dia),
+    ou seja, a primeira presença de cada eletricista na data.
+    """
+    ids = {int(eletricista_id) for eletricista_id, _ in associacoes}
+    if not ids:
+        return
+
+    # Quem já estava registrado na data (frequência / indisponibilidade)
+    ja_presentes = set() if novas else {i[0] for i in db.query(EquipeDia.eletricista_id).filter(
+        EquipeDia.data == data,
+        EquipeDia.eletricista_id.in_(ids)
+    ).all()}
+    ja_indisponiveis = {i[0] for i in db.query(Indisponibilidade.eletricista_id).filter(
+        Indisponibilidade.data == data,
+        Indisponibilidade.eletricista_id.in_(ids)
+    ).all()}
+
+    dados = _dados_eletricistas(db, ids)
+    incrementos = {}
+
+    for eletricista_id, prefixo in associacoes:
+        eletricista_id = int(eletricista_id)
+
+        # Presença conta eletricistas DISTINTOS por dia
+        if eletricista_id in ja_presentes:
+            continue
+        ja_presentes.add(eletricista_id)
+
+        superv, base, ativo = dados.get(eletricista_id, ('', '', False))
+        chave = (data, superv, base, prefixo or '', MOTIVO_PRESENTE)
+        incrementos[chave] = incrementos.get(chave, 0) + 1
+
+        if ativo and eletricista_id not in ja_indisponiveis:
+            chave = (data, superv, base, '', MOTIVO_REGISTRADO)
+            incrementos[chave] = incrementos.get(chave, 0) + 1
+
+    _somar_incrementos(db, incrementos)
+
+
+def incrementar_indisponibilidade(db, data, eletricista, prefixo, motivo, primeiro_registro=True):
+    """
+    Contabiliza uma nova indisponibilidade no resumo.
+    eletricista: objeto EstruturaEquipes; motivo: descrição do motivo.
+    primeiro_registro: False se o eletricista já tinha frequência na data.
+    """
+    incrementar_indisponibilidades(db, data, [(eletricista, prefixo, motivo)], primeiro_registro)
+
+
+def incrementar_indisponibilidades(db, data, registros, primeiro_registro=True):
+    """
+    Contabiliza várias indisponibilidades da data em um único comando.
+    registros: lista de (eletricista, prefixo, descrição do motivo).
+    """
+    incrementos = {}
+
+    for eletricista, prefixo, motivo in registros:
+        superv = eletricista.superv_campo or ''
+        base = eletricista.base or ''
+
+        chave = (data, superv, base, prefixo or '', motivo)
+        incrementos[chave] = incrementos.get(chave, 0) + 1
+
+        if primeiro_registro and eletricista.descr_situacao in SITUACOES_ATIVAS:
+            chave = (data, superv, base, '', MOTIVO_REGISTRADO)
+            incrementos[chave] = incrementos.get(chave, 0) + 1
+
+    _somar_incrementos(db, incrementos)
+
+
+# ============================================
+# RECONSTRUÇÃO (backfill)
+# ============================================
+def reconstruir_resumo(db, data_inicio=None, data_fim=None):
+    """
+    Recalcula o resumo a partir de equipes_dia e indisponibilidades.
+    Sem datas, usa todo o intervalo existente nas duas tabelas.
+    Retorna o total de linhas geradas.
+    """
+    if data_inicio is None or data_fim is None:
+        limites = [
+            db.query(func.min(EquipeDia.data), func.max(EquipeDia.data)).one(),
+            db.query(func.min(Indisponibilidade.data), func.max(Indisponibilidade.data)).one()
+        ]
+        minimos = [l[0] for l in limites if l[0]]
+        maximos = [l[1] for l in limites if l[1]]
+        if not minimos:
+            return 0
+        data_inicio = data_inicio or min(minimos)
+        data_fim = data_fim or max(maximos)
+
+    try:
+        db.query(ResumoFrequenciaDiaria).filter(
+            ResumoFrequenciaDiaria.data.between(data_inicio, data_fim)
+        ).delete(synchronize_session=False)
+
+        superv = func.coalesce(EstruturaEquipes.superv_campo, '')
+        base = func.coalesce(EstruturaEquipes.base, '')
+        colunas = ['data', 'superv_campo', 'base', 'prefixo', 'motivo', 'qtde']
+
+        # 1. PRESENTES (1 prefixo por eletricista/dia)
+        presencas = select(
+            EquipeDia.eletricista_id,
+            EquipeDia.data,
+            func.min(EquipeDia.prefixo).label('prefixo')
+        ).where(
+            EquipeDia.data.between(data_inicio, data_fim)
+        ).group_by(
+            EquipeDia.eletricista_id,
+            EquipeDia.data
+        ).subquery('presencas')
+        prefixo = func.coalesce(presencas.c.prefixo, '')
+
+        sel_presentes = select(
+            presencas.c.data, superv, base, prefixo,
+            literal(MOTIVO_PRESENTE), func.count()
+        ).select_from(presencas).outerjoin(
+            EstruturaEquipes,
+            presencas.c.eletricista_id == EstruturaEquipes.id
+        ).group_by(presencas.c.data, superv, base, prefixo)
+
+        # 2. INDISPONÍVEIS por motivo
+        prefixo = func.coalesce(Indisponibilidade.prefixo, '')
+        sel_indisponiveis = select(
+            Indisponibilidade.data, superv, base, prefixo,
+            MotivoIndisponibilidade.descricao, func.count()
+        ).select_from(Indisponibilidade).join(
+            MotivoIndisponibilidade,
+            Indisponibilidade.motivo_id == MotivoIndisponibilidade.id
+        ).outerjoin(
+            EstruturaEquipes,
+            Indisponibilidade.eletricista_id == EstruturaEquipes.id
+        ).where(
+            Indisponibilidade.data.between(data_inicio, data_fim)
+        ).group_by(
+            Indisponibilidade.data, superv, base, prefixo,
+            MotivoIndisponibilidade.descricao
+        )
+
+        # 3. ATIVOS/RESERVA registrados (frequência OU indisponibilidade)
+        registrados = union(
+            select(EquipeDia.eletricista_id, EquipeDia.data).where(
+                EquipeDia.data.between(data_inicio, data_fim)
+            ),
+            select(Indisponibilidade.eletricista_id, Indisponibilidade.data).where(
+                Indisponibilidade.data.between(data_inicio, data_fim)
+            )
+        ).subquery('registrados')
+
+        sel_registrados = select(
+            registrados.c.data, superv, base, literal(''),
+            literal(MOTIVO_REGISTRADO), func.count()
+        ).select_from(registrados).join(
+            EstruturaEquipes,
+            registrados.c.eletricista_id == EstruturaEquipes.id
+        ).where(
+            EstruturaEquipes.descr_situacao.in_(SITUACOES_ATIVAS)
+        ).group_by(registrados.c.data, superv, base)
+
+        tabela = ResumoFrequenciaDiaria.__table__
+        total = 0
+        for sel in (sel_presentes, sel_indisponiveis, sel_registrados):
+            resultado = db.execute(sql_insert(tabela).from_select(colunas, sel))
+            total += resultado.rowcount or 0
+
+        db.commit()
+        return total
+
+    except Exception:
+        db.rollback()
+        raise
+
+
+if __name__ == "__main__":
+    import sys
+    from database import SessionLocal
+
+    datas = [datetime.strptime(d, '%Y-%m-%d').date() for d in sys.argv[1:3]]
+    if len(datas) == 1:
+        datas.append(datas[0])
+
+    db = SessionLocal()
+    try:
+        print("📊 Reconstruindo resumo diário de frequência...")
+        total = reconstruir_resumo(db, *datas)
+        print(f"✅ {total} linhas de resumo geradas")
+    finally:
+        db.close()
@@ -0,0 +1,218 @@
+"""
+Sincronização incremental do registro (/api/sincronizar)
+
+Toda gravação em equipes_dia, indisponibilidades e remanejamentos acrescenta
+uma linha em alteracoes_registro, na mesma transação (registrar_alteracoes).
+O cliente guarda o cursor (seq) da data e recebe só os eletricistas que
+mudaram depois dele, com o estado atual de cada um - poucas linhas de JSON
+em vez de recarregar a página inteira.
+
+Transações simultâneas podem confirmar fora da ordem do seq. Por isso o
+cursor devolvido só avança até as alterações com mais de SYNC_JANELA_S
+segundos (padrão 5); as mais novas vêm de novo na sincronização seguinte
+(aplicar duas vezes não muda o estado no cliente).
+
+O log é apagado após SYNC_RETENCAO_DIAS dias (padrão 7).
+
+O mesmo pedido traz as operações que o navegador guardou enquanto estava
+sem rede ("pendentes"). Cada uma reusa a chave de idempotência do envio
+que falhou: se ele chegou a gravar, o servidor só devolve a resposta.
+"""
+
+import os
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from models import (
+    AlteracaoRegistro, EquipeDia, Indisponibilidade,
+    MotivoIndisponibilidade, Remanejamento
+)
+
+SYNC_JANELA_S = float(os.getenv('SYNC_JANELA_S', 5))
+SYNC_RETENCAO_DIAS = int(os.getenv('SYNC_RETENCAO_DIAS', 7))
+SYNC_MAX_PENDENTES = 100
+
+TIPOS_ALTERACAO = {EquipeDia: 'F', Indisponibilidade: 'I', Remanejamento: 'R'}
+
+# Limpeza do log no máximo a cada 10 minutos por processo
+INTERVALO_LIMPEZA = 600
+_ultima_limpeza = 0.0
+
+
+# ============================================
+# GRAVAÇÃO DO LOG
+# ============================================
+def registrar_alteracoes(db, modelo, gravados):
+    """Acrescenta ao log os [(data, eletricista_id)] gravados no modelo (sem commit)"""
+    global _ultima_limpeza
+
+    if not gravados:
+        return
+
+    agora = datetime.now()
+    if time.monotonic() - _ultima_limpeza > INTERVALO_LIMPEZA:
+        _ultima_limpeza = time.monotonic()
+        db.query(AlteracaoRegistro).filter(
+            AlteracaoRegistro.criado_em < agora - timedelta(days=SYNC_RETENCAO_DIAS)
+        ).delete(synchronize_session=False)
+
+    db.execute(insert(AlteracaoRegistro.__table__).values([
+        {
+            "data": data,
+            "tipo": TIPOS_ALTERACAO[modelo],
+            "eletricista_id": eletricista_id,
+            "criado_em": agora
+        }
+        for data, eletricista_id in gravados
+    ]))
+
+
+# ============================================
+# CONSULTA
+# ============================================
+def _ids_alterados(db, data, cursor):
+    """({tipo: ids} alterados depois do cursor, novo cursor)"""
+    alteracoes = db.query(
+        AlteracaoRegistro.seq,
+        AlteracaoRegistro.tipo,
+        AlteracaoRegistro.eletricista_id,
+        AlteracaoRegistro.criado_em
+    ).filter(
+        AlteracaoRegistro.data == data,
+        AlteracaoRegistro.seq > cursor
+    ).order_by(AlteracaoRegistro.seq).all()
+
+    assentadas_ate = datetime.now() - timedelta(seconds=SYNC_JANELA_S)
+    ids = {tipo: set() for tipo in TIPOS_ALTERACAO.values()}
+    novo_cursor = cursor
+    pendente = False
+
+    for seq, tipo, eletricista_id, criado_em in alteracoes:
+        ids[tipo].add(eletricista_id)
+        # O cursor só passa por alterações assentadas e sem lacunas antes delas
+        if criado_em > assentadas_ate:
+            pendente = True
+        elif not pendente:
+            novo_cursor = seq
+
+    return ids, novo_cursor
+
+
+def alteracoes_desde(db, data, cursor=0):
+    """
+    Estado atual dos eletricistas alterados na data depois do cursor.
+    cursor 0 = sincronização completa (todos os registros da data).
+    """
+    completo = not cursor or cursor < 0
+    if completo:
+        ids = None
+        _, novo_cursor = _ids_alterados(db, data, 0)
+    else:
+        ids, novo_cursor = _ids_alterados(db, data, cursor)
+
+    def filtrar(query, modelo, tipo):
+        query = query.filter(modelo.data == data)
+        if ids is not None:
+            if not ids[tipo]:
+                return []
+            query = query.filter(modelo.eletricista_id.in_(ids[tipo]))
+        return query.order_by(modelo.eletricista_id).all()
+
+    frequencia = filtrar(
+        db.query(EquipeDia.eletricista_id, EquipeDia.prefixo),
+        EquipeDia, 'F'
+    )
+    indisponibilidades = filtrar(
+        db.query(
+            Indisponibilidade.eletricista_id,
+            Indisponibilidade.prefixo,
+            Indisponibilidade.tipo_indisponibilidade,
+            MotivoIndisponibilidade.descricao
+        ).outerjoin(
+            MotivoIndisponibilidade,
+            Indisponibilidade.motivo_id == MotivoIndisponibilidade.id
+        ),
+        Indisponibilidade, 'I'
+    )
+    remanejamentos = filtrar(
+        db.query(
+            Remanejamento.eletricista_id,
+            Remanejamento.supervisor_origem,
+            Remanejamento.supervisor_destino
+        ),
+        Remanejamento, 'R'
+    )
+
+    return {
+        "cursor": novo_cursor,
+        "completo": completo,
+        "data": data.strftime('%Y-%m-%d'),
+        "frequencia": [
+            {"eletricista_id": i, "prefixo": prefixo}
+            for i, prefixo in frequencia
+        ],
+        "indisponibilidades": [
+            {"eletricista_id": i, "prefixo": prefixo, "tipo": tipo, "motivo": motivo}
+            for i, prefixo, tipo, motivo in indisponibilidades
+        ],
+        "remanejamentos": [
+            {"eletricista_id": i, "supervisor_origem": origem, "supervisor_destino": destino}
+            for i, origem, destino in remanejamentos
+        ]
+    }
+
+
+# ============================================
+# OPERAÇÕES PENDENTES (offline)
+# ============================================
+# Tipo da operação -> rota do envio online (a chave de idempotência é a mesma)
+ROTAS_PENDENTES = {
+    'frequencia': 'salvar-frequencia',
+    'indisponibilidade': 'salvar-indisponibilidade',
+    'remanejamento': 'remanejar-eletricistas'
+}
+
+
+def pedido_pendente(pendente, supervisor, usuario_id):
+    """
+    (rota, função registrar_*, argumentos) de uma operação pendente.
+    ValueError se a operação for inválida.
+    """
+    from gravacao_frequencia import (
+        TIPOS_INDISPONIBILIDADE, registrar_frequencia,
+        registrar_indisponibilidade, registrar_remanejamentos
+    )
+
+    if not isinstance(pendente, dict) or pendente.get('tipo') not in ROTAS_PENDENTES:
+        raise ValueError("Operação pendente inválida")
+
+    tipo = pendente['tipo']
+    try:
+        data = datetime.strptime(str(pendente.get('data')), '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError("Data da operação pendente inválida")
+
+    if tipo == 'frequencia':
+        associacoes = pendente.get('associacoes')
+        if not associacoes or not isinstance(associacoes, list):
+            raise ValueError("Nenhuma associação enviada")
+        return ROTAS_PENDENTES[tipo], registrar_frequencia, (data, associacoes, supervisor, usuario_id)
+
+    if tipo == 'indisponibilidade':
+        if pendente.get('tipo_indisponibilidade') not in TIPOS_INDISPONIBILIDADE:
+            raise ValueError("⚠️ Selecione o tipo de indisponibilidade (Parcial ou Total)")
+        return ROTAS_PENDENTES[tipo], registrar_indisponibilidade, (
+            data,
+            pendente.get('eletricista_id'),
+            pendente.get('prefixo'),
+            pendente['tipo_indisponibilidade'],
+            pendente.get('motivo_id'),
+            pendente.get('observacoes', ''),
+            usuario_id
+        )
+
+    # eletricista_id: operação guardada por versão anterior da página
+    eletricista_ids = pendente.get('eletricista_ids') or [pendente.get('eletricista_id')]
+    if not isinstance(eletricista_ids, list) or not any(eletricista_ids):
+        raise ValueError("Nenhum eletricista informado")
+    return ROTAS_PENDENTES[tipo], registrar_remanejamentos, (data, eletricista_ids, supervisor, usuario_id)
@@ -0,0 +1,81 @@
+"""
+Snapshot do quadro ativo para busca no navegador (/api/roster-snapshot)
+
+Formato colunar (uma lista por coluna), que comprime bem com gzip:
+    {"versao": "...", "colunas": [...], "dados": {"id": [...], "nome": [...], ...}}
+A versão é o hash do conteúdo: igual em todos os workers e só muda
+quando o quadro muda (importação). Ela vai no ETag, então o navegador
+baixa o snapshot uma vez e depois só revalida (304).
+
+Os registrados do dia não entram no snapshot: vêm à parte, em
+/api/roster-snapshot/registrados (lista pequena, buscada ao abrir a página).
+"""
+
+import gzip
+import json
+import time
+import hashlib
+import threading
+from indice_eletricistas import BUSCA_INDICE_TTL
+
+COLUNAS_SNAPSHOT = ['id', 'nome', 'matricula', 'prefixo', 'base', 'polo', 'supervisor']
+
+
+class SnapshotQuadro:
+    """Snapshot serializado (json + gzip) em memória"""
+
+    def __init__(self, ttl=BUSCA_INDICE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot = None  # (versao, json bytes, gzip bytes)
+        self._gerado_em = None
+
+    def _gerar(self, db):
+        from models import EstruturaEquipes
+        from relatorios import SITUACOES_ATIVAS
+
+        linhas = db.query(
+            EstruturaEquipes.id,
+            EstruturaEquipes.colaborador,
+            EstruturaEquipes.matricula,
+            EstruturaEquipes.prefixo,
+            EstruturaEquipes.base,
+            EstruturaEquipes.polo,
+            EstruturaEquipes.superv_campo
+        ).filter(
+            EstruturaEquipes.descr_situacao.in_(SITUACOES_ATIVAS)
+        ).order_by(EstruturaEquipes.colaborador, EstruturaEquipes.id).all()
+
+        dados = {coluna: [linha[i] for linha in linhas] for i, coluna in enumerate(COLUNAS_SNAPSHOT)}
+        conteudo = json.dumps(dados, ensure_ascii=False, separators=(',', ':'))
+        versao = hashlib.sha1(conteudo.encode('utf-8')).hexdigest()[:16]
+
+        corpo = json.dumps(
+            {"versao": versao, "colunas": COLUNAS_SNAPSHOT, "total": len(linhas), "dados": dados},
+            ensure_ascii=False,
+            separators=(',', ':')
+        ).encode('utf-8')
+
+        # mtime=0: mesmo conteúdo gera os mesmos bytes em qualquer worker
+        return versao, corpo, gzip.compress(corpo, compresslevel=6, mtime=0)
+
+    def obter(self, db):
+        """(versao, json bytes, gzip bytes)"""
+        with self._lock:
+            if self._snapshot and time.monotonic() - self._gerado_em <= self.ttl:
+                return self._snapshot
+
+        snapshot = self._gerar(db)
+        with self._lock:
+            self._snapshot = snapshot
+            self._gerado_em = time.monotonic()
+        return snapshot
+
+    def invalidar(self):
+        """Gera de novo no próximo pedido (ex.: nova estrutura importada)"""
+        with self._lock:
+            self._snapshot = None
+
+
+# Instância única do processo
+snapshot_quadro = SnapshotQuadro()
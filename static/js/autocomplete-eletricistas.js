@@ -67,6 +67,14 @@ class AutocompleteEletricistas {
     
     async buscarEletricistas(termo) {
         try {
+            // Busca local no quadro do navegador (sem ida ao servidor)
+            const quadro = typeof QuadroLocal !== 'undefined' ? await QuadroLocal.obter() : null;
+            if (quadro) {
+                const registrados = await quadro.obterRegistrados();
+                this.mostrarSugestoes(quadro.buscar(termo, registrados.indisponiveis));
+                return;
+            }
+            
             // Fazer requisição à API
             const response = await fetch(`/api/buscar-eletricistas?q=${encodeURIComponent(termo)}`);
             const data = await response.json();
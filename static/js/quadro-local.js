@@ -0,0 +1,127 @@
+// Quadro de eletricistas no navegador (busca local do autocomplete)
+// O snapshot vem de /api/roster-snapshot com ETag: o navegador baixa uma
+// vez e depois só revalida (304) até a próxima importação.
+
+// Registrados por data: recarregados após este tempo (igual ao
+// REGISTRADOS_CACHE_TTL do servidor) e atualizados pelas gravações da página
+const REGISTRADOS_TTL_MS = 60000;
+
+class QuadroLocal {
+    constructor() {
+        this.eletricistas = [];
+        this.chaves = [];          // [nome normalizado, matrícula] na mesma posição
+        this.registrados = {};     // data ('' = hoje) -> {frequencia: Set, indisponiveis: Set, carregadoEm}
+    }
+    
+    static normalizar(texto) {
+        // Maiúsculas e sem acentos (igual ao servidor)
+        return (texto || '').normalize('NFKD').replace(/[\u0300-\u036f]/g, '').toUpperCase().trim();
+    }
+    
+    // Instância única da página; null se o snapshot não puder ser carregado
+    static obter() {
+        if (!QuadroLocal.carregando) {
+            QuadroLocal.carregando = new QuadroLocal().carregar().catch(error => {
+                console.error('Erro ao carregar quadro local:', error);
+                return null;
+            });
+        }
+        return QuadroLocal.carregando;
+    }
+    
+    async carregar() {
+        const response = await fetch('/api/roster-snapshot');
+        const snapshot = await response.json();
+        
+        if (!snapshot.dados) {
+            return null;
+        }
+        
+        const dados = snapshot.dados;
+        for (let i = 0; i < snapshot.total; i++) {
+            this.eletricistas.push({
+                id: dados.id[i],
+                nome: dados.nome[i],
+                matricula: dados.matricula[i],
+                prefixo: dados.prefixo[i],
+                base: dados.base[i],
+                polo: dados.polo[i],
+                superv_original: dados.supervisor[i]
+            });
+            this.chaves.push([
+                QuadroLocal.normalizar(dados.nome[i]),
+                QuadroLocal.normalizar(dados.matricula[i])
+            ]);
+        }
+        
+        return this;
+    }
+    
+    // IDs já registrados na data (frequência e indisponíveis), buscados de novo após o TTL
+    async obterRegistrados(data) {
+        const chave = data || '';
+        const atual = this.registrados[chave];
+        
+        if (!atual || Date.now() - atual.carregadoEm > REGISTRADOS_TTL_MS) {
+            const response = await fetch(`/api/roster-snapshot/registrados?data=${encodeURIComponent(chave)}`);
+            const resultado = await response.json();
+            
+            this.registrados[chave] = {
+                frequencia: new Set(resultado.frequencia || []),
+                indisponiveis: new Set(resultado.indisponiveis || []),
+                carregadoEm: Date.now()
+            };
+        }
+        
+        return this.registrados[chave];
+    }
+    
+    // Inclui IDs registrados depois da carga (gravação na página ou sincronização)
+    adicionarRegistrados(data, frequencia = [], indisponiveis = []) {
+        const hoje = new Date(Date.now() - new Date().getTimezoneOffset() * 60000).toISOString().slice(0, 10);
+        const chaves = data === hoje ? [data, ''] : [data || ''];
+        
+        chaves.forEach(chave => {
+            const entrada = this.registrados[chave];
+            if (!entrada) return;
+            frequencia.forEach(id => entrada.frequencia.add(Number(id)));
+            indisponiveis.forEach(id => entrada.indisponiveis.add(Number(id)));
+        });
+    }
+    
+    // Mesma ordem da busca do servidor: início do nome/matrícula, início de palavra, meio
+    buscar(termo, excluir = new Set(), limite = 10) {
+        termo = QuadroLocal.normalizar(termo);
+        if (termo.length < 3) return [];
+        
+        const encontrados = [];
+        
+        this.chaves.forEach(([nome, matricula], i) => {
+            const elet = this.eletricistas[i];
+            if (excluir.has(elet.id)) return;
+            
+            let ordem;
+            if (nome.startsWith(termo) || matricula.startsWith(termo)) {
+                ordem = 0;
+            } else if (nome.includes(' ' + termo)) {
+                ordem = 1;
+            } else if (nome.includes(termo) || matricula.includes(termo)) {
+                ordem = 2;
+            } else {
+                return;
+            }
+            
+            encontrados.push({ ordem, nome, elet });
+        });
+        
+        encontrados.sort((a, b) => a.ordem - b.ordem || (a.nome < b.nome ? -1 : a.nome > b.nome ? 1 : 0));
+        return encontrados.slice(0, limite).map(e => e.elet);
+    }
+}
+
+QuadroLocal.carregando = null;
+
+// Começar a carregar assim que a página abrir
+document.addEventListener('DOMContentLoaded', () => {
+    QuadroLocal.obter();
+});
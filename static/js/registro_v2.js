@@ -2,6 +2,142 @@
 // REGISTRO V2 - INTERFACE DINÂMICA
 // ==========================================
 
+// Chaves de idempotência por operação: reenviar o MESMO conteúdo (nova
+// tentativa após falha de rede, clique duplo) usa a mesma chave e o
+// servidor devolve a resposta original sem gravar de novo
+const chavesEnvio = {};
+
+function chaveIdempotencia(operacao, conteudo) {
+    const texto = JSON.stringify(conteudo);
+    const anterior = chavesEnvio[operacao];
+    if (anterior && anterior.texto === texto) return anterior.chave;
+    
+    const chave = (window.crypto && crypto.randomUUID)
+        ? crypto.randomUUID()
+        : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    chavesEnvio[operacao] = { texto, chave };
+    return chave;
+}
+
+// ==========================================
+// SINCRONIZAÇÃO E OPERAÇÕES OFFLINE
+// ==========================================
+// Sem conexão, a operação fica guardada no navegador (com a mesma chave de
+// idempotência) e vai para /api/sincronizar quando a rede voltar. A mesma
+// chamada traz só o que mudou na data desde o último cursor, para esconder
+// os eletricistas registrados por outros supervisores sem recarregar.
+const CHAVE_PENDENTES = 'registro_v2_pendentes';
+const MAX_PENDENTES_POR_ENVIO = 100;
+const INTERVALO_SINCRONIZACAO_MS = 30000;
+const AVISO_OFFLINE = '📴 Sem conexão: o registro foi guardado neste aparelho e será enviado quando a conexão voltar.';
+let cursorSincronizacao = 0;
+let sincronizando = false;
+
+function operacoesPendentes() {
+    try {
+        return JSON.parse(localStorage.getItem(CHAVE_PENDENTES)) || [];
+    } catch (e) {
+        return [];
+    }
+}
+
+function guardarPendente(operacao) {
+    const pendentes = operacoesPendentes().filter(p => p.chave !== operacao.chave);
+    pendentes.push(operacao);
+    localStorage.setItem(CHAVE_PENDENTES, JSON.stringify(pendentes));
+}
+
+function erroDeRede(error) {
+    // fetch rejeita com TypeError quando não há conexão
+    return !navigator.onLine || error instanceof TypeError;
+}
+
+// Atualiza os registrados da busca local (quadro-local.js), se carregada.
+// Depois de salvar a página recarrega e a busca local lê os registrados do servidor.
+async function marcarRegistradosLocal(data, frequencia, indisponiveis) {
+    const quadro = typeof QuadroLocal !== 'undefined' ? await QuadroLocal.obter() : null;
+    if (quadro) {
+        quadro.adicionarRegistrados(data, frequencia, indisponiveis);
+    }
+}
+
+function aplicarAlteracoes(result) {
+    marcarRegistradosLocal(
+        result.data,
+        result.frequencia.map(r => r.eletricista_id),
+        result.indisponibilidades.map(r => r.eletricista_id)
+    );
+    
+    // Eletricistas registrados (ou remanejados para outra supervisão) saem da lista
+    const registrados = new Set([
+        ...result.frequencia.map(r => r.eletricista_id),
+        ...result.indisponibilidades.map(r => r.eletricista_id),
+        ...result.remanejamentos
+            .filter(r => r.supervisor_destino !== result.supervisor)
+            .map(r => r.eletricista_id)
+    ].map(String));
+    
+    document.querySelectorAll('.eletricista-card[data-id]').forEach(card => {
+        if (!registrados.has(card.dataset.id)) return;
+        
+        const checkbox = card.querySelector('.eletricista-checkbox');
+        if (checkbox && checkbox.checked) {
+            checkbox.checked = false;
+            checkbox.dispatchEvent(new Event('change'));
+        }
+        card.remove();
+    });
+}
+
+async function sincronizarRegistro() {
+    const dataInput = document.getElementById('data-registro');
+    if (sincronizando || !navigator.onLine || !dataInput) return;
+    
+    sincronizando = true;
+    const pendentes = operacoesPendentes().slice(0, MAX_PENDENTES_POR_ENVIO);
+    
+    try {
+        const response = await fetch('/api/sincronizar', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                data: dataInput.value,
+                cursor: cursorSincronizacao,
+                pendentes: pendentes
+            })
+        });
+        
+        const result = await response.json();
+        if (!result.success) return;
+        
+        // Operações enviadas saem da fila (gravadas ou recusadas)
+        const enviadas = new Set(pendentes.map(p => p.chave));
+        localStorage.setItem(
+            CHAVE_PENDENTES,
+            JSON.stringify(operacoesPendentes().filter(p => !enviadas.has(p.chave)))
+        );
+        
+        const recusadas = result.resultados.filter(r => !r.success).map(r => `• ${r.erro}`);
+        if (recusadas.length) {
+            alert(`⚠️ Registros feitos sem conexão que NÃO foram salvos:\n${recusadas.join('\n')}`);
+        }
+        
+        cursorSincronizacao = result.cursor;
+        aplicarAlteracoes(result);
+        
+    } catch (error) {
+        // Sem conexão: tenta de novo no próximo intervalo
+    } finally {
+        sincronizando = false;
+    }
+}
+
+function inicializarSincronizacao() {
+    sincronizarRegistro();
+    window.addEventListener('online', sincronizarRegistro);
+    setInterval(sincronizarRegistro, INTERVALO_SINCRONIZACAO_MS);
+}
+
 class RegistroV2 {
     constructor() {
         this.associacoesTemporarias = [];
@@ -194,6 +330,8 @@ class RegistroV2 {
                     return;
                 }
                 
+                let pendente = null;
+                
                 try {
                     btnSalvarFrequencia.disabled = true;
                     btnSalvarFrequencia.textContent = '⏳ Salvando...';
@@ -201,26 +339,49 @@ class RegistroV2 {
                     // Pegar data selecionada do campo
                     const dataRegistro = document.getElementById('data-registro').value;
                     
+                    const corpo = {
+                        associacoes: this.associacoesTemporarias,
+                        data: dataRegistro
+                    };
+                    pendente = { chave: chaveIdempotencia('frequencia', corpo), tipo: 'frequencia', ...corpo };
+                    
                     const response = await fetch('/api/salvar-frequencia', {
                         method: 'POST',
-                        headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({ 
-                            associacoes: this.associacoesTemporarias,
-                            data: dataRegistro 
-                        })
+                        headers: {
+                            'Content-Type': 'application/json',
+                            'Idempotency-Key': pendente.chave
+                        },
+                        body: JSON.stringify(corpo)
                     });
                     
                     const result = await response.json();
                     
+                    // Associações recusadas pelo servidor (já registradas, inválidas, repetidas)
+                    const recusadas = (result.itens || [])
+                        .filter(item => !item.aceito)
+                        .map(item => {
+                            const assoc = this.associacoesTemporarias.find(a => a.eletricista_id == item.eletricista_id);
+                            const nome = assoc && assoc.nome ? assoc.nome : `ID ${item.eletricista_id}`;
+                            return `• ${nome}: ${item.motivo}`;
+                        });
+                    const detalhe = recusadas.length ? `\n\nNão salvas:\n${recusadas.join('\n')}` : '';
+                    
                     if (result.success) {
-                        alert(`✅ ${result.total} associação(ões) salva(s) com sucesso!`);
+                        alert(`✅ ${result.total} associação(ões) salva(s) com sucesso!${detalhe}`);
                         window.location.reload();
                     } else {
-                        alert(`❌ Erro: ${result.erro}`);
+                        alert(`❌ Erro: ${result.erro}${detalhe}`);
                     }
                     
                 } catch (error) {
-                    alert('❌ Erro ao salvar: ' + error.message);
+                    if (pendente && erroDeRede(error)) {
+                        guardarPendente(pendente);
+                        this.associacoesTemporarias = [];
+                        this.atualizarListaAssociacoes();
+                        alert(AVISO_OFFLINE);
+                    } else {
+                        alert('❌ Erro ao salvar: ' + error.message);
+                    }
                 } finally {
                     btnSalvarFrequencia.disabled = false;
                     btnSalvarFrequencia.textContent = '💾 Salvar Todas as Associações';
@@ -310,13 +471,23 @@ class RegistroV2 {
                     // Pegar data selecionada
                     const dataRegistro = document.getElementById('data-registro').value;
                     
-                    // DEBUG
-                    const apiUrl = `/api/buscar-eletricistas-remanejar?q=${encodeURIComponent(termo)}&data=${dataRegistro}`;
-                    console.log('🔍 [REMANEJAR] Buscando em:', apiUrl);
-                    console.log('📊 [REMANEJAR] Data:', dataRegistro);
+                    let data;
+                    const quadro = typeof QuadroLocal !== 'undefined' ? await QuadroLocal.obter() : null;
                     
-                    const response = await fetch(apiUrl);
-                    const data = await response.json();
+                    if (quadro) {
+                        // Busca local: exclui registrados na FREQUÊNCIA ou INDISPONÍVEIS na data
+                        const registrados = await quadro.obterRegistrados(dataRegistro);
+                        const bloqueados = new Set([...registrados.frequencia, ...registrados.indisponiveis]);
+                        data = { eletricistas: quadro.buscar(termo, bloqueados) };
+                    } else {
+                        // DEBUG
+                        const apiUrl = `/api/buscar-eletricistas-remanejar?q=${encodeURIComponent(termo)}&data=${dataRegistro}`;
+                        console.log('🔍 [REMANEJAR] Buscando em:', apiUrl);
+                        console.log('📊 [REMANEJAR] Data:', dataRegistro);
+                        
+                        const response = await fetch(apiUrl);
+                        data = await response.json();
+                    }
                     
                     console.log('✅ [REMANEJAR] Total de resultados:', data.eletricistas.length);
                     
@@ -374,6 +545,8 @@ class RegistroV2 {
                 return;
             }
             
+            let pendente = null;
+            
             try {
                 const submitBtn = form.querySelector('button[type="submit"]');
                 submitBtn.disabled = true;
@@ -383,8 +556,14 @@ class RegistroV2 {
                 const dataRegistro = document.getElementById('data-registro').value;
                 formData.append('data', dataRegistro);
                 
+                const campos = Object.fromEntries(formData);
+                pendente = { chave: chaveIdempotencia('indisponibilidade', campos), tipo: 'indisponibilidade', ...campos };
+                
                 const response = await fetch('/api/salvar-indisponibilidade', {
                     method: 'POST',
+                    headers: {
+                        'Idempotency-Key': pendente.chave
+                    },
                     body: formData
                 });
                 
@@ -398,7 +577,13 @@ class RegistroV2 {
                 }
                 
             } catch (error) {
-                alert('❌ Erro ao salvar: ' + error.message);
+                if (pendente && erroDeRede(error)) {
+                    guardarPendente(pendente);
+                    form.reset();
+                    alert(AVISO_OFFLINE);
+                } else {
+                    alert('❌ Erro ao salvar: ' + error.message);
+                }
             }
         });
     }
@@ -459,6 +644,15 @@ class AutocompleteIndisponivel {
             
             // Pegar data selecionada
             const dataRegistro = document.getElementById('data-registro').value;        
+            
+            // Busca local no quadro do navegador (exclui os já INDISPONÍVEIS na data)
+            const quadro = typeof QuadroLocal !== 'undefined' ? await QuadroLocal.obter() : null;
+            if (quadro) {
+                const registrados = await quadro.obterRegistrados(dataRegistro);
+                this.mostrarSugestoes(quadro.buscar(termo, registrados.indisponiveis));
+                return;
+            }
+            
             const response = await fetch(`/api/buscar-eletricistas?q=${encodeURIComponent(termo)}&data=${dataRegistro}`);
             
             const data = await response.json();
@@ -525,11 +719,19 @@ async function remanejarEletricista(id, nome, base) {
         return;
     }
     
+    // Mesma rota online e na sincronização (pendente): /api/remanejar-eletricistas
+    const dataRegistro = document.getElementById('data-registro').value;
+    const corpo = { data: dataRegistro, eletricista_ids: [id] };
+    const pendente = { chave: chaveIdempotencia('remanejamento', corpo), tipo: 'remanejamento', ...corpo };
+    
     try {
-        const response = await fetch('/api/remanejar-eletricista', {
+        const response = await fetch('/api/remanejar-eletricistas', {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ eletricista_id: id })
+            headers: {
+                'Content-Type': 'application/json',
+                'Idempotency-Key': pendente.chave
+            },
+            body: JSON.stringify(corpo)
         });
         
         const result = await response.json();
@@ -539,11 +741,17 @@ async function remanejarEletricista(id, nome, base) {
             // Recarregar para atualizar lista
             window.location.reload();
         } else {
-            alert(`❌ Erro: ${result.erro}`);
+            const motivo = result.itens && result.itens.length ? result.itens[0].motivo : null;
+            alert(`❌ Erro: ${motivo ? `${nome} - ${motivo}` : result.erro}`);
         }
         
     } catch (error) {
-        alert('❌ Erro ao remanejar: ' + error.message);
+        if (erroDeRede(error)) {
+            guardarPendente(pendente);
+            alert(AVISO_OFFLINE);
+        } else {
+            alert('❌ Erro ao remanejar: ' + error.message);
+        }
     }
 }
 
@@ -567,4 +775,5 @@ function inicializarCalendario() {
 document.addEventListener('DOMContentLoaded', () => {
     new RegistroV2();
     inicializarCalendario(); // Inicializar filtro de data
+    inicializarSincronizacao(); // Envia pendentes e acompanha registros de outros supervisores
 });
@@ -11,6 +11,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const filtroDia = document.getElementById('filtro-dia');
     const filtroPeriodo = document.getElementById('filtro-periodo');
     const btnGerar = document.getElementById('btn-gerar-relatorio');
+    const btnExportar = document.getElementById('btn-exportar-csv');
     
     let tabAtual = 'geral';
     
@@ -66,6 +67,38 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
     
+    // ==========================================
+    // EXPORTAR CSV (download em streaming)
+    // ==========================================
+    
+    const endpointsPorTab = {
+        geral: '/api/relatorio-geral',
+        supervisor: '/api/relatorio-por-supervisor',
+        prefixo: '/api/relatorio-por-prefixo',
+        disponiveis: '/api/relatorio-eletricistas-disponiveis'
+    };
+    
+    btnExportar.addEventListener('click', () => {
+        let dataInicio, dataFim;
+        
+        if (tipoPeriodo.value === 'dia') {
+            dataInicio = document.getElementById('data-dia').value;
+            dataFim = dataInicio;
+        } else {
+            dataInicio = document.getElementById('data-inicio').value;
+            dataFim = document.getElementById('data-fim').value;
+        }
+        
+        if (!dataInicio || !dataFim) {
+            alert('⚠️ Selecione o período');
+            return;
+        }
+        
+        // O navegador baixa o arquivo conforme o servidor envia as linhas
+        window.location.href = 
+            `${endpointsPorTab[tabAtual]}?data_inicio=${dataInicio}&data_fim=${dataFim}&format=csv`;
+    });
+    
     // ==========================================
     // RELATÓRIO GERAL
     // ==========================================
@@ -0,0 +1,259 @@
+"""
+Relatórios em segundo plano (tarefas)
+
+Períodos longos (trimestre/ano) são processados fora da requisição:
+  1. POST /api/relatorios/tarefas           → cria a tarefa e devolve o id
+  2. GET  /api/relatorios/tarefas/{id}      → status e linhas já gravadas
+  3. GET  /api/relatorios/tarefas/{id}/download → arquivo gerado
+
+Configuração (variáveis de ambiente):
+  RELATORIOS_TAREFAS_WORKERS     - tarefas processadas ao mesmo tempo (padrão 2)
+  RELATORIOS_TAREFAS_PENDENTES   - máximo de tarefas na fila/em execução (padrão 10)
+  RELATORIOS_TAREFAS_DIR         - pasta dos arquivos gerados
+  RELATORIOS_TAREFAS_RETENCAO_H  - horas que o arquivo fica disponível (padrão 24)
+"""
+
+import os
+import json
+import time
+import uuid
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+TAREFAS_WORKERS = int(os.getenv('RELATORIOS_TAREFAS_WORKERS', 2))
+TAREFAS_MAX_PENDENTES = int(os.getenv('RELATORIOS_TAREFAS_PENDENTES', 10))
+TAREFAS_DIR = Path(os.getenv(
+    'RELATORIOS_TAREFAS_DIR',
+    os.path.join(tempfile.gettempdir(), 'relatorios_tarefas')
+))
+TAREFAS_RETENCAO_SEGUNDOS = float(os.getenv('RELATORIOS_TAREFAS_RETENCAO_H', 24)) * 3600
+
+FORMATOS_TAREFA = ('json', 'csv', 'ndjson')
+
+# Status possíveis
+NA_FILA = 'na_fila'
+PROCESSANDO = 'processando'
+CONCLUIDO = 'concluido'
+ERRO = 'erro'
+
+# Frequência de atualização do contador de linhas gravadas
+INTERVALO_CONTADOR_LINHAS = 1000
+
+# Pool limitado: tarefas pesadas não disputam todas as conexões/threads
+_executor = ThreadPoolExecutor(max_workers=TAREFAS_WORKERS, thread_name_prefix='relatorio')
+_tarefas = {}
+_lock = threading.Lock()
+
+
+# ============================================
+# RELATÓRIOS DISPONÍVEIS PARA TAREFA
+# ============================================
+def _definicao_relatorio(relatorio):
+    """(calcular, colunas(resultado), linhas(resultado)) do relatório, ou None"""
+    import relatorios
+    import exportacao
+
+    definicoes = {
+        'relatorio-geral': (
+            relatorios.calcular_relatorio_geral,
+            lambda r: exportacao.COLUNAS_GERAL,
+            exportacao.linhas_relatorio_geral
+        ),
+        'relatorio-por-supervisor': (
+            relatorios.calcular_relatorio_por_supervisor,
+            exportacao.colunas_relatorio_por_supervisor,
+            exportacao.linhas_relatorio_por_supervisor
+        ),
+        'relatorio-por-prefixo': (
+            relatorios.calcular_relatorio_por_prefixo,
+            lambda r: exportacao.COLUNAS_PREFIXO,
+            exportacao.linhas_relatorio_por_prefixo
+        ),
+        'relatorio-eletricistas-disponiveis': (
+            relatorios.calcular_relatorio_eletricistas_disponiveis,
+            None,
+            None
+        )
+    }
+    return definicoes.get(relatorio)
+
+
+def relatorio_valido(relatorio):
+    """True se o relatório pode ser gerado em segundo plano"""
+    return _definicao_relatorio(relatorio) is not None
+
+
+# ============================================
+# EXECUÇÃO
+# ============================================
+def _atualizar(tarefa_id, **campos):
+    with _lock:
+        if tarefa_id in _tarefas:
+            _tarefas[tarefa_id].update(campos)
+
+
+def _contar_linhas(tarefa_id, linhas):
+    """Repassa as linhas atualizando linhas_gravadas da tarefa"""
+    total = 0
+    for linha in linhas:
+        yield linha
+        total += 1
+        if total % INTERVALO_CONTADOR_LINHAS == 0:
+            _atualizar(tarefa_id, linhas_gravadas=total)
+    _atualizar(tarefa_id, linhas_gravadas=total)
+
+
+def _executar(tarefa_id):
+    """Roda no pool: calcula o relatório e grava o arquivo em disco"""
+    from database import SessionLocal
+    import exportacao
+
+    with _lock:
+        tarefa = dict(_tarefas[tarefa_id])
+
+    _atualizar(tarefa_id, status=PROCESSANDO, iniciado_em=time.time())
+
+    calcular, colunas, linhas = _definicao_relatorio(tarefa['relatorio'])
+    inicio, fim, formato = tarefa['data_inicio'], tarefa['data_fim'], tarefa['formato']
+    arquivo = TAREFAS_DIR / f"{tarefa_id}.{formato}"
+    temporario = arquivo.with_suffix('.parcial')
+
+    db = SessionLocal()
+    try:
+        TAREFAS_DIR.mkdir(parents=True, exist_ok=True)
+
+        if tarefa['relatorio'] == 'relatorio-eletricistas-disponiveis' and formato != 'json':
+            # Lista grande: grava direto do cursor, sem montar o resultado em memória
+            conteudo = exportacao.gerar_conteudo(
+                formato,
+                exportacao.COLUNAS_DISPONIVEIS,
+                _contar_linhas(tarefa_id, exportacao.linhas_eletricistas_disponiveis(inicio, fim))
+            )
+        else:
+            resultado = calcular(db, inicio, fim)
+
+            if formato == 'json':
+                conteudo = [json.dumps(resultado, ensure_ascii=False).encode('utf-8')]
+            else:
+                conteudo = exportacao.gerar_conteudo(
+                    formato,
+                    colunas(resultado),
+                    _contar_linhas(tarefa_id, linhas(resultado))
+                )
+
+        with open(temporario, 'wb') as saida:
+            for bloco in conteudo:
+                saida.write(bloco)
+        os.replace(temporario, arquivo)
+
+        _atualizar(
+            tarefa_id,
+            status=CONCLUIDO,
+            arquivo=str(arquivo),
+            concluido_em=time.time()
+        )
+
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        if temporario.exists():
+            temporario.unlink()
+        _atualizar(tarefa_id, status=ERRO, erro=str(e), concluido_em=time.time())
+    finally:
+        db.close()
+
+
+def _remover_expiradas():
+    """Apaga tarefas (e arquivos) concluídas há mais tempo que a retenção"""
+    limite = time.time() - TAREFAS_RETENCAO_SEGUNDOS
+
+    with _lock:
+        expiradas = [
+            tarefa_id for tarefa_id, t in _tarefas.items()
+            if t.get('concluido_em') and t['concluido_em'] < limite
+        ]
+        for tarefa_id in expiradas:
+            tarefa = _tarefas.pop(tarefa_id)
+            if tarefa.get('arquivo') and os.path.exists(tarefa['arquivo']):
+                os.remove(tarefa['arquivo'])
+
+    # Arquivos órfãos (ex.: gerados antes de um reinício do servidor)
+    if TAREFAS_DIR.exists():
+        for arquivo in TAREFAS_DIR.iterdir():
+            if arquivo.stat().st_mtime < limite:
+                arquivo.unlink(missing_ok=True)
+
+
+# ============================================
+# API PÚBLICA
+# ============================================
+def criar_tarefa(relatorio, data_inicio, data_fim, formato, usuario_id):
+    """
+    Enfileira um relatório. Retorna (tarefa, erro): erro preenchido
+    quando a fila está cheia.
+    """
+    _remover_expiradas()
+
+    with _lock:
+        pendentes = sum(1 for t in _tarefas.values() if t['status'] in (NA_FILA, PROCESSANDO))
+        if pendentes >= TAREFAS_MAX_PENDENTES:
+            return None, "Fila de relatórios cheia. Tente novamente em alguns minutos."
+
+        tarefa_id = uuid.uuid4().hex
+        _tarefas[tarefa_id] = {
+            "id": tarefa_id,
+            "relatorio": relatorio,
+            "data_inicio": data_inicio,
+            "data_fim": data_fim,
+            "formato": formato,
+            "usuario_id": usuario_id,
+            "status": NA_FILA,
+            "linhas_gravadas": None,  # csv/ndjson: atualizado durante a gravação
+            "criado_em": time.time(),
+            "iniciado_em": None,
+            "concluido_em": None,
+            "arquivo": None,
+            "erro": None
+        }
+        tarefa = dict(_tarefas[tarefa_id])
+
+    _executor.submit(_executar, tarefa_id)
+    return tarefa, None
+
+
+def obter_tarefa(tarefa_id):
+    """Cópia da tarefa ou None (inexistente/expirada)"""
+    _remover_expiradas()
+    with _lock:
+        tarefa = _tarefas.get(tarefa_id)
+        return dict(tarefa) if tarefa else None
+
+
+def formatar_tarefa(tarefa):
+    """Dados da tarefa para a resposta JSON"""
+    def hora(instante):
+        return datetime.fromtimestamp(instante).strftime('%d/%m/%Y %H:%M:%S') if instante else None
+
+    expira_em = None
+    if tarefa['concluido_em']:
+        expira_em = hora(tarefa['concluido_em'] + TAREFAS_RETENCAO_SEGUNDOS)
+
+    return {
+        "id": tarefa['id'],
+        "relatorio": tarefa['relatorio'],
+        "periodo": {
+            "inicio": tarefa['data_inicio'].strftime('%d/%m/%Y'),
+            "fim": tarefa['data_fim'].strftime('%d/%m/%Y')
+        },
+        "formato": tarefa['formato'],
+        "status": tarefa['status'],
+        "linhas_gravadas": tarefa['linhas_gravadas'],
+        "criado_em": hora(tarefa['criado_em']),
+        "concluido_em": hora(tarefa['concluido_em']),
+        "expira_em": expira_em,
+        "erro": tarefa['erro'],
+        "download": f"/api/relatorios/tarefas/{tarefa['id']}/download" if tarefa['status'] == CONCLUIDO else None
+    }
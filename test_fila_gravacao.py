@@ -0,0 +1,137 @@
+"""
+Testes da fila de gravação em grupo (fila_gravacao.py)
+
+Usam um banco SQLite próprio em arquivo temporário (não importam database.py):
+    python -m pytest -q test_fila_gravacao.py
+"""
+
+from concurrent.futures import Future
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, event, insert, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from fila_gravacao import FilaGravacao
+
+metadata = MetaData()
+registros = Table('registros', metadata, Column('id', Integer, primary_key=True))
+
+
+class SessaoObservada(Session):
+    """Anota o estado dos pedidos no momento do commit (ou faz o commit falhar)"""
+
+    lote = []
+    eventos = []
+    falhar_commit = False
+
+    def commit(self):
+        SessaoObservada.eventos.append(('commit', [futuro.done() for *_, futuro in SessaoObservada.lote]))
+        if SessaoObservada.falhar_commit:
+            raise RuntimeError("falha no commit")
+        super().commit()
+
+
+@pytest.fixture
+def fabrica(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fila.db'}")
+
+    # SAVEPOINT no pysqlite: transação controlada pelo SQLAlchemy
+    # (receita da documentação do SQLAlchemy para o driver sqlite3)
+    @event.listens_for(engine, "connect")
+    def _sem_transacao_implicita(conexao, _):
+        conexao.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(conexao):
+        conexao.exec_driver_sql("BEGIN")
+
+    metadata.create_all(engine)
+    SessaoObservada.lote = []
+    SessaoObservada.eventos = []
+    SessaoObservada.falhar_commit = False
+    yield sessionmaker(bind=engine, class_=SessaoObservada)
+    engine.dispose()
+
+
+def _gravados(fabrica):
+    with fabrica() as db:
+        return sorted(db.execute(select(registros.c.id)).scalars())
+
+
+def gravar(db, registro_id, falha=None):
+    """Pedido de teste no formato registrar_*: (resposta, apos_commit)"""
+    db.execute(insert(registros).values(id=registro_id))
+    if falha == 'excecao':
+        raise ValueError(f"pedido {registro_id} falhou")
+    if falha == 'recusado':
+        return {"success": False, "erro": "recusado"}, None
+
+    def apos_commit():
+        SessaoObservada.eventos.append(('apos_commit', registro_id))
+
+    return {"success": True, "id": registro_id}, apos_commit
+
+
+def _lote(*pedidos):
+    lote = [(gravar, args, Future()) for args in pedidos]
+    SessaoObservada.lote = lote
+    return lote
+
+
+@pytest.mark.parametrize('falha', ['excecao', 'recusado'])
+def test_pedido_com_erro_nao_desfaz_nem_grava_os_vizinhos(fabrica, falha):
+    fila = FilaGravacao(fabrica_sessao=fabrica)
+    lote = _lote((1,), (2, falha), (3,))
+
+    fila._gravar(lote)
+
+    respostas = [futuro.result(timeout=0) for *_, futuro in lote]
+    assert respostas[0] == {"success": True, "id": 1}
+    assert respostas[1]["success"] is False
+    assert respostas[2] == {"success": True, "id": 3}
+    assert _gravados(fabrica) == [1, 3]
+    assert fila.estatisticas()["commits"] == 1
+
+
+def test_respostas_so_depois_do_commit(fabrica):
+    fila = FilaGravacao(fabrica_sessao=fabrica)
+    lote = _lote((1,), (2, 'excecao'), (3,))
+
+    fila._gravar(lote)
+
+    # Nenhum pedido (nem o que falhou) respondido antes do commit do grupo;
+    # apos_commit dos aceitos só depois dele
+    assert SessaoObservada.eventos == [
+        ('commit', [False, False, False]),
+        ('apos_commit', 1),
+        ('apos_commit', 3)
+    ]
+
+
+def test_falha_no_commit_responde_erro_a_todos_sem_gravar(fabrica):
+    fila = FilaGravacao(fabrica_sessao=fabrica)
+    SessaoObservada.falhar_commit = True
+    lote = _lote((1,), (2,))
+
+    fila._gravar(lote)
+
+    assert [futuro.result(timeout=0) for *_, futuro in lote] == [
+        {"success": False, "erro": "falha no commit"},
+        {"success": False, "erro": "falha no commit"}
+    ]
+    assert [e for e in SessaoObservada.eventos if e[0] == 'apos_commit'] == []
+    assert _gravados(fabrica) == []
+    assert fila.estatisticas()["falhas_commit"] == 1
+
+
+def test_grupo_pela_thread_da_fila(fabrica):
+    # Janela longa: o grupo fecha ao atingir max_lote (uma transação)
+    fila = FilaGravacao(janela_ms=2000, max_lote=3, fabrica_sessao=fabrica)
+
+    futuros = [fila.enviar(gravar, 1), fila.enviar(gravar, 2, 'excecao'), fila.enviar(gravar, 3)]
+
+    respostas = [futuro.result(timeout=5) for futuro in futuros]
+    assert [r["success"] for r in respostas] == [True, False, True]
+    assert _gravados(fabrica) == [1, 3]
+    assert fila.estatisticas()["commits"] == 1
+    assert fila.estatisticas()["maior_lote"] == 3
@@ -0,0 +1,129 @@
+"""
+Vigência da estrutura de equipes (estrutura "na data")
+
+Cada importação arquiva a estrutura anterior em estrutura_equipes_historico
+(data_carga = momento da troca). A partir das cargas, calculamos para cada
+eletricista os intervalos [valido_de, valido_ate) em que supervisor, base e
+situação ficaram iguais:
+  - carga k vale de data(carga k-1) até data(carga k)
+  - a estrutura atual vale de data(última carga) em diante
+Os relatórios geral, por supervisor e a série diária juntam cada registro
+ao intervalo que contém a data dele, em vez de usar a estrutura atual.
+Continuam na estrutura ATUAL (a vigência não guarda prefixo, polo nem
+matrícula):
+  - por prefixo: as contagens usam o prefixo do próprio registro, mas o
+    total de prefixos ativos é o de hoje
+  - eletricistas disponíveis: lista e total saem do quadro de hoje
+
+A tabela é recalculada a cada importação. Para popular após o deploy:
+    python vigencia_estrutura.py
+"""
+
+from datetime import date
+from sqlalchemy import insert
+from models import EstruturaEquipes, EstruturaEquipesHistorico, EstruturaVigencia
+
+INICIO_SEMPRE = date(1900, 1, 1)
+FIM_VIGENTE = date(9999, 12, 31)
+
+
+def condicao_vigencia(coluna_id, coluna_data):
+    """Condição de join: intervalo do eletricista que contém a data"""
+    return (
+        (EstruturaVigencia.eletricista_id == coluna_id)
+        & (EstruturaVigencia.valido_de <= coluna_data)
+        & (EstruturaVigencia.valido_ate > coluna_data)
+    )
+
+
+def vigencia_disponivel(db):
+    """True se a tabela de vigência já foi calculada"""
+    return db.query(EstruturaVigencia.id).first() is not None
+
+
+def reconstruir_vigencia(db):
+    """
+    Recalcula todos os intervalos a partir do histórico + estrutura atual.
+    Retorna o total de intervalos gravados.
+    """
+    cargas = [c for (c,) in db.query(
+        EstruturaEquipesHistorico.data_carga
+    ).distinct().order_by(EstruturaEquipesHistorico.data_carga)]
+
+    # Período de validade de cada carga. Várias cargas no mesmo dia: o período
+    # até esse dia fica com a primeira (a estrutura de antes do dia); as
+    # seguintes, que valeram só parte do dia, ficam sem período - o dia usa a
+    # estrutura em vigor no fim dele
+    periodos = {}
+    inicio = INICIO_SEMPRE
+    for carga in cargas:
+        fim = carga.date()
+        if fim > inicio:
+            periodos[carga] = (inicio, fim)
+            inicio = fim
+
+    intervalos = {}  # eletricista_id -> [[valido_de, valido_ate, (superv, base, situacao)], ...]
+
+    def acrescentar(eletricista_id, valido_de, valido_ate, campos):
+        lista = intervalos.setdefault(eletricista_id, [])
+        # Períodos consecutivos com os mesmos dados viram um só intervalo
+        if lista and lista[-1][1] == valido_de and lista[-1][2] == campos:
+            lista[-1][1] = valido_ate
+        else:
+            lista.append([valido_de, valido_ate, campos])
+
+    historico = db.query(
+        EstruturaEquipesHistorico.data_carga,
+        EstruturaEquipesHistorico.id_original,
+        EstruturaEquipesHistorico.superv_campo,
+        EstruturaEquipesHistorico.base,
+        EstruturaEquipesHistorico.descr_situacao
+    ).order_by(EstruturaEquipesHistorico.data_carga).yield_per(5000)
+
+    for carga, id_original, superv, base, situacao in historico:
+        if carga in periodos and id_original is not None:
+            acrescentar(id_original, *periodos[carga], (superv, base, situacao))
+
+    for id_, superv, base, situacao in db.query(
+        EstruturaEquipes.id,
+        EstruturaEquipes.superv_campo,
+        EstruturaEquipes.base,
+        EstruturaEquipes.descr_situacao
+    ):
+        acrescentar(id_, inicio, FIM_VIGENTE, (superv, base, situacao))
+
+    linhas = [
+        {
+            "eletricista_id": eletricista_id,
+            "valido_de": valido_de,
+            "valido_ate": valido_ate,
+            "superv_campo": superv,
+            "base": base,
+            "descr_situacao": situacao
+        }
+        for eletricista_id, lista in intervalos.items()
+        for valido_de, valido_ate, (superv, base, situacao) in lista
+    ]
+
+    try:
+        db.query(EstruturaVigencia).delete(synchronize_session=False)
+        if linhas:
+            db.execute(insert(EstruturaVigencia.__table__), linhas)
+        db.commit()
+        return len(linhas)
+
+    except Exception:
+        db.rollback()
+        raise
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print("🗓️ Calculando vigência da estrutura...")
+        total = reconstruir_vigencia(db)
+        print(f"✅ {total} intervalos gravados")
+    finally:
+        db.close()